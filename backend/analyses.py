@@ -0,0 +1,73 @@
+# backend/analyses.py
+"""
+Persistent store of per-chunk LLM analyses, keyed by (content_hash, model).
+
+Code generation and memo generation both start from the same structured analysis
+of each chunk (summary, codes with definitions and quotes). Storing it in the
+`chunk_analyses` table means a chunk is analyzed once per model: later code runs,
+memos and re-processed transcripts with unchanged chunks read it back instead of
+calling the model again. Unlike the LLM response cache it has no TTL or eviction.
+"""
+import datetime
+import json
+import threading
+from typing import Dict, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.models import ChunkAnalysis
+
+
+class AnalysisStore:
+    def __init__(self, batch_size: int = 500):
+        self.batch_size = batch_size
+        self.reused = 0  # chunk analyses served from the store, i.e. LLM calls saved
+        self.analyzed = 0  # chunk analyses that needed an LLM call
+        self._lock = threading.Lock()
+
+    def load(self, db: Session, hashes: Iterable[str], model: str) -> Dict[str, dict]:
+        """Returns {content_hash: analysis} for the hashes already analyzed with `model`."""
+        hashes = list(set(hashes))
+        found = {}
+        for i in range(0, len(hashes), self.batch_size):
+            rows = db.execute(select(ChunkAnalysis.content_hash, ChunkAnalysis.analysis).where(
+                ChunkAnalysis.model == model, ChunkAnalysis.content_hash.in_(hashes[i:i + self.batch_size])))
+            found.update((row.content_hash, json.loads(row.analysis)) for row in rows)
+        return found
+
+    def save(self, db: Session, model: str, analyses: Dict[str, dict]):
+        """Upserts {content_hash: analysis} for `model` and commits."""
+        if db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        now = datetime.datetime.now(datetime.UTC)
+        items = list(analyses.items())
+        for i in range(0, len(items), self.batch_size):
+            stmt = insert(ChunkAnalysis).values([
+                {"content_hash": h, "model": model, "analysis": json.dumps(analysis, ensure_ascii=False),
+                 "created_at": now}
+                for h, analysis in items[i:i + self.batch_size]
+            ])
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["content_hash", "model"],
+                set_={"analysis": stmt.excluded.analysis, "created_at": stmt.excluded.created_at}))
+        db.commit()
+
+    def record(self, reused: int, analyzed: int):
+        with self._lock:
+            self.reused += reused
+            self.analyzed += analyzed
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.reused + self.analyzed
+            return {
+                "llm_calls_saved": self.reused,
+                "llm_calls": self.analyzed,
+                "hit_rate": self.reused / lookups if lookups else 0.0,
+            }
+
+
+analysis_store = AnalysisStore()
@@ -0,0 +1,412 @@
+# backend/ann.py
+"""
+Approximate nearest-neighbour (ANN) indexes over chunk embeddings, used by corpus
+search once the corpus is too large for a brute-force scan.
+
+Two backends share one small interface (add / remove_transcripts / search / save):
+- IVFIndex: pure NumPy inverted-file index (spherical k-means coarse quantizer).
+- HNSWIndex: optional, requires `pip install hnswlib`.
+
+Indexes are persisted under ANN_INDEX_DIR, one per embedding model, as a snapshot plus
+per-transcript delta files. Callers compare `fingerprint()` with the database, `refresh()`
+on a mismatch, and fall back to exact search when they still differ.
+"""
+import hashlib
+import os
+import threading
+import time
+import uuid
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+from backend.vectors import EMBEDDING_DTYPE
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=EMBEDDING_DTYPE)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(ids: np.ndarray, scores: np.ndarray, k: int):
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k - 1)[:k]
+        ids, scores = ids[keep], scores[keep]
+    order = np.argsort(-scores)
+    return [(int(ids[i]), float(scores[i])) for i in order]
+
+
+class IVFIndex:
+    """
+    Inverted-file index: vectors are bucketed by their nearest centroid, and a query
+    only scans the `nprobe` buckets whose centroids are closest to it.
+    """
+    kind = "ivf"
+
+    def __init__(self, centroids: np.ndarray, model: str, nprobe: int = None):
+        self.centroids = np.ascontiguousarray(_normalize(centroids))
+        self.model = model
+        self.nprobe = nprobe or int(os.getenv("ANN_NPROBE") or 16)
+        nlist, dim = self.centroids.shape
+        self._ids = [np.empty(0, dtype=np.int64) for _ in range(nlist)]
+        self._tids = [np.empty(0, dtype=np.int64) for _ in range(nlist)]
+        self._vecs = [np.empty((0, dim), dtype=EMBEDDING_DTYPE) for _ in range(nlist)]
+
+    def __len__(self):
+        return sum(len(ids) for ids in self._ids)
+
+    @property
+    def dim(self) -> int:
+        return self.centroids.shape[1]
+
+    @classmethod
+    def train(cls, sample: np.ndarray, model: str, nlist: int = None, n_total: int = None,
+              iters: int = 10, seed: int = 0) -> "IVFIndex":
+        """Fits `nlist` centroids (default ~sqrt(corpus size)) with spherical k-means."""
+        sample = _normalize(sample)
+        if nlist is None:
+            nlist = int(np.sqrt(n_total or len(sample)))
+        nlist = max(1, min(nlist, len(sample)))
+        rng = np.random.default_rng(seed)
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iters):
+            assign = cls._nearest(sample, centroids)
+            order = np.argsort(assign, kind="stable")
+            labels, starts = np.unique(assign[order], return_index=True)
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+            empty = np.setdiff1d(np.arange(nlist), labels)
+            centroids[labels] = _normalize(sums)
+            if len(empty):
+                centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+        return cls(centroids, model)
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray, block: int = 4096) -> np.ndarray:
+        return np.concatenate([
+            np.argmax(vectors[i:i + block] @ centroids.T, axis=1) for i in range(0, len(vectors), block)
+        ]) if len(vectors) else np.empty(0, dtype=np.int64)
+
+    def add(self, ids: Sequence[int], transcript_ids: Sequence[int], vectors: np.ndarray):
+        vectors = _normalize(vectors)
+        ids = np.asarray(ids, dtype=np.int64)
+        transcript_ids = np.asarray(transcript_ids, dtype=np.int64)
+        assign = self._nearest(vectors, self.centroids)
+        order = np.argsort(assign, kind="stable")
+        labels, starts = np.unique(assign[order], return_index=True)
+        for label, group in zip(labels, np.split(order, starts[1:])):
+            self._ids[label] = np.concatenate([self._ids[label], ids[group]])
+            self._tids[label] = np.concatenate([self._tids[label], transcript_ids[group]])
+            self._vecs[label] = np.concatenate([self._vecs[label], vectors[group]])
+
+    def remove_transcripts(self, transcript_ids: Iterable[int]):
+        transcript_ids = np.asarray(list(transcript_ids), dtype=np.int64)
+        for label in range(len(self._ids)):
+            keep = ~np.isin(self._tids[label], transcript_ids)
+            if not keep.all():
+                self._ids[label] = self._ids[label][keep]
+                self._tids[label] = self._tids[label][keep]
+                self._vecs[label] = self._vecs[label][keep]
+
+    def fingerprint(self):
+        sizes = [ids for ids in self._ids if len(ids)]
+        return len(self), max((int(ids.max()) for ids in sizes), default=None)
+
+    def search(self, query: np.ndarray, k: int, transcript_ids: Optional[Sequence[int]] = None, nprobe: int = None):
+        """Top-k (id, score) pairs, or None if a transcript filter leaves fewer than k matches in the probed lists."""
+        q = _normalize(query)
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        probe = np.argpartition(-(self.centroids @ q), nprobe - 1)[:nprobe]
+        allowed = np.asarray(transcript_ids, dtype=np.int64) if transcript_ids else None
+        all_ids, all_scores = [], []
+        for label in probe:
+            ids, vecs = self._ids[label], self._vecs[label]
+            if allowed is not None:
+                mask = np.isin(self._tids[label], allowed)
+                ids, vecs = ids[mask], vecs[mask]
+            if len(ids):
+                all_ids.append(ids)
+                all_scores.append(vecs @ q)
+        if allowed is not None and sum(len(ids) for ids in all_ids) < k:
+            # ✨ The subset is too sparse in the probed lists for a full result; the caller scans it exactly
+            return None
+        if not all_ids:
+            return []
+        return _top_k(np.concatenate(all_ids), np.concatenate(all_scores), k)
+
+    def save(self, path: str):
+        sizes = np.array([len(ids) for ids in self._ids], dtype=np.int64)
+        with open(path, "wb") as f:
+            np.savez(
+                f, kind=self.kind, model=self.model, centroids=self.centroids, sizes=sizes,
+                ids=np.concatenate(self._ids), tids=np.concatenate(self._tids), vecs=np.concatenate(self._vecs),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        with np.load(path) as data:
+            index = cls(data["centroids"], str(data["model"]))
+            bounds = np.cumsum(data["sizes"])[:-1]
+            index._ids = np.split(data["ids"], bounds)
+            index._tids = np.split(data["tids"], bounds)
+            index._vecs = np.split(data["vecs"], bounds)
+        return index
+
+
+class HNSWIndex:
+    """Graph-based index backed by the optional `hnswlib` package."""
+    kind = "hnsw"
+
+    def __init__(self, dim: int, model: str, max_elements: int = 1024):
+        import hnswlib  # Optional dependency, only needed when ANN_BACKEND=hnsw
+
+        self.model = model
+        self.dim = dim
+        self.ef = int(os.getenv("ANN_HNSW_EF") or 64)
+        self._index = hnswlib.Index(space="cosine", dim=dim)
+        self._index.init_index(max_elements=max_elements, ef_construction=200, M=16, allow_replace_deleted=True)
+        self._tids = {}  # chunk id -> transcript id, for live (not deleted) labels only
+
+    def __len__(self):
+        return len(self._tids)
+
+    @classmethod
+    def train(cls, sample: np.ndarray, model: str, n_total: int = None, **_) -> "HNSWIndex":
+        return cls(sample.shape[1], model, max_elements=max(n_total or len(sample), 1024))
+
+    def add(self, ids: Sequence[int], transcript_ids: Sequence[int], vectors: np.ndarray):
+        needed = self._index.get_current_count() + len(ids)
+        if needed > self._index.get_max_elements():
+            self._index.resize_index(max(needed, 2 * self._index.get_max_elements()))
+        self._index.add_items(_normalize(vectors), np.asarray(ids, dtype=np.int64), replace_deleted=True)
+        self._tids.update(zip((int(i) for i in ids), (int(t) for t in transcript_ids)))
+
+    def remove_transcripts(self, transcript_ids: Iterable[int]):
+        transcript_ids = set(transcript_ids)
+        for label in [label for label, tid in self._tids.items() if tid in transcript_ids]:
+            self._index.mark_deleted(label)
+            del self._tids[label]
+
+    def fingerprint(self):
+        return len(self._tids), max(self._tids, default=None)
+
+    def search(self, query: np.ndarray, k: int, transcript_ids: Optional[Sequence[int]] = None, **_):
+        k = min(k, len(self._tids))
+        if k <= 0:
+            return []
+        allowed = set(transcript_ids) if transcript_ids else None
+        self._index.set_ef(max(self.ef, k))
+        try:
+            labels, distances = self._index.knn_query(
+                _normalize(query), k=k, filter=(lambda label: self._tids.get(label) in allowed) if allowed else None
+            )
+        except RuntimeError:
+            return None  # Too few matches for a dense result; the caller falls back to exact search
+        return [(int(label), 1.0 - float(dist)) for label, dist in zip(labels[0], distances[0])]
+
+    def save(self, path: str):
+        self._index.save_index(f"{path}.bin")
+        with open(path, "wb") as f:
+            np.savez(f, kind=self.kind, model=self.model, dim=self.dim,
+                     ids=np.fromiter(self._tids.keys(), dtype=np.int64, count=len(self._tids)),
+                     tids=np.fromiter(self._tids.values(), dtype=np.int64, count=len(self._tids)))
+
+    @classmethod
+    def load(cls, path: str) -> "HNSWIndex":
+        with np.load(path) as data:
+            index = cls(int(data["dim"]), str(data["model"]))
+            index._tids = dict(zip(data["ids"].tolist(), data["tids"].tolist()))
+        index._index.load_index(f"{path}.bin", allow_replace_deleted=True)
+        return index
+
+
+BACKENDS = {"ivf": IVFIndex, "hnsw": HNSWIndex}
+
+
+class AnnIndexManager:
+    """
+    Loads, builds, persists and incrementally updates one ANN index per embedding model.
+
+    Each index is a full snapshot (`<backend>-<digest>.npz`) plus a directory of small delta
+    files, one per replaced or removed transcript. Requests and jobs only append deltas;
+    `refresh` picks up other workers' deltas and rebuilt snapshots, and once enough deltas
+    pile up a background thread folds them into a new snapshot.
+    """
+
+    def __init__(self, backend: str = None, index_dir: str = None, compact_after: int = None):
+        self.backend = backend or os.getenv("ANN_BACKEND") or "ivf"  # "ivf", "hnsw" or "none"
+        self.index_dir = index_dir or os.getenv("ANN_INDEX_DIR") or "./ann_index"
+        self.compact_after = compact_after or int(os.getenv("ANN_COMPACT_DELTAS") or 32)
+        self._indexes = {}
+        self._snapshot_mtimes = {}  # model -> st_mtime_ns of the snapshot the loaded index came from
+        self._applied = {}  # model -> names of the delta files applied to the loaded index
+        self._compacting = set()
+        self._lock = threading.RLock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend in BACKENDS
+
+    def _path(self, model: str) -> str:
+        digest = hashlib.sha256(model.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.index_dir, f"{self.backend}-{digest}.npz")
+
+    @staticmethod
+    def _delta_dir(path: str) -> str:
+        return path[:-len(".npz")] + ".delta"
+
+    def has_index(self, model: str) -> bool:
+        return self.enabled and (self._indexes.get(model) is not None or os.path.exists(self._path(model)))
+
+    def get(self, model: str):
+        """Returns the index for `model`, loading it from disk on first use, or None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if self._indexes.get(model) is None:
+                self._load(model)
+            return self._indexes[model]
+
+    def refresh(self, model: str):
+        """Reloads the snapshot if another worker rewrote it, then applies any new deltas."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            path = self._path(model)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if self._indexes.get(model) is None or mtime != self._snapshot_mtimes.get(model):
+                self._load(model)
+            else:
+                self._apply_deltas(model)
+            return self._indexes[model]
+
+    def build(self, model: str, sample: np.ndarray, n_total: int, blocks: Iterable):
+        """Trains a fresh index on `sample`, then adds every (ids, transcript_ids, vectors) block."""
+        started = time.time_ns()
+        index = BACKENDS[self.backend].train(sample, model, n_total=n_total)
+        for ids, transcript_ids, vectors in blocks:
+            index.add(ids, transcript_ids, vectors)
+        with self._lock:
+            self._indexes[model] = index
+            self._save(model)
+            # Deltas written before the build started are already part of it
+            self._applied[model] = set()
+            self._remove_deltas(model, [name for name in self._delta_names(model) if name < f"{started:020d}"])
+            self._apply_deltas(model)
+        return index
+
+    def replace_transcript(self, model: str, transcript_id: int, ids: Sequence[int], vectors: np.ndarray):
+        """Records a re-processed transcript's vectors as a delta, if an index exists."""
+        with self._lock:
+            path = self._path(model)
+            if self.enabled and os.path.exists(path):
+                self._write_delta(path, transcript_id, ids, vectors)
+
+    def remove_transcript(self, transcript_id: int):
+        """Records the removal in every persisted index of the active backend, without loading them."""
+        if not self.enabled or not os.path.isdir(self.index_dir):
+            return
+        with self._lock:
+            for name in os.listdir(self.index_dir):
+                if name.startswith(f"{self.backend}-") and name.endswith(".npz"):
+                    self._write_delta(os.path.join(self.index_dir, name), transcript_id, [], np.empty((0, 0)))
+
+    def _load(self, model: str):
+        path = self._path(model)
+        self._applied[model] = set()
+        try:
+            self._snapshot_mtimes[model] = os.stat(path).st_mtime_ns
+            self._indexes[model] = BACKENDS[self.backend].load(path)
+        except FileNotFoundError:
+            self._snapshot_mtimes[model] = None
+            self._indexes[model] = None
+            return
+        self._apply_deltas(model)
+
+    def _delta_names(self, model: str):
+        delta_dir = self._delta_dir(self._path(model))
+        if not os.path.isdir(delta_dir):
+            return []
+        return sorted(name for name in os.listdir(delta_dir) if name.endswith(".npz"))
+
+    def _write_delta(self, path: str, transcript_id: int, ids: Sequence[int], vectors: np.ndarray):
+        delta_dir = self._delta_dir(path)
+        os.makedirs(delta_dir, exist_ok=True)
+        # Names sort by creation time, so every worker applies the deltas in the same order
+        name = f"{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}.npz"
+        tmp = os.path.join(delta_dir, f".{name}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, transcript_id=transcript_id, ids=np.asarray(ids, dtype=np.int64),
+                     vecs=np.asarray(vectors, dtype=EMBEDDING_DTYPE))
+        os.replace(tmp, os.path.join(delta_dir, name))
+
+    def _apply_deltas(self, model: str):
+        index, applied = self._indexes[model], self._applied[model]
+        delta_dir = self._delta_dir(self._path(model))
+        for name in self._delta_names(model):
+            if name in applied:
+                continue
+            try:
+                with np.load(os.path.join(delta_dir, name)) as data:
+                    transcript_id, ids, vecs = int(data["transcript_id"]), data["ids"], data["vecs"]
+            except FileNotFoundError:
+                continue  # Folded into a newer snapshot, which the next refresh loads
+            index.remove_transcripts([transcript_id])
+            if len(ids):
+                index.add(ids, [transcript_id] * len(ids), vecs)
+            applied.add(name)
+        if len(applied) >= self.compact_after and model not in self._compacting:
+            self._compacting.add(model)
+            threading.Thread(target=self._compact, args=(model,), daemon=True).start()
+
+    def _compact(self, model: str):
+        """Writes a new snapshot with every applied delta folded in, then deletes those deltas."""
+        lock_path = f"{self._path(model)}.lock"
+        try:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                # Another worker is compacting; a lock left behind by a crashed one expires
+                if time.time() - os.path.getmtime(lock_path) > 600:
+                    os.remove(lock_path)
+                return
+            try:
+                with self._lock:
+                    if self.refresh(model) is None:
+                        return
+                    folded = set(self._applied[model])
+                    self._save(model)
+                    self._remove_deltas(model, folded)
+            finally:
+                os.close(fd)
+                os.remove(lock_path)
+        except OSError as e:
+            print(f"Error compacting the ANN index for '{model}': {e}")
+        finally:
+            self._compacting.discard(model)
+
+    def _remove_deltas(self, model: str, names: Iterable[str]):
+        delta_dir = self._delta_dir(self._path(model))
+        for name in names:
+            try:
+                os.remove(os.path.join(delta_dir, name))
+            except FileNotFoundError:
+                pass
+            self._applied[model].discard(name)
+
+    def _save(self, model: str):
+        os.makedirs(self.index_dir, exist_ok=True)
+        path = self._path(model)
+        tmp = f"{path}.tmp"
+        self._indexes[model].save(tmp)
+        if os.path.exists(f"{tmp}.bin"):
+            os.replace(f"{tmp}.bin", f"{path}.bin")
+        os.replace(tmp, path)
+        self._snapshot_mtimes[model] = os.stat(path).st_mtime_ns
+
+
+ann_manager = AnnIndexManager()
@@ -0,0 +1,56 @@
+# backend/bulk.py
+"""
+Bulk persistence for large numbers of generated rows (codes, chunks).
+
+Rows are plain dicts written with executemany INSERTs of BULK_INSERT_BATCH_SIZE
+rows, skipping the ORM unit of work. With `commit=True` every batch is committed,
+so work that fails half-way keeps everything written before the failure.
+"""
+import os
+from typing import Iterable
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+
+class BulkInserter:
+    def __init__(self, db: Session, model, batch_size: int = None, commit: bool = True):
+        self.db = db
+        self.model = model
+        self.batch_size = batch_size or int(os.getenv("BULK_INSERT_BATCH_SIZE") or 1000)
+        self.commit = commit
+        self.inserted = 0
+        self._pending = []
+
+    def add(self, row: dict):
+        self._pending.append(row)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def extend(self, rows: Iterable[dict]):
+        for row in rows:
+            self.add(row)
+
+    def flush(self):
+        """Writes (and, with commit=True, commits) the buffered rows."""
+        if self._pending:
+            self.db.execute(insert(self.model), self._pending)
+            self.inserted += len(self._pending)
+            self._pending = []
+        if self.commit:
+            self.db.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None or self.commit:
+            # On failure, keep what was buffered before it (only meaningful with periodic commits)
+            try:
+                self.flush()
+            except Exception as flush_error:
+                self.db.rollback()
+                if exc_type is None:
+                    raise
+                print(f"Could not save buffered {self.model.__tablename__} rows after a failure: {flush_error}")
+        return False
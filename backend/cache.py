@@ -0,0 +1,188 @@
+# backend/cache.py
+"""
+Persistent, content-addressed caches for paid API calls (embeddings and LLM
+responses), each stored in a small SQLite file separate from the main database so
+they survive transcript deletes and can be wiped independently.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Sequence
+
+from backend.vectors import pack_embedding, unpack_embedding
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.strip().split())
+
+
+class _SQLiteStore:
+    """Per-thread SQLite connections plus hit/miss counters shared by the caches below."""
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path) and self.max_entries > 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._create(conn)
+            self._local.conn = conn
+        return conn
+
+    def _create(self, conn: sqlite3.Connection):
+        raise NotImplementedError
+
+    def _count(self, hits: int, misses: int):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def _maybe_evict(self, table: str, added: int):
+        """Trims the least recently used rows once the table grows past max_entries (checked every ~1%)."""
+        with self._lock:
+            self._puts_since_evict += added
+            if self._puts_since_evict < max(1, self.max_entries // 100):
+                return
+            self._puts_since_evict = 0
+        conn = self._conn()
+        excess = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(f"DELETE FROM {table} WHERE key IN "
+                         f"(SELECT key FROM {table} ORDER BY last_used LIMIT ?)", (excess,))
+            with self._lock:
+                self.evictions += excess
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class EmbeddingCache(_SQLiteStore):
+    """Maps hash(normalized text, embed model) -> float32 embedding, with LRU eviction."""
+
+    def __init__(self, path: str = None, max_entries: int = None):
+        super().__init__(
+            path if path is not None else os.getenv("EMBED_CACHE_PATH", "./embedding_cache.db"),
+            max_entries if max_entries is not None else int(os.getenv("EMBED_CACHE_MAX_ENTRIES") or 500000),
+        )
+
+    def _create(self, conn: sqlite3.Connection):
+        conn.execute("CREATE TABLE IF NOT EXISTS embeddings "
+                     "(key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+
+    @staticmethod
+    def key(text: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\x00{_normalize(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: Sequence[str], model: str) -> List[Optional[list]]:
+        """Returns one cached embedding (or None) per text, in input order."""
+        if not self.enabled or not texts:
+            return [None] * len(texts)
+        keys = [self.key(t, model) for t in texts]
+        conn = self._conn()
+        found = {}
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            placeholders = ",".join("?" * len(part))
+            found.update(conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part))
+            conn.execute(f"UPDATE embeddings SET last_used = ? WHERE key IN ({placeholders})", [time.time(), *part])
+        self._count(hits=sum(k in found for k in keys), misses=sum(k not in found for k in keys))
+        return [unpack_embedding(found[k]).tolist() if k in found else None for k in keys]
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]], model: str):
+        if not self.enabled or not texts:
+            return
+        now = time.time()
+        self._conn().executemany(
+            "INSERT OR REPLACE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+            [(self.key(t, model), model, pack_embedding(v), now) for t, v in zip(texts, vectors)],
+        )
+        self._maybe_evict("embeddings", len(texts))
+
+    def stats(self) -> dict:
+        return dict(super().stats(), max_entries=self.max_entries)
+
+
+embedding_cache = EmbeddingCache()
+
+
+class ResponseCache(_SQLiteStore):
+    """
+    Maps hash(model, system prompt, user prompt, response_format) -> completion text,
+    with a TTL and LRU eviction past max_entries.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = None, ttl_seconds: float = None):
+        super().__init__(
+            path if path is not None else os.getenv("LLM_CACHE_PATH", "./llm_cache.db"),
+            max_entries if max_entries is not None else int(os.getenv("LLM_CACHE_MAX_ENTRIES") or 100000),
+        )
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("LLM_CACHE_TTL") or 7 * 24 * 3600)
+
+    def _create(self, conn: sqlite3.Connection):
+        conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, model TEXT NOT NULL, "
+                     "content TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_last_used ON responses (last_used)")
+
+    @staticmethod
+    def key(model: str, system: str, user: str, response_format: Optional[dict] = None) -> str:
+        payload = json.dumps([model, system, user, response_format], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        conn = self._conn()
+        row = conn.execute("SELECT content, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or now - row[1] > self.ttl_seconds:
+            if row is not None:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._count(hits=0, misses=1)
+            return None
+        conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        self._count(hits=1, misses=0)
+        return row[0]
+
+    def put(self, key: str, model: str, content: str):
+        if not self.enabled:
+            return
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO responses (key, model, content, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+            (key, model, content, now, now),
+        )
+        self._maybe_evict("responses", 1)
+
+    def stats(self) -> dict:
+        return dict(super().stats(), max_entries=self.max_entries, ttl_seconds=self.ttl_seconds)
+
+
+response_cache = ResponseCache()
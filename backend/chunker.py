@@ -0,0 +1,191 @@
+# backend/chunker.py
+"""
+Token-aware streaming chunker.
+
+Text is split into segments at speaker turns, line breaks and sentence ends (Latin
+and CJK punctuation). Segments are packed into chunks of at most CHUNK_TOKENS
+tokens, preferring to cut at a speaker turn, with roughly `overlap_ratio` of the
+previous chunk's trailing sentences repeated at the start of the next one.
+Offsets are exact character positions in the source text.
+
+Tokens are counted with tiktoken when it is installed, otherwise with a heuristic
+that counts each CJK character as one token and ~4 characters per token elsewhere.
+Set CHUNK_TOKENIZER=heuristic to force the fallback.
+"""
+import hashlib
+import math
+import os
+import re
+import time
+from typing import Iterable, Iterator, List, NamedTuple, Tuple
+
+from backend import metrics
+
+# A segment ends after sentence punctuation (plus closing quotes/brackets and spaces) or a run of newlines.
+_SEGMENT_END = re.compile(r"[.!?\u3002\uff01\uff1f\u2026\uff1b;]+[\"'\u201d\u2019\u300d\u300f)\]\uff09]*[ \t]*\n*|\n+")
+# "Interviewer:", "Alex:", "受访者：" ... at the start of a line marks a new speaker turn.
+_SPEAKER_TURN = re.compile(r"\s*[\w\u3400-\u9fff .'\-()\uff08\uff09]{1,40}[:\uff1a]")
+_CJK = re.compile(r"[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+
+
+class HeuristicTokenizer:
+    name = "heuristic"
+
+    def count(self, text: str) -> int:
+        cjk = len(_CJK.findall(text))
+        return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+class TiktokenTokenizer:
+    name = "tiktoken"
+
+    def __init__(self, encoding: str = None):
+        import tiktoken  # Optional dependency
+
+        self._encoding = tiktoken.get_encoding(encoding or os.getenv("CHUNK_TIKTOKEN_ENCODING") or "cl100k_base")
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+_default_tokenizer = None
+
+
+def get_tokenizer():
+    """The process-wide tokenizer selected by CHUNK_TOKENIZER ("tiktoken" or "heuristic")."""
+    global _default_tokenizer
+    if _default_tokenizer is None:
+        if (os.getenv("CHUNK_TOKENIZER") or "tiktoken") == "tiktoken":
+            try:
+                _default_tokenizer = TiktokenTokenizer()
+            except ImportError:
+                _default_tokenizer = HeuristicTokenizer()
+        else:
+            _default_tokenizer = HeuristicTokenizer()
+    return _default_tokenizer
+
+
+def normalize_text(s: str):
+    return " ".join(s.strip().split())
+
+
+def content_hash(text: str) -> str:
+    """Identity of a (normalized) chunk's content, used to reuse embeddings across re-processing."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class _Segment(NamedTuple):
+    start: int
+    end: int
+    text: str
+    tokens: int
+    turn_start: bool
+
+
+def _split_oversized(segment: _Segment, max_tokens: int, tokenizer) -> List[_Segment]:
+    """Hard-splits a single sentence longer than max_tokens into roughly equal pieces."""
+    pieces = math.ceil(segment.tokens / max_tokens)
+    step = math.ceil(len(segment.text) / pieces)
+    out = []
+    for i in range(0, len(segment.text), step):
+        text = segment.text[i:i + step]
+        out.append(_Segment(segment.start + i, segment.start + i + len(text), text, tokenizer.count(text),
+                            segment.turn_start and i == 0))
+    return out
+
+
+def _iter_segments(pieces: Iterable[str], max_tokens: int, tokenizer) -> Iterator[_Segment]:
+    buffer, offset = "", 0  # offset = absolute position of buffer[0]
+    line_start = True  # whether buffer[0] begins a new line
+    for piece in pieces:
+        buffer += piece
+        last = 0
+        for match in _SEGMENT_END.finditer(buffer):
+            if match.end() == len(buffer):
+                break  # Might continue in the next piece (e.g. more newlines or closing quotes)
+            yield from _make_segments(buffer[last:match.end()], offset + last, line_start, max_tokens, tokenizer)
+            line_start = buffer[match.end() - 1] == "\n"
+            last = match.end()
+        buffer, offset = buffer[last:], offset + last
+        if len(buffer) > max_tokens * 16:
+            # No boundary for a long stretch; emit what we have rather than buffering without bound.
+            yield from _make_segments(buffer, offset, line_start, max_tokens, tokenizer)
+            line_start = buffer[-1] == "\n"
+            buffer, offset = "", offset + len(buffer)
+    if buffer:
+        yield from _make_segments(buffer, offset, line_start, max_tokens, tokenizer)
+
+
+def _make_segments(text: str, start: int, line_start: bool, max_tokens: int, tokenizer):
+    if not text.strip():
+        return
+    segment = _Segment(start, start + len(text), text, tokenizer.count(text),
+                       line_start and bool(_SPEAKER_TURN.match(text)))
+    if segment.tokens > max_tokens:
+        yield from _split_oversized(segment, max_tokens, tokenizer)
+    else:
+        yield segment
+
+
+def iter_chunks(pieces: Iterable[str], max_tokens: int = None, overlap_ratio: float = 0.1,
+                tokenizer=None) -> Iterator[Tuple[int, int, str]]:
+    """
+    Yields (start, end, normalized_text) chunks from an iterable of text pieces (file
+    blocks, paragraphs, ...), reading it only once and holding at most ~one chunk.
+    """
+    # ✨ Chunks, characters and the time spent producing them are exported at /metrics
+    chunks = _pack_chunks(pieces, max_tokens, overlap_ratio, tokenizer)
+    while True:
+        start = time.perf_counter()
+        chunk = next(chunks, None)
+        metrics.CHUNKER_SECONDS.inc(time.perf_counter() - start)
+        if chunk is None:
+            return
+        metrics.CHUNKER_CHUNKS.inc()
+        metrics.CHUNKER_CHARS.inc(len(chunk[2]))
+        yield chunk
+
+
+def _pack_chunks(pieces: Iterable[str], max_tokens: int, overlap_ratio: float, tokenizer):
+    if max_tokens is None:
+        max_tokens = int(os.getenv("CHUNK_TOKENS") or 400)
+    tokenizer = tokenizer or get_tokenizer()
+    overlap_tokens = int(max_tokens * overlap_ratio)
+
+    current: List[_Segment] = []
+    current_tokens = 0
+    n_overlap = 0  # leading segments of `current` that were already emitted (overlap context)
+    for segment in _iter_segments(pieces, max_tokens, tokenizer):
+        while current and current_tokens + segment.tokens > max_tokens:
+            if n_overlap:
+                # Drop carried-over context first; it has already been emitted once.
+                current_tokens -= current.pop(0).tokens
+                n_overlap -= 1
+                continue
+            # Prefer cutting right before the last speaker turn in the second half of the chunk.
+            cut = len(current)
+            for i in range(len(current) - 1, len(current) // 2, -1):
+                if current[i].turn_start:
+                    cut = i
+                    break
+            emitted, rest = current[:cut], current[cut:]
+            yield emitted[0].start, emitted[-1].end, normalize_text("".join(s.text for s in emitted))
+
+            overlap, overlap_total = [], 0
+            for s in reversed(emitted[1:]):
+                if overlap_total + s.tokens > overlap_tokens:
+                    break
+                overlap.insert(0, s)
+                overlap_total += s.tokens
+            current, n_overlap = overlap + rest, len(overlap)
+            current_tokens = sum(s.tokens for s in current)
+        current.append(segment)
+        current_tokens += segment.tokens
+    if len(current) > n_overlap:
+        yield current[0].start, current[-1].end, normalize_text("".join(s.text for s in current))
+
+
+def read_text_blocks(path, block_chars: int = 64 * 1024) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        while block := f.read(block_chars):
+            yield block
@@ -0,0 +1,79 @@
+# backend/clients.py
+"""
+A small registry of reusable OpenAI clients, so HTTP keep-alive connections and
+TLS sessions survive across requests instead of being rebuilt for every call.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import httpx
+import openai
+from openai import OpenAI
+
+
+class OpenAIClientPool:
+    """
+    Caches one OpenAI client (and its httpx connection pool) per (api_key hash, base_url).
+    Bounded by `max_clients` (LRU), and clients not handed out for `idle_seconds` are
+    dropped. Dropped clients are never closed by the pool: a long job may still hold
+    one, and it is closed once unreferenced.
+    """
+
+    def __init__(self, max_clients: int = None, idle_seconds: float = None, max_connections: int = None):
+        self.max_clients = max_clients or int(os.getenv("OPENAI_CLIENT_POOL_SIZE") or 8)
+        self.idle_seconds = idle_seconds or float(os.getenv("OPENAI_CLIENT_IDLE_SECONDS") or 300)
+        self.max_connections = max_connections or int(os.getenv("OPENAI_MAX_CONNECTIONS") or 64)
+        self._clients = OrderedDict()  # key -> (client, last_used)
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    @staticmethod
+    def _key(api_key: str, base_url: Optional[str]):
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest(), base_url or ""
+
+    def _create(self, api_key: str, base_url: Optional[str]) -> OpenAI:
+        http_client = openai.DefaultHttpxClient(limits=httpx.Limits(
+            max_connections=self.max_connections, max_keepalive_connections=self.max_connections,
+        ))
+        return OpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+
+    def get(self, api_key: str, base_url: Optional[str] = None) -> OpenAI:
+        key = self._key(api_key, base_url)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._clients.get(key)
+            if entry is not None:
+                self._clients[key] = (entry[0], now)
+                self._clients.move_to_end(key)
+                self.reused += 1
+                return entry[0]
+            client = self._create(api_key, base_url)
+            self._clients[key] = (client, now)
+            self.created += 1
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+            return client
+
+    def _evict_idle(self, now: float):
+        # Only `get` refreshes last_used, so an "idle" client may still be in use by whoever fetched it
+        for key in [k for k, (_, last_used) in self._clients.items() if now - last_used > self.idle_seconds]:
+            del self._clients[key]
+
+    def close_all(self):
+        with self._lock:
+            for client, _ in self._clients.values():
+                client.close()
+            self._clients.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"clients": len(self._clients), "created": self.created, "reused": self.reused}
+
+
+client_pool = OpenAIClientPool()
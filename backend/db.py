@@ -6,12 +6,52 @@
 # @Project : QualiAgent
 
 # backend/db.py
-from sqlalchemy import create_engine
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import declarative_base, sessionmaker
 
-DATABASE_URL = "sqlite:///./data.db"
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite:///./data.db"
+
+# ✨ SQLite connection profile, applied to every new connection. WAL lets searches read
+# while ingestion writes; busy_timeout makes writers wait for the lock instead of failing.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE") or "WAL",
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS") or "NORMAL",
+    "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB") or 65536),  # negative = size in KiB
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE_MB") or 256) * 1024 * 1024,
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS") or 30000),
+}
+
+
+def create_db_engine(url: str = DATABASE_URL, pragmas: dict = None, **kwargs):
+    """Creates the engine with the SQLite pragmas (if any) and a pool sized for FastAPI's threadpool."""
+    if not url.startswith("sqlite"):
+        kwargs.setdefault("pool_size", int(os.getenv("DB_POOL_SIZE") or 10))
+        kwargs.setdefault("max_overflow", int(os.getenv("DB_MAX_OVERFLOW") or 30))
+        kwargs.setdefault("pool_pre_ping", True)
+        return create_engine(url, **kwargs)
+
+    if url not in ("sqlite://", "sqlite:///:memory:"):
+        kwargs.setdefault("pool_size", int(os.getenv("DB_POOL_SIZE") or 10))
+        kwargs.setdefault("max_overflow", int(os.getenv("DB_MAX_OVERFLOW") or 30))
+    new_engine = create_engine(url, connect_args={"check_same_thread": False}, **kwargs)
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+
+    @event.listens_for(new_engine, "connect")
+    def _apply_pragmas(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return new_engine
+
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_db_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
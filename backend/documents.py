@@ -0,0 +1,98 @@
+# backend/documents.py
+"""
+Streaming readers for uploaded transcript files.
+
+DOCX files are read straight from the zip archive: the main document part is
+parsed incrementally with ElementTree.iterparse, and each top-level paragraph is
+yielded and discarded, so memory stays bounded by the largest paragraph. The
+text matches "\\n".join(p.text for p in Document(path).paragraphs) from
+python-docx, which keeps chunk offsets and the transcript view consistent.
+"""
+import posixpath
+import xml.etree.ElementTree as ET
+import zipfile
+from typing import Iterator
+
+from backend.chunker import read_text_blocks
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_BODY, _P, _R, _HYPERLINK = _W + "body", _W + "p", _W + "r", _W + "hyperlink"
+_T, _TAB, _PTAB, _BR, _CR, _NO_BREAK_HYPHEN = _W + "t", _W + "tab", _W + "ptab", _W + "br", _W + "cr", _W + "noBreakHyphen"
+_BR_TYPE = _W + "type"
+_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+_OFFICE_DOCUMENT = "/officeDocument"
+
+
+def _main_document_part(archive: zipfile.ZipFile) -> str:
+    """Resolves the main document part from the package relationships (normally word/document.xml)."""
+    try:
+        rels = ET.fromstring(archive.read("_rels/.rels"))
+    except KeyError:
+        return "word/document.xml"
+    for rel in rels.iter(_REL):
+        if rel.get("Type", "").endswith(_OFFICE_DOCUMENT):
+            return posixpath.normpath(rel.get("Target").lstrip("/"))
+    return "word/document.xml"
+
+
+def _run_text(run) -> str:
+    parts = []
+    for el in run:
+        tag = el.tag
+        if tag == _T:
+            parts.append(el.text or "")
+        elif tag in (_TAB, _PTAB):
+            parts.append("\t")
+        elif tag == _BR:
+            # Only line breaks become text; page and column breaks are dropped (as in python-docx)
+            if el.get(_BR_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag == _CR:
+            parts.append("\n")
+        elif tag == _NO_BREAK_HYPHEN:
+            parts.append("-")
+    return "".join(parts)
+
+
+def _paragraph_text(paragraph) -> str:
+    parts = []
+    for child in paragraph:
+        if child.tag == _R:
+            parts.append(_run_text(child))
+        elif child.tag == _HYPERLINK:
+            parts.extend(_run_text(run) for run in child.iter(_R))
+    return "".join(parts)
+
+
+def iter_docx_paragraphs(path) -> Iterator[str]:
+    """Yields the text of each top-level body paragraph of a .docx file, in order."""
+    with zipfile.ZipFile(path) as archive:
+        with archive.open(_main_document_part(archive)) as xml:
+            body, depth = None, 0
+            for event, elem in ET.iterparse(xml, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if depth == 2 and elem.tag == _BODY:
+                        body = elem
+                    continue
+                depth -= 1
+                if depth == 2 and body is not None:
+                    # A direct child of <w:body> is complete; tables and section properties are skipped
+                    if elem.tag == _P:
+                        yield _paragraph_text(elem)
+                    body.clear()
+
+
+def iter_docx_text(path) -> Iterator[str]:
+    """Yields newline-joined paragraph text pieces, suitable for the chunker."""
+    first = True
+    for paragraph in iter_docx_paragraphs(path):
+        yield paragraph if first else "\n" + paragraph
+        first = False
+
+
+def iter_document_text(path) -> Iterator[str]:
+    """Yields the text of a transcript file in pieces, whatever its format."""
+    if str(path).lower().endswith(".docx"):
+        return iter_docx_text(path)
+    return read_text_blocks(path)
@@ -0,0 +1,209 @@
+# backend/jobs.py
+"""
+Background job subsystem for long-running AI work (transcript processing, code
+generation, memo generation). Submitting returns immediately with a job id; a
+bounded thread pool runs the jobs and their state is persisted in the `jobs` table.
+
+A job runs in the API worker process that accepted it, but other workers only rely
+on its row: the owning process keeps `heartbeat_at` fresh, so a job is failed only
+once its process has died (by any live worker), and cancelling sets the row's
+`cancel_requested` flag, so any worker can cancel it.
+"""
+import datetime
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from backend import schemas, services
+from backend.db import SessionLocal
+from backend.models import Job
+
+ACTIVE_STATES = ("queued", "running")
+
+
+class JobCancelled(services.Cancelled):
+    pass
+
+
+def _now():
+    return datetime.datetime.now(datetime.UTC)
+
+
+def _run_process_ai(db: Session, transcript_id: int, config, progress, bypass_cache: bool):
+    return services.process_transcript_for_ai(db, transcript_id, config=config, progress=progress)
+
+
+def _run_codes(db: Session, transcript_id: int, config, progress, bypass_cache: bool):
+    result = services.generate_and_save_codes(db, transcript_id, config=config, progress=progress,
+                                              bypass_cache=bypass_cache)
+    if "error" in result:
+        raise ValueError(result["error"])
+    return result
+
+
+def _run_memo(db: Session, transcript_id: int, config, progress, bypass_cache: bool):
+    memo = services.create_memo_from_ai(db, transcript_id, config=config, progress=progress, bypass_cache=bypass_cache)
+    if not memo:
+        raise ValueError("Failed to save AI memo.")
+    return {"memo_id": memo.id, "title": memo.title}
+
+
+JOB_KINDS = {"process-ai": _run_process_ai, "codes": _run_codes, "memo": _run_memo}
+
+
+class JobRunner:
+    """Runs jobs on a pool capped at JOB_MAX_CONCURRENCY concurrent jobs per API worker."""
+
+    def __init__(self, max_workers: int = None, heartbeat_seconds: float = None, stale_seconds: float = None):
+        self.max_workers = max_workers or int(os.getenv("JOB_MAX_CONCURRENCY") or 2)
+        self.heartbeat_seconds = heartbeat_seconds or float(os.getenv("JOB_HEARTBEAT_SECONDS") or 15)
+        # A job is given up on after missing a few heartbeats
+        self.stale_seconds = stale_seconds or float(os.getenv("JOB_STALE_SECONDS") or 4 * self.heartbeat_seconds)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        self._owned = set()  # ids of this process's queued and running jobs
+        self._lock = threading.Lock()
+        self._heartbeat = None
+
+    def submit(self, db: Session, kind: str, transcript_id: int, config: Optional[schemas.AIConfig] = None,
+               bypass_cache: bool = False) -> Job:
+        return self.submit_many(db, kind, [transcript_id], config=config, bypass_cache=bypass_cache)[0]
+
+    def submit_many(self, db: Session, kind: str, transcript_ids: List[int],
+                    config: Optional[schemas.AIConfig] = None, bypass_cache: bool = False) -> List[Job]:
+        """Queues one job per transcript with a single commit; the pool still runs at most max_workers at once."""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind '{kind}'.")
+        queued = [Job(id=uuid.uuid4().hex, kind=kind, transcript_id=transcript_id, status="queued", progress=0.0,
+                      heartbeat_at=_now()) for transcript_id in transcript_ids]
+        job_ids = [job.id for job in queued]
+        db.add_all(queued)
+        db.commit()
+        # Reload all rows in one query rather than refreshing each expired instance
+        db.query(Job).filter(Job.id.in_(job_ids)).all()
+        self.start_heartbeat()
+        with self._lock:
+            self._owned.update(job_ids)
+        for job_id, transcript_id in zip(job_ids, transcript_ids):
+            self._pool.submit(self._run, job_id, kind, transcript_id, config, bypass_cache)
+        return queued
+
+    def cancel(self, db: Session, job_id: str) -> Optional[Job]:
+        """Queued jobs are cancelled immediately; running jobs stop at their next progress update."""
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if not job or job.status not in ACTIVE_STATES:
+            return job
+        job.cancel_requested = True
+        if job.status == "queued":
+            job.status, job.finished_at = "cancelled", _now()
+        db.commit()
+        db.refresh(job)
+        return job
+
+    def _update(self, job_id: str, *conditions, **fields) -> bool:
+        """
+        Writes job state with its own short-lived session, separate from the job's work session.
+        Returns False if no row matched `conditions`.
+        """
+        db = SessionLocal()
+        try:
+            updated = db.query(Job).filter(Job.id == job_id, *conditions).update(fields)
+            db.commit()
+            return updated > 0
+        finally:
+            db.close()
+
+    def start_heartbeat(self):
+        """Starts the thread that keeps this process's jobs alive and fails those of dead processes."""
+        with self._lock:
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._beat, name="job-heartbeat", daemon=True)
+                self._heartbeat.start()
+
+    def _beat(self):
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            with self._lock:
+                owned = list(self._owned)
+            db = SessionLocal()
+            try:
+                if owned:
+                    db.query(Job).filter(Job.id.in_(owned)).update({"heartbeat_at": _now()},
+                                                                   synchronize_session=False)
+                    db.commit()
+                fail_stale_jobs(db, self.stale_seconds)
+            except Exception as e:
+                db.rollback()
+                print(f"Could not record the job heartbeat: {e}")
+            finally:
+                db.close()
+
+    def _run(self, job_id: str, kind: str, transcript_id: int, config, bypass_cache: bool):
+        try:
+            # Claim the job unless it was cancelled (or given up on) while queued
+            if self._update(job_id, Job.status == "queued", Job.cancel_requested.is_(False),
+                            status="running", started_at=_now(), heartbeat_at=_now()):
+                self._execute(job_id, kind, transcript_id, config, bypass_cache)
+        finally:
+            with self._lock:
+                self._owned.discard(job_id)
+
+    def _execute(self, job_id: str, kind: str, transcript_id: int, config, bypass_cache: bool):
+        def progress(fraction: float):
+            try:
+                recorded = self._update(job_id, Job.cancel_requested.is_(False),
+                                        progress=round(fraction, 4), heartbeat_at=_now())
+            except Exception as e:
+                print(f"Could not record progress for job {job_id}: {e}")
+                return
+            if not recorded:
+                raise JobCancelled()
+
+        db = SessionLocal()
+        try:
+            result = JOB_KINDS[kind](db, transcript_id, config, progress, bypass_cache)
+            self._update(job_id, status="done", progress=1.0, result=json.dumps(result), finished_at=_now())
+        except JobCancelled:
+            db.rollback()
+            self._update(job_id, status="cancelled", finished_at=_now())
+        except Exception as e:
+            db.rollback()
+            print(f"Job {job_id} ({kind}) failed: {e}")
+            self._update(job_id, status="failed", error=str(e), finished_at=_now())
+        finally:
+            db.close()
+
+
+def fail_stale_jobs(db: Session, stale_seconds: float) -> int:
+    """Marks queued/running jobs whose heartbeat is older than `stale_seconds` (their process stopped) as failed."""
+    cutoff = _now() - datetime.timedelta(seconds=stale_seconds)
+    count = db.query(Job).filter(
+        Job.status.in_(ACTIVE_STATES), or_(Job.heartbeat_at.is_(None), Job.heartbeat_at < cutoff)
+    ).update(
+        {"status": "failed", "error": "Interrupted: the server process running it stopped.", "finished_at": _now()},
+        synchronize_session=False,
+    )
+    db.commit()
+    return count
+
+
+def get_job(db: Session, job_id: str) -> Optional[Job]:
+    return db.query(Job).filter(Job.id == job_id).first()
+
+
+def list_jobs(db: Session, status: Optional[str] = None, transcript_id: Optional[int] = None, limit: int = 50):
+    query = db.query(Job)
+    if status:
+        query = query.filter(Job.status == status)
+    if transcript_id is not None:
+        query = query.filter(Job.transcript_id == transcript_id)
+    return query.order_by(Job.created_at.desc()).limit(limit).all()
+
+
+job_runner = JobRunner()
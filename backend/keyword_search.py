@@ -0,0 +1,113 @@
+# backend/keyword_search.py
+"""
+Keyword search over chunk text and rank fusion with vector search.
+
+On SQLite, chunks are indexed by the `chunks_fts` FTS5 table (created and kept in
+sync by triggers, see backend/migrations.py) and ranked with BM25. The trigram
+tokenizer matches substrings, so exact phrases, participant names and CJK text
+work without word segmentation; terms shorter than three characters fall back to a
+LIKE scan. On PostgreSQL, an (unindexed) `simple` text-search query is used.
+"""
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# "quoted phrases" or bare terms
+_TERM = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def create_chunk_fts(conn):
+    """
+    Creates the `chunks_fts` FTS5 table over chunks.text (external content, so the text is
+    not stored twice) and the triggers that keep it in sync on insert, delete and text updates.
+    """
+    tokenizer = os.getenv("FTS_TOKENIZER") or "trigram"
+    try:
+        conn.execute(text("SAVEPOINT create_fts"))
+        conn.execute(text(f"CREATE VIRTUAL TABLE chunks_fts USING fts5("
+                          f"text, content='chunks', content_rowid='id', tokenize='{tokenizer}')"))
+        conn.execute(text("RELEASE create_fts"))
+    except Exception as e:
+        # trigram needs SQLite 3.34+; fall back to word tokens
+        conn.execute(text("ROLLBACK TO create_fts"))
+        print(f"Could not create FTS5 index with tokenizer '{tokenizer}' ({e}); using unicode61.")
+        conn.execute(text("CREATE VIRTUAL TABLE chunks_fts USING fts5("
+                          "text, content='chunks', content_rowid='id', tokenize='unicode61')"))
+    conn.execute(text(
+        "CREATE TRIGGER chunks_fts_ai AFTER INSERT ON chunks BEGIN "
+        "INSERT INTO chunks_fts(rowid, text) VALUES (new.id, new.text); END"))
+    conn.execute(text(
+        "CREATE TRIGGER chunks_fts_ad AFTER DELETE ON chunks BEGIN "
+        "INSERT INTO chunks_fts(chunks_fts, rowid, text) VALUES ('delete', old.id, old.text); END"))
+    conn.execute(text(
+        "CREATE TRIGGER chunks_fts_au AFTER UPDATE OF text ON chunks BEGIN "
+        "INSERT INTO chunks_fts(chunks_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+        "INSERT INTO chunks_fts(rowid, text) VALUES (new.id, new.text); END"))
+
+
+def parse_terms(query: str) -> List[str]:
+    return [(phrase or word).strip() for phrase, word in _TERM.findall(query) if (phrase or word).strip()]
+
+
+def _fts_query(terms: Sequence[str]) -> str:
+    """Quotes each term as an FTS5 phrase (no operator syntax from user input) and ORs them."""
+    return " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _transcript_filter(transcript_ids: Optional[Sequence[int]], processed_only: bool) -> str:
+    conditions = []
+    if processed_only:
+        conditions.append("c.transcript_id IN (SELECT id FROM transcripts WHERE status = 'processed')")
+    if transcript_ids:
+        conditions.append(f"c.transcript_id IN ({', '.join(str(int(t)) for t in transcript_ids)})")
+    return "".join(f" AND {c}" for c in conditions)
+
+
+def search(db: Session, query: str, top_k: int, transcript_ids: Optional[Sequence[int]] = None,
+           processed_only: bool = True) -> List[Tuple[int, float]]:
+    """Returns [(chunk_id, score)] best first; higher scores are better (negated BM25 on SQLite)."""
+    terms = parse_terms(query)
+    if not terms:
+        return []
+    where = _transcript_filter(transcript_ids, processed_only)
+    if db.get_bind().dialect.name == "postgresql":
+        rows = db.execute(text(
+            "SELECT c.id, ts_rank(to_tsvector('simple', c.text), plainto_tsquery('simple', :q)) AS score "
+            "FROM chunks c WHERE to_tsvector('simple', c.text) @@ plainto_tsquery('simple', :q)"
+            f"{where} ORDER BY score DESC, c.id LIMIT :k"
+        ), {"q": " ".join(terms), "k": int(top_k)}).all()
+        return [(int(r.id), float(r.score)) for r in rows]
+
+    indexed = [t for t in terms if len(t) >= 3]
+    if indexed:
+        rows = db.execute(text(
+            "SELECT c.id, -bm25(chunks_fts) AS score FROM chunks_fts JOIN chunks c ON c.id = chunks_fts.rowid "
+            f"WHERE chunks_fts MATCH :q{where} ORDER BY bm25(chunks_fts), c.id LIMIT :k"
+        ), {"q": _fts_query(indexed), "k": int(top_k)}).all()
+    else:
+        # Trigram indexes need 3+ characters (e.g. two-character CJK names): count matching terms instead
+        params = {f"t{i}": f"%{t}%" for i, t in enumerate(terms)}
+        matches = " + ".join(f"(c.text LIKE :t{i})" for i in range(len(terms)))
+        rows = db.execute(text(
+            f"SELECT c.id, {matches} AS score FROM chunks c WHERE ({matches.replace(' + ', ' OR ')}){where} "
+            "ORDER BY score DESC, c.id LIMIT :k"
+        ), dict(params, k=int(top_k))).all()
+    return [(int(r.id), float(r.score)) for r in rows]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Tuple[int, float]]], top_k: int,
+                           k: int = None) -> List[Tuple[int, float]]:
+    """
+    Fuses ranked (chunk_id, score) lists: score(d) = sum over lists of 1 / (k + rank of d).
+    Only ranks matter, so BM25 and cosine scores need no normalization.
+    """
+    if k is None:
+        k = int(os.getenv("HYBRID_RRF_K") or 60)
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, (chunk_id, _) in enumerate(ranking, start=1):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: (-item[1], item[0]))[:top_k]
@@ -1,22 +1,35 @@
 # backend/main.py
+import datetime
 import json
 import os
+import shutil
 import tempfile
 import uuid
+import zipfile
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 from sqlalchemy.orm import Session
 
 from backend import services, schemas
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 import uvicorn
 from backend.db import Base, engine, SessionLocal
+from backend.migrations import run_migrations
+from backend import jobs, metrics
 
 
 # ✨ Create all database tables on startup
 Base.metadata.create_all(bind=engine)
+# ✨ Bring existing databases up to date (new columns, JSON -> float32 embeddings)
+run_migrations(engine)
+# ✨ Jobs cannot survive their process; don't leave them looking "running" forever. Only jobs
+# whose heartbeat stopped are failed, so other live workers keep theirs.
+with SessionLocal() as _db:
+    jobs.fail_stale_jobs(_db, jobs.job_runner.stale_seconds)
+jobs.job_runner.start_heartbeat()
 # ✨ --- 使用绝对路径来定义上传目录 ---
 # 获取当前文件(main.py)的目录，然后回到上一级，即项目根目录
 PROJECT_ROOT = Path(__file__).parent.parent
@@ -24,7 +37,13 @@ UPLOAD_DIR = PROJECT_ROOT / "uploaded_files"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 # ---
 app = FastAPI(title="Qualitative Research Agent API")
-app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"],
+                   expose_headers=["X-Next-Cursor"])
+# ✨ Per-route request metrics, SQL statement metrics and cache gauges, served at /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+if os.getenv("METRICS_DB_QUERIES", "1") != "0":
+    metrics.instrument_engine(engine)
+metrics.register_cache_metrics(services.get_cache_stats)
 
 # --- Dataset & AI Analysis Routes ---
 
@@ -43,38 +62,141 @@ def search(payload: schemas.AISearchRequest, db: Session = Depends(get_db)):
         transcript_id=payload.transcript_id,
         query=payload.query,
         top_k=payload.top_k,
-        config=payload.config
+        config=payload.config,
+        mode=payload.mode
     )
 
 
-@app.post("/memo/preview") # No longer needs ID in path
+@app.post("/search/corpus", response_model=List[schemas.CorpusSearchHit])
+def search_corpus(payload: schemas.CorpusSearchRequest, db: Session = Depends(get_db)):
+    return services.search_corpus(
+        db=db,
+        query=payload.query,
+        top_k=payload.top_k,
+        transcript_ids=payload.transcript_ids,
+        config=payload.config,
+        mode=payload.mode
+    )
+
+
+# ✨ --- Streaming variants: the ranking is sent hit by hit (NDJSON), the memo token by token (SSE) ---
+def _stream_with_session(stream_fn, **kwargs):
+    """Runs a streaming service with its own session, which lives as long as the response body."""
+    db = SessionLocal()
+    try:
+        yield from stream_fn(db, **kwargs)
+    finally:
+        db.close()
+
+
+def _ndjson(hits):
+    try:
+        for hit in hits:
+            yield json.dumps(hit, ensure_ascii=False) + "\n"
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band
+        yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+
+
+def _sse(events):
+    for event, data in events:
+        yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@app.post("/search/stream")
+def stream_search(payload: schemas.AISearchRequest):
+    hits = _stream_with_session(services.iter_search_similar, transcript_id=payload.transcript_id,
+                                query=payload.query, top_k=payload.top_k, config=payload.config, mode=payload.mode)
+    return StreamingResponse(_ndjson(hits), media_type="application/x-ndjson", headers=STREAM_HEADERS)
+
+
+@app.post("/search/corpus/stream")
+def stream_search_corpus(payload: schemas.CorpusSearchRequest):
+    hits = _stream_with_session(services.iter_search_corpus, query=payload.query, top_k=payload.top_k,
+                                transcript_ids=payload.transcript_ids, config=payload.config, mode=payload.mode)
+    return StreamingResponse(_ndjson(hits), media_type="application/x-ndjson", headers=STREAM_HEADERS)
+
+
+@app.post("/search/index/rebuild")
+def rebuild_search_index(embed_model: str = None, db: Session = Depends(get_db)):
+    try:
+        return services.rebuild_ann_index(db=db, embed_model=embed_model)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/memo/preview", response_model=schemas.MemoPreview) # No longer needs ID in path
 def get_ai_memo_preview(payload: schemas.AIGenerateRequest, db: Session = Depends(get_db)):
     formatted_content, memo_json = services.get_formatted_memo_content(
-        db, payload.transcript_id, config=payload.config
+        db, payload.transcript_id, config=payload.config, bypass_cache=payload.bypass_cache
     )
 
     if "error" in memo_json:
         raise HTTPException(500, memo_json["error"])
 
-    return {"id": 0, "title": "AI Generated Preview", "content": formatted_content}
+    # ✨ Keep the preview so saving it doesn't regenerate (and possibly change) the memo
+    preview = services.store_memo_preview(db, payload.transcript_id, formatted_content)
+    return schemas.MemoPreview(preview_id=preview.id, transcript_id=preview.transcript_id,
+                               content=preview.content, expires_at=preview.expires_at)
+
+
+@app.post("/memo/preview/stream")
+def stream_ai_memo_preview(payload: schemas.AIGenerateRequest):
+    events = _stream_with_session(services.stream_memo_preview, transcript_id=payload.transcript_id,
+                                  config=payload.config, bypass_cache=payload.bypass_cache)
+    return StreamingResponse(_sse(events), media_type="text/event-stream", headers=STREAM_HEADERS)
 
 
 # ✨ --- 新增和修改的路由 ---
 @app.post("/memos/ai-generate", response_model=schemas.Memo)
 def generate_and_save_memo(payload: schemas.AIGenerateRequest, db: Session = Depends(get_db)):
     memo = services.create_memo_from_ai(
-        db=db, transcript_id=payload.transcript_id, config=payload.config
+        db=db, transcript_id=payload.transcript_id, config=payload.config, bypass_cache=payload.bypass_cache
     )
     if not memo:
         raise HTTPException(500, "Failed to save AI memo.")
     return memo
 
+@app.post("/memos/from-preview/{preview_id}", response_model=schemas.Memo)
+def save_memo_preview(preview_id: str, db: Session = Depends(get_db)):
+    memo = services.save_memo_from_preview(db, preview_id)
+    if not memo:
+        raise HTTPException(404, "Memo preview not found or expired. Please generate it again.")
+    return memo
+
 @app.post("/codes/ai-generate", response_model=schemas.CodeGenerationResponse) # Assume you create this simple response schema
 def generate_and_save_ai_codes(payload: schemas.AIGenerateRequest, db: Session = Depends(get_db)):
     return services.generate_and_save_codes(
-        db=db, transcript_id=payload.transcript_id, config=payload.config
+        db=db, transcript_id=payload.transcript_id, config=payload.config, bypass_cache=payload.bypass_cache
     )
 
+# ✨ --- Background Job Routes ---
+@app.post("/jobs", response_model=schemas.Job)
+def submit_job(payload: schemas.JobCreate, db: Session = Depends(get_db)):
+    return jobs.job_runner.submit(db, kind=payload.kind, transcript_id=payload.transcript_id, config=payload.config,
+                                  bypass_cache=payload.bypass_cache)
+
+@app.get("/jobs", response_model=List[schemas.Job])
+def get_jobs(status: str = None, transcript_id: int = None, limit: int = 50, db: Session = Depends(get_db)):
+    return jobs.list_jobs(db, status=status, transcript_id=transcript_id, limit=limit)
+
+@app.get("/jobs/{job_id}", response_model=schemas.Job)
+def get_job(job_id: str, db: Session = Depends(get_db)):
+    job = jobs.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/jobs/{job_id}/cancel", response_model=schemas.Job)
+def cancel_job(job_id: str, db: Session = Depends(get_db)):
+    job = jobs.job_runner.cancel(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 # --- Manual CRUD Routes ---
 @app.post("/transcripts/upload", response_model=schemas.Transcript)
 async def handle_transcript_upload(file: UploadFile = File(...), db: Session = Depends(get_db)):
@@ -92,6 +214,59 @@ async def handle_transcript_upload(file: UploadFile = File(...), db: Session = D
         raise HTTPException(status_code=500, detail=f"Failed to upload and process transcript: {e}")
 
 
+# ✨ Only these files are taken from uploaded zip archives
+TRANSCRIPT_EXTENSIONS = {".txt", ".docx"}
+
+
+def _save_upload(source, filename: str) -> Path:
+    path = UPLOAD_DIR / f"{uuid.uuid4()}{Path(filename).suffix}"
+    with open(path, "wb") as buffer:
+        shutil.copyfileobj(source, buffer, 1024 * 1024)
+    return path
+
+
+@app.post("/transcripts/bulk-upload", response_model=schemas.BulkUploadResponse)
+def handle_bulk_upload(files: List[UploadFile] = File(...), process_ai: bool = Form(False),
+                       db: Session = Depends(get_db)):
+    """
+    Uploads many transcripts at once: plain .txt/.docx files and/or .zip archives of them.
+    All rows are inserted in one transaction; with `process_ai`, a process-ai job is queued
+    for every new transcript (run JOB_MAX_CONCURRENCY at a time).
+    """
+    entries, saved, skipped = [], [], []
+    try:
+        for upload in files:
+            if Path(upload.filename).suffix.lower() != ".zip":
+                saved.append(_save_upload(upload.file, upload.filename))
+                entries.append((upload.filename, str(saved[-1])))
+                continue
+            with zipfile.ZipFile(upload.file) as archive:
+                for member in archive.infolist():
+                    name = Path(member.filename).name
+                    if member.is_dir() or member.filename.startswith("__MACOSX/") or name.startswith("."):
+                        continue
+                    if Path(name).suffix.lower() not in TRANSCRIPT_EXTENSIONS:
+                        skipped.append(member.filename)
+                        continue
+                    with archive.open(member) as source:
+                        saved.append(_save_upload(source, name))
+                    entries.append((name, str(saved[-1])))
+        transcripts = services.create_transcript_entries(db, entries)
+    except zipfile.BadZipFile as e:
+        for path in saved:
+            os.remove(path)
+        raise HTTPException(status_code=400, detail=f"Invalid zip archive: {e}")
+    except Exception as e:
+        for path in saved:
+            os.remove(path)
+        raise HTTPException(status_code=500, detail=f"Failed to upload transcripts: {e}")
+
+    queued = []
+    if process_ai and transcripts:
+        queued = jobs.job_runner.submit_many(db, "process-ai", [t.id for t in transcripts])
+    return {"transcripts": transcripts, "jobs": queued, "skipped": skipped}
+
+
 @app.post("/transcripts/process-ai/{transcript_id}")
 def process_transcript_for_ai_endpoint(transcript_id: int, db: Session = Depends(get_db)):
     try:
@@ -99,18 +274,35 @@ def process_transcript_for_ai_endpoint(transcript_id: int, db: Session = Depends
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
-@app.get("/transcripts", response_model=List[schemas.Transcript])
-def get_transcripts(db: Session = Depends(get_db)):
-    return services.list_transcripts(db=db)
+# ✨ List endpoints are keyset-paginated: pass the X-Next-Cursor response header back as `cursor`
+@app.get("/transcripts", response_model=List[schemas.TranscriptListItem], response_model_exclude_unset=True)
+def get_transcripts(response: Response, limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None,
+                    status: Optional[str] = None, sort: str = "id", fields: Optional[str] = None,
+                    db: Session = Depends(get_db)):
+    try:
+        items, next_cursor = services.list_transcripts(db=db, limit=limit, cursor=cursor, status=status, sort=sort,
+                                                       fields=fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 @app.post("/memos", response_model=schemas.Memo)
 def create_manual_memo(memo: schemas.MemoCreate, db: Session = Depends(get_db)):
     return services.create_memo(db=db, title=memo.title, content=memo.content)
 
 
-@app.get("/memos", response_model=List[schemas.Memo])
-def get_memos(db: Session = Depends(get_db)):
-    return services.list_memos(db=db)
+@app.get("/memos", response_model=List[schemas.MemoListItem], response_model_exclude_unset=True)
+def get_memos(response: Response, limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None,
+              sort: str = "id", fields: Optional[str] = None, db: Session = Depends(get_db)):
+    try:
+        items, next_cursor = services.list_memos(db=db, limit=limit, cursor=cursor, sort=sort, fields=fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 @app.post("/codes", response_model=schemas.Code)
 def create_manual_code(code: schemas.CodeCreate, db: Session = Depends(get_db)):
@@ -119,9 +311,20 @@ def create_manual_code(code: schemas.CodeCreate, db: Session = Depends(get_db)):
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/codes", response_model=List[schemas.Code])
-def get_codes(db: Session = Depends(get_db)):
-    return services.list_codes(db=db)
+@app.get("/codes", response_model=List[schemas.CodeListItem], response_model_exclude_unset=True)
+def get_codes(response: Response, limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None,
+              transcript_id: Optional[int] = None, code_prefix: Optional[str] = None,
+              created_after: Optional[datetime.datetime] = None, created_before: Optional[datetime.datetime] = None,
+              sort: str = "id", fields: Optional[str] = None, db: Session = Depends(get_db)):
+    try:
+        items, next_cursor = services.list_codes(db=db, limit=limit, cursor=cursor, transcript_id=transcript_id,
+                                                 code_prefix=code_prefix, created_after=created_after,
+                                                 created_before=created_before, sort=sort, fields=fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 @app.delete("/codes/{code_id}")
 def remove_code(code_id: int, db: Session = Depends(get_db)):
@@ -155,6 +358,17 @@ def get_single_memo(memo_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Memo not found")
     return memo
 
+# ✨ --- Prometheus metrics (see backend/metrics.py) ---
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+# ✨ --- Cache statistics (hit/miss counters) ---
+@app.get("/stats/cache")
+def get_cache_stats():
+    return services.get_cache_stats()
+
 # ✨ --- NEW: Endpoint to provide default configs to the frontend ---
 @app.get("/config/defaults", response_model=schemas.AIConfigDefaults)
 def get_defaults():
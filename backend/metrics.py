@@ -0,0 +1,298 @@
+# backend/metrics.py
+"""
+Process-local metrics in the Prometheus text exposition format, served at GET /metrics.
+
+A tiny dependency-free registry (Counter, Gauge, Histogram with labels): recording a
+value is a dict lookup and an add under a lock, so the instrumentation can stay on in
+production. Each API worker process keeps its own values; scrape every worker (or run
+one) to get complete numbers.
+
+Instrumented:
+- HTTP requests per route (MetricsMiddleware): count and latency until the last body byte
+- OpenAI embedding / chat calls per model: count by outcome, latency and token usage
+- the chunker: chunks and characters produced and the time spent producing them
+- SQL statements per operation (instrument_engine): duration (and count) and errors
+- the process caches: hits, misses and hit ratio, read from their stats() at scrape time
+"""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple:
+        # Every label must be given; values are converted to text only when rendering
+        return tuple([labels[name] for name in self.labelnames])
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """A settable value, or one read at scrape time from `function` ({label values tuple: value})."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], Dict[Tuple, float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def _samples(self):
+        if self.function is not None:
+            try:
+                items = list(self.function().items())
+            except Exception as e:
+                print(f"Could not collect metric {self.name}: {e}")
+                items = []
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, +Inf last; then sum and count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' is already registered.")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# --- HTTP ---
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the last body byte.", ("method", "route")))
+
+# --- OpenAI ---
+OPENAI_REQUESTS = REGISTRY.register(Counter(
+    "openai_requests_total", "OpenAI API calls by kind (embedding, chat), model and outcome.",
+    ("kind", "model", "outcome")))
+OPENAI_LATENCY = REGISTRY.register(Histogram(
+    "openai_request_duration_seconds", "OpenAI API call latency, including retries.", ("kind", "model")))
+OPENAI_TOKENS = REGISTRY.register(Counter(
+    "openai_tokens_total", "Tokens reported by the OpenAI API by kind, model and type (prompt, completion).",
+    ("kind", "model", "type")))
+
+# --- Chunker ---
+CHUNKER_CHUNKS = REGISTRY.register(Counter("chunker_chunks_total", "Chunks produced by the chunker."))
+CHUNKER_CHARS = REGISTRY.register(Counter("chunker_characters_total", "Characters of chunk text produced."))
+CHUNKER_SECONDS = REGISTRY.register(Counter(
+    "chunker_seconds_total", "Time spent producing chunks (including reading the source text)."))
+
+# --- Database ---
+DB_ERRORS = REGISTRY.register(Counter(
+    "db_query_errors_total", "SQL statements that raised, by operation.", ("operation",)))
+DB_LATENCY = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "SQL statement duration (its _count is the number of statements).", ("operation",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the count and latency of each request, labelled with the
+    route template (e.g. /jobs/{job_id}) so the number of series stays bounded. Latency
+    runs until the last body chunk is sent, so streamed responses count in full.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUESTS.inc(method=scope["method"], route=route, status=status[0])
+            HTTP_LATENCY.observe(time.perf_counter() - start, method=scope["method"], route=route)
+
+
+def observe_openai(kind: str, model: str, fn: Callable, usage: Callable = lambda result: None):
+    """Calls fn(), recording the outcome and latency; usage(result) -> (prompt, completion) tokens or None."""
+    start = time.perf_counter()
+    try:
+        result = fn()
+    except Exception:
+        OPENAI_REQUESTS.inc(kind=kind, model=model, outcome="error")
+        raise
+    finally:
+        OPENAI_LATENCY.observe(time.perf_counter() - start, kind=kind, model=model)
+    OPENAI_REQUESTS.inc(kind=kind, model=model, outcome="ok")
+    tokens = usage(result)
+    if tokens:
+        record_tokens(kind, model, *tokens)
+    return result
+
+
+def record_tokens(kind: str, model: str, prompt: Optional[int], completion: Optional[int]):
+    if prompt:
+        OPENAI_TOKENS.inc(prompt, kind=kind, model=model, type="prompt")
+    if completion:
+        OPENAI_TOKENS.inc(completion, kind=kind, model=model, type="completion")
+
+
+def instrument_engine(engine):
+    """Counts and times every SQL statement run through `engine`."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        DB_LATENCY.observe(time.perf_counter() - conn.info["query_start"].pop(), operation=_operation(statement))
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+        DB_ERRORS.inc(operation=_operation(context.statement or ""))
+
+
+def _operation(statement: str) -> str:
+    """SELECT, INSERT, UPDATE, ... (the statement's first keyword)."""
+    words = statement.split(None, 1)
+    return words[0].upper() if words else "OTHER"
+
+
+def register_cache_metrics(stats: Callable[[], dict]):
+    """Exposes the hits, misses and hit ratio of every cache in stats() ({cache: {"hits", "misses", ...}})."""
+
+    def collect(field):
+        def values():
+            return {(name,): cache[field] for name, cache in stats().items() if field in cache}
+        return values
+
+    REGISTRY.register(Gauge("cache_hits", "Cache hits since the process started.", ("cache",), collect("hits")))
+    REGISTRY.register(Gauge("cache_misses", "Cache misses since the process started.", ("cache",), collect("misses")))
+    REGISTRY.register(Gauge("cache_hit_ratio", "Cache hits / lookups.", ("cache",), collect("hit_rate")))
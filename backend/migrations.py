@@ -0,0 +1,123 @@
+# backend/migrations.py
+"""
+Lightweight, idempotent schema migrations for existing databases.
+`Base.metadata.create_all` only creates missing tables, so columns added to
+existing tables (and data conversions) are handled here on startup.
+"""
+import json
+import os
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from backend.chunker import content_hash
+from backend.keyword_search import create_chunk_fts
+from backend.vectors import pack_embedding
+
+
+def _add_missing_columns(engine: Engine, table: str, columns: dict):
+    existing = {c["name"] for c in inspect(engine).get_columns(table)}
+    with engine.begin() as conn:
+        for name, ddl in columns.items():
+            if name not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+
+def migrate_chunk_embeddings_to_binary(engine: Engine, batch_size: int = 1000) -> int:
+    """
+    Converts legacy JSON-text embeddings in `chunks.embedding` into float32 blobs
+    in place, filling in `embedding_dim` and `embedding_model`. Returns the number
+    of converted rows.
+    """
+    if engine.dialect.name != "sqlite":
+        return 0
+    _add_missing_columns(engine, "chunks", {"embedding_dim": "INTEGER", "embedding_model": "VARCHAR"})
+
+    legacy_model = os.getenv("OPENAI_EMBED_MODEL") or "text-embedding-3-small"
+    converted = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text("SELECT id, embedding FROM chunks WHERE typeof(embedding) = 'text' LIMIT :n"),
+                {"n": batch_size},
+            ).fetchall()
+            if not rows:
+                return converted
+            params = []
+            for row_id, raw in rows:
+                values = json.loads(raw)
+                params.append({"id": row_id, "emb": pack_embedding(values), "dim": len(values)})
+            conn.execute(
+                text("UPDATE chunks SET embedding = :emb, embedding_dim = :dim, "
+                     "embedding_model = COALESCE(embedding_model, :model) WHERE id = :id"),
+                [dict(p, model=legacy_model) for p in params],
+            )
+            converted += len(rows)
+
+
+def backfill_chunk_content_hashes(engine: Engine, batch_size: int = 1000) -> int:
+    """Adds `chunks.content_hash` if missing and fills it for existing rows. Returns the number of rows filled."""
+    _add_missing_columns(engine, "chunks", {"content_hash": "VARCHAR(64)"})
+    filled = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text("SELECT id, text FROM chunks WHERE content_hash IS NULL LIMIT :n"), {"n": batch_size}
+            ).fetchall()
+            if not rows:
+                return filled
+            conn.execute(
+                text("UPDATE chunks SET content_hash = :hash WHERE id = :id"),
+                [{"id": row_id, "hash": content_hash(chunk_text or "")} for row_id, chunk_text in rows],
+            )
+            filled += len(rows)
+
+
+# ✨ Indexes declared on the models; create_all only adds them to new tables
+INDEXES = {
+    "ix_chunks_transcript_id": ("chunks", "transcript_id"),
+    "ix_chunks_model_transcript": ("chunks", "embedding_model, transcript_id"),
+    "ix_codes_transcript_id": ("codes", "transcript_id"),
+    "ix_codes_created_at": ("codes", "created_at"),
+}
+
+
+def create_missing_indexes(engine: Engine):
+    """Creates the `INDEXES` whose table and columns exist; run it after the column migrations."""
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for name, (table, column) in INDEXES.items():
+            if table not in tables:
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table)}
+            if all(col.strip() in existing for col in column.split(",")):
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({column})"))
+
+
+def create_chunk_fts_index(engine: Engine) -> bool:
+    """Adds the `chunks_fts` keyword index to an existing SQLite database. Returns True if it was created."""
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'chunks_fts'")).first():
+            return False
+        create_chunk_fts(conn)
+        conn.execute(text("INSERT INTO chunks_fts(chunks_fts) VALUES ('rebuild')"))
+    return True
+
+
+def run_migrations(engine: Engine):
+    if "jobs" in inspect(engine).get_table_names():
+        _add_missing_columns(engine, "jobs", {"heartbeat_at": "TIMESTAMP",
+                                              "cancel_requested": "BOOLEAN NOT NULL DEFAULT FALSE"})
+    if "chunks" in inspect(engine).get_table_names() and create_chunk_fts_index(engine):
+        print("Created the chunks_fts keyword index.")
+    if "chunks" in inspect(engine).get_table_names():
+        converted = migrate_chunk_embeddings_to_binary(engine)
+        if converted:
+            print(f"Migrated {converted} chunk embeddings from JSON to float32 blobs.")
+        filled = backfill_chunk_content_hashes(engine)
+        if filled:
+            print(f"Computed content hashes for {filled} existing chunks.")
+    create_missing_indexes(engine)
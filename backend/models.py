@@ -1,10 +1,16 @@
 # backend/models.py
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import DDL, Boolean, Column, Integer, String, Text, DateTime, ForeignKey, Float, Index, UniqueConstraint, event
 from sqlalchemy.orm import relationship
 import datetime
 
 # ✨ Import Base from the new db.py file
 from .db import Base
+from .keyword_search import create_chunk_fts
+from .pg_vectors import EmbeddingType
+
+# ✨ On PostgreSQL the embedding column is a pgvector `vector`; the extension must exist first
+event.listen(Base.metadata, "before_create",
+             DDL("CREATE EXTENSION IF NOT EXISTS vector").execute_if(dialect="postgresql"))
 
 
 class Transcript(Base):
@@ -17,19 +23,48 @@ class Transcript(Base):
 
     chunks = relationship("Chunk", back_populates="transcript", cascade="all, delete")
     codes = relationship("Code", back_populates="transcript")
+    # ✨ Deleting a transcript drops its memo previews and detaches its job history
+    # (ondelete covers new schemas; the ORM cascade also covers existing tables and SQLite)
+    memo_previews = relationship("MemoPreview", cascade="all, delete")
+    jobs = relationship("Job")
 
 
 class Chunk(Base):
     __tablename__ = "chunks"
+    # ✨ Covers the per-model count / max id that checks an ANN index is fresh, without reading embeddings
+    __table_args__ = (Index("ix_chunks_model_transcript", "embedding_model", "transcript_id"),)
     id = Column(Integer, primary_key=True, index=True)
-    transcript_id = Column(Integer, ForeignKey("transcripts.id"))
+    transcript_id = Column(Integer, ForeignKey("transcripts.id"), index=True)
     text = Column(Text)
-    embedding = Column(Text)
+    # ✨ Raw little-endian float32 bytes (see backend/vectors.py), readable with np.frombuffer;
+    # stored as a pgvector column on PostgreSQL (see backend/pg_vectors.py)
+    embedding = Column(EmbeddingType)
+    embedding_dim = Column(Integer)
+    embedding_model = Column(String)
+    # ✨ sha256 of `text`; lets re-processing reuse embeddings of unchanged chunks
+    content_hash = Column(String(64))
     start_pos = Column(Integer)
     end_pos = Column(Integer)
     transcript = relationship("Transcript", back_populates="chunks")
 
 
+# ✨ SQLite keyword index over chunk text (see backend/keyword_search.py)
+event.listen(Chunk.__table__, "after_create",
+             lambda target, connection, **kw: create_chunk_fts(connection) if connection.dialect.name == "sqlite" else None)
+
+
+# ✨ Per-chunk LLM analysis (summary, codes with definitions and quotes), shared by code and
+# memo generation and re-runs (see backend/analyses.py)
+class ChunkAnalysis(Base):
+    __tablename__ = "chunk_analyses"
+    __table_args__ = (UniqueConstraint("content_hash", "model", name="uq_chunk_analyses_hash_model"),)
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), nullable=False)  # Chunk.content_hash of the analyzed text
+    model = Column(String, nullable=False)
+    analysis = Column(Text, nullable=False)  # JSON object as returned by the LLM
+    created_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.UTC))
+
+
 class Memo(Base):
     __tablename__ = "memos"
     id = Column(Integer, primary_key=True, index=True)
@@ -38,15 +73,45 @@ class Memo(Base):
     codes = relationship("Code", back_populates="memo")
 
 
+# ✨ AI memo previews kept server-side so the memo the user read can be saved without another LLM call
+class MemoPreview(Base):
+    __tablename__ = "memo_previews"
+    id = Column(String, primary_key=True)  # uuid4 hex
+    transcript_id = Column(Integer, ForeignKey("transcripts.id", ondelete="CASCADE"), nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.UTC))
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
 class Code(Base):
     __tablename__ = "codes"
     id = Column(Integer, primary_key=True, index=True)
     code = Column(String, index=True)
     excerpt = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=datetime.datetime.now(datetime.UTC))
-    transcript_id = Column(Integer, ForeignKey("transcripts.id"), nullable=True)
+    # ✨ A callable, so each row gets its own timestamp (not the import time)
+    created_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.UTC), index=True)
+    transcript_id = Column(Integer, ForeignKey("transcripts.id"), nullable=True, index=True)
     memo_id = Column(Integer, ForeignKey("memos.id"), nullable=True)
     transcript = relationship("Transcript", back_populates="codes")
     memo = relationship("Memo", back_populates="codes")
 
+# ✨ NEW: Background AI jobs (see backend/jobs.py)
+class Job(Base):
+    __tablename__ = "jobs"
+    id = Column(String, primary_key=True)  # uuid4 hex
+    kind = Column(String, nullable=False)  # "process-ai", "codes", "memo"
+    transcript_id = Column(Integer, ForeignKey("transcripts.id", ondelete="SET NULL"), nullable=True, index=True)
+    status = Column(String, default="queued", nullable=False, index=True)  # queued, running, done, failed, cancelled
+    progress = Column(Float, default=0.0, nullable=False)  # 0.0 - 1.0
+    result = Column(Text)  # JSON-encoded return value of the job
+    error = Column(Text)
+    created_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.UTC))
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    # ✨ Bumped by the worker process that owns the job while it is queued or running; jobs whose
+    # heartbeat stops (the process died) are failed by any other worker
+    heartbeat_at = Column(DateTime)
+    # ✨ Set by POST /jobs/{id}/cancel on whichever worker gets it; the owning worker stops at its next check
+    cancel_requested = Column(Boolean, default=False, nullable=False)
+
 # 🧹 CLEANUP: The init_db function is no longer needed here as it's handled by main.py
\ No newline at end of file
@@ -0,0 +1,89 @@
+# backend/pagination.py
+"""
+Keyset (cursor) pagination and field projection helpers for the list endpoints.
+
+A cursor encodes the sort value and id of the last row of a page, plus the sort it
+was issued for; the next page starts strictly after that (value, id) pair, so pages
+stay stable while rows are inserted and each page is an index range scan rather
+than an OFFSET.
+"""
+import base64
+import datetime
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+
+def encode_cursor(value, row_id: int, sort: str) -> str:
+    if isinstance(value, datetime.datetime):
+        payload = {"v": value.isoformat(), "t": "dt", "id": row_id, "s": sort}
+    else:
+        payload = {"v": value, "id": row_id, "s": sort}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[object, int]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        value = payload["v"]
+        if payload.get("t") == "dt":
+            value = datetime.datetime.fromisoformat(value)
+        row_id = int(payload["id"])
+        issued_for = payload["s"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor.")
+    if issued_for != sort:
+        raise ValueError(f"This cursor was issued for sort={issued_for}; "
+                         f"repeat that sort or start again without a cursor.")
+    return value, row_id
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> List[str]:
+    """Turns "id,title" into a list of known field names; None or "" selects every field."""
+    allowed = list(allowed)
+    if not fields:
+        return allowed
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(allowed)}.")
+    return requested
+
+
+def parse_sort(sort: Optional[str], columns: Dict[str, object]):
+    """Turns "created_at" / "-created_at" into (column, descending)."""
+    sort = sort or "id"
+    descending = sort.startswith("-")
+    name = sort.lstrip("-")
+    if name not in columns:
+        raise ValueError(f"Cannot sort by '{name}'. Allowed: {', '.join(columns)}.")
+    return columns[name], descending
+
+
+def keyset_page(db: Session, stmt, sort_column, id_column, descending: bool, cursor: Optional[str], limit: int):
+    """
+    Runs `stmt` ordered by (sort_column, id_column) starting after `cursor` and returns
+    (rows, next_cursor). Rows also carry `_sort_key` and `_row_id`; next_cursor is None
+    on the last page.
+    """
+    sort = f"{'-' if descending else ''}{sort_column.key}"
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort)
+        after = id_column < last_id if descending else id_column > last_id
+        if sort_column is not id_column:
+            beyond = sort_column < value if descending else sort_column > value
+            after = or_(beyond, and_(sort_column == value, after))
+        stmt = stmt.where(after)
+    if descending:
+        stmt = stmt.order_by(sort_column.desc(), id_column.desc())
+    else:
+        stmt = stmt.order_by(sort_column.asc(), id_column.asc())
+    stmt = stmt.add_columns(sort_column.label("_sort_key"), id_column.label("_row_id")).limit(limit + 1)
+
+    rows = db.execute(stmt).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1]._sort_key, rows[-1]._row_id, sort)
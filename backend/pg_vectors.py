@@ -0,0 +1,102 @@
+# backend/pg_vectors.py
+"""
+PostgreSQL + pgvector storage and search for chunk embeddings.
+
+With a postgresql:// DATABASE_URL, `chunks.embedding` is a pgvector `vector` column
+(the rest of the code still sees the packed float32 bytes from backend/vectors.py)
+and similarity search runs in the database:
+
+    ORDER BY embedding::vector(dim) <=> :q LIMIT k
+
+served by one partial HNSW (or IVFFlat) index per embedding dimension. Requires the
+optional `psycopg` and `pgvector` packages and the `vector` extension.
+
+Settings: PGVECTOR_INDEX (hnsw | ivfflat), PGVECTOR_HNSW_M, PGVECTOR_HNSW_EF_CONSTRUCTION,
+PGVECTOR_EF_SEARCH, PGVECTOR_IVF_LISTS, PGVECTOR_IVF_PROBES.
+"""
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import LargeBinary, text
+from sqlalchemy.orm import Session
+from sqlalchemy.types import TypeDecorator
+
+
+class EmbeddingType(TypeDecorator):
+    """Packed float32 bytes in Python; LargeBinary on SQLite, `vector` on PostgreSQL."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            from pgvector.sqlalchemy import Vector  # Optional dependency
+
+            return dialect.type_descriptor(Vector())
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name != "postgresql":
+            return value
+        return np.frombuffer(value, dtype="<f4")
+
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name != "postgresql":
+            return value
+        return np.asarray(value, dtype="<f4").tobytes()
+
+
+def is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _vector_literal(embedding: np.ndarray) -> str:
+    return "[" + ",".join(repr(float(x)) for x in embedding) + "]"
+
+
+def ensure_index(db: Session, dim: int):
+    """
+    Creates the ANN index for `dim`-dimensional embeddings if it is missing. The index is
+    partial (embedding_dim = dim) because each index needs a fixed vector size.
+    """
+    dim = int(dim)
+    kind = os.getenv("PGVECTOR_INDEX") or "hnsw"
+    if kind == "ivfflat":
+        method, params = "ivfflat", f"lists = {int(os.getenv('PGVECTOR_IVF_LISTS') or 100)}"
+    else:
+        method = "hnsw"
+        params = (f"m = {int(os.getenv('PGVECTOR_HNSW_M') or 16)}, "
+                  f"ef_construction = {int(os.getenv('PGVECTOR_HNSW_EF_CONSTRUCTION') or 64)}")
+    db.execute(text(
+        f"CREATE INDEX IF NOT EXISTS ix_chunks_embedding_{method}_{dim} ON chunks "
+        f"USING {method} ((embedding::vector({dim})) vector_cosine_ops) WITH ({params}) "
+        f"WHERE embedding_dim = {dim}"
+    ))
+    db.commit()
+
+
+def search(db: Session, query: np.ndarray, model: str, top_k: int,
+           transcript_ids: Optional[List[int]] = None, processed_only: bool = True) -> List[Tuple[int, float]]:
+    """Returns [(chunk_id, cosine similarity)] for the nearest chunks, best first."""
+    dim = int(len(query))
+    if (os.getenv("PGVECTOR_INDEX") or "hnsw") == "ivfflat":
+        db.execute(text(f"SET LOCAL ivfflat.probes = {int(os.getenv('PGVECTOR_IVF_PROBES') or 10)}"))
+    else:
+        ef_search = max(int(os.getenv("PGVECTOR_EF_SEARCH") or 64), int(top_k))
+        db.execute(text(f"SET LOCAL hnsw.ef_search = {ef_search}"))
+
+    # `dim` is inlined (not a bind parameter) so the planner can match the partial index
+    conditions = [f"embedding_dim = {dim}", "embedding_model = :model"]
+    params = {"model": model, "q": _vector_literal(query), "k": int(top_k)}
+    if processed_only:
+        conditions.append("transcript_id IN (SELECT id FROM transcripts WHERE status = 'processed')")
+    if transcript_ids:
+        conditions.append("transcript_id = ANY(:transcript_ids)")
+        params["transcript_ids"] = [int(t) for t in transcript_ids]
+    distance = f"embedding::vector({dim}) <=> CAST(:q AS vector({dim}))"
+    rows = db.execute(text(
+        f"SELECT id, 1 - ({distance}) AS score FROM chunks WHERE {' AND '.join(conditions)} "
+        f"ORDER BY {distance} LIMIT :k"
+    ), params).all()
+    return [(int(row.id), float(row.score)) for row in rows]
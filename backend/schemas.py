@@ -1,6 +1,8 @@
 # backend/schemas.py
-from pydantic import BaseModel
-from typing import Optional
+import json
+
+from pydantic import BaseModel, field_validator
+from typing import Any, List, Literal, Optional
 import datetime
 
 class MemoBase(BaseModel):
@@ -30,18 +32,72 @@ class AIConfig(BaseModel):
 class AIGenerateRequest(BaseModel):
     transcript_id: int
     config: Optional[AIConfig] = None
+    bypass_cache: bool = False  # ✨ Force fresh LLM calls instead of cached responses
 
 class AISearchRequest(BaseModel):
     transcript_id: int
     query: str
     top_k: int = 5
     config: Optional[AIConfig] = None
+    mode: Literal["vector", "keyword", "hybrid"] = "vector"  # ✨ keyword/hybrid use the FTS index
+
+# ✨ --- Corpus-wide search across many transcripts ---
+class CorpusSearchRequest(BaseModel):
+    query: str
+    top_k: int = 5
+    transcript_ids: Optional[List[int]] = None  # None searches every processed transcript
+    config: Optional[AIConfig] = None
+    mode: Literal["vector", "keyword", "hybrid"] = "vector"
+
+class CorpusSearchHit(BaseModel):
+    chunk_id: int
+    transcript_id: int
+    transcript_title: str
+    start_pos: Optional[int] = None
+    end_pos: Optional[int] = None
+    text: str
+    score: float
+
+# ✨ --- Background jobs ---
+class JobCreate(BaseModel):
+    kind: Literal["process-ai", "codes", "memo"]
+    transcript_id: int
+    config: Optional[AIConfig] = None
+    bypass_cache: bool = False
+
+class Job(BaseModel):
+    id: str
+    kind: str
+    transcript_id: Optional[int] = None
+    status: str  # queued, running, done, failed, cancelled
+    progress: float
+    cancel_requested: bool = False  # ✨ A running job stops at its next progress update
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime.datetime] = None
+    started_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+    class Config:
+        from_attributes = True
+
+    @field_validator("result", mode="before")
+    @classmethod
+    def decode_result(cls, value):
+        return json.loads(value) if isinstance(value, str) else value
 
 class Memo(MemoBase):
     id: int
     class Config:
         from_attributes = True
 
+# ✨ --- Server-side memo previews (saved by id, see POST /memos/from-preview/{preview_id}) ---
+class MemoPreview(BaseModel):
+    preview_id: str
+    transcript_id: int
+    title: str = "AI Generated Preview"
+    content: str
+    expires_at: datetime.datetime
+
 class Transcript(BaseModel):
     id: int
     title: str
@@ -49,6 +105,32 @@ class Transcript(BaseModel):
     class Config:
         from_attributes = True
 
+# ✨ Result of a bulk upload; `jobs` is empty unless AI processing was requested
+class BulkUploadResponse(BaseModel):
+    transcripts: List[Transcript]
+    jobs: List[Job] = []
+    skipped: List[str] = []
+
+# ✨ List items: every field is optional so `?fields=` projections validate (served with exclude_unset)
+class TranscriptListItem(BaseModel):
+    id: Optional[int] = None
+    title: Optional[str] = None
+    status: Optional[str] = None
+
+class MemoListItem(BaseModel):
+    id: Optional[int] = None
+    title: Optional[str] = None
+    content: Optional[str] = None
+
+class CodeListItem(BaseModel):
+    id: Optional[int] = None
+    code: Optional[str] = None
+    excerpt: Optional[str] = None
+    source: Optional[str] = None
+    created_at: Optional[datetime.datetime] = None
+    transcript_id: Optional[int] = None
+    memo_id: Optional[int] = None
+
 # ✨ --- NEW: Schemas for detailed single-item views ---
 class TranscriptDetail(Transcript):
     content: str
@@ -60,6 +142,8 @@ class MemoDetail(Memo):
 # ✨ --- NEW: The missing response schema ---
 class CodeGenerationResponse(BaseModel):
     message: str
+    llm_calls: int = 0  # ✨ Chunk analyses requested from the model
+    llm_calls_saved: int = 0  # ✨ Chunk analyses read from the analysis store instead
 
 
 class Code(CodeBase):
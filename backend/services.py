@@ -1,17 +1,35 @@
 # backend/services.py
+import datetime
 import os
 import json
-from typing import Optional
-
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+import openai
 from dotenv import load_dotenv
 from openai import OpenAI
 import numpy as np
+from sqlalchemy import String, case, column, delete, func, literal, select, update, values
 from sqlalchemy.orm import Session
 from docx import Document
 import tempfile
 
 from backend import schemas
-from backend.models import Chunk, Code, Transcript, Memo
+from backend import keyword_search, metrics, pg_vectors
+from backend.analyses import analysis_store
+from backend.ann import ann_manager
+from backend.chunker import content_hash, get_tokenizer, iter_chunks, normalize_text
+from backend.documents import iter_docx_text, iter_document_text
+from backend.bulk import BulkInserter
+from backend.cache import embedding_cache, response_cache
+from backend.clients import client_pool
+from backend.models import Chunk, Code, Transcript, Memo, MemoPreview
+from backend.pagination import keyset_page, parse_fields, parse_sort
+from backend.vectors import TranscriptIndex, blocked_top_k, index_cache, pack_embedding, unpack_embeddings
 
 load_dotenv()
 
@@ -26,108 +44,401 @@ def read_docx_bytes(file_bytes):
     return "\n".join(p.text for p in doc.paragraphs)
 
 
-def normalize_text(s: str):
-    return " ".join(s.strip().split())
-
-
 def chunk_text(text, approx_tokens: int = None, overlap_ratio=0.1):
-    if approx_tokens is None:
-        approx_tokens = int(os.getenv("CHUNK_TOKENS", 400))
-    avg_char_per_token = 4
-    chunk_size = approx_tokens * avg_char_per_token
-    overlap = int(chunk_size * overlap_ratio)
-    chunks = []
-    i = 0
-    n = len(text)
-    while i < n:
-        end = min(n, i + chunk_size)
-        chunk = text[i:end]
-        chunks.append((i, end, normalize_text(chunk)))
-        i = end - overlap
-    return chunks
+    """Splits an in-memory string into token-bounded (start, end, text) chunks."""
+    return list(iter_chunks([text], max_tokens=approx_tokens, overlap_ratio=overlap_ratio))
 
 
 def get_embedding(text: str, config: Optional[schemas.AIConfig] = None):
-    request_client = get_openai_client(config)
+    return get_embeddings([text], config=config)[0]
+
+
+def get_embeddings(texts: List[str], config: Optional[schemas.AIConfig] = None, client: Optional[OpenAI] = None):
+    """
+    Embeds a list of texts, preserving input order. Texts already in the persistent
+    embedding cache cost nothing; the rest are sent in a single API request.
+    """
+    if not texts:
+        return []
     # Get model from config, or fallback to environment variable
-    model = (config and config.embed_model) or os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-small")
-    resp = request_client.embeddings.create(model=model, input=text)
-    return resp.data[0].embedding
+    model = (config and config.embed_model) or os.getenv("OPENAI_EMBED_MODEL") or "text-embedding-3-small"
+    embeddings = embedding_cache.get_many(texts, model)
+    missing = [i for i, emb in enumerate(embeddings) if emb is None]
+    if missing:
+        request_client = client or get_openai_client(config)
+        resp = metrics.observe_openai(
+            "embedding", model, lambda: request_client.embeddings.create(model=model, input=[texts[i] for i in missing]),
+            usage=lambda r: (r.usage.prompt_tokens, None) if r.usage else None)
+        # The API documents that `data` follows the input order, but sort by index to be safe.
+        fresh = [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+        embedding_cache.put_many([texts[i] for i in missing], fresh, model)
+        for i, emb in zip(missing, fresh):
+            embeddings[i] = emb
+    return embeddings
+
+
+def batch_chunks_for_embedding(chunks: Iterable, batch_size: int = None, token_budget: int = None):
+    """
+    Groups (start, end, text) chunk tuples into batches that respect both a maximum
+    number of inputs and a token budget per embeddings request.
+    """
+    if batch_size is None:
+        batch_size = int(os.getenv("EMBED_BATCH_SIZE") or 64)
+    if token_budget is None:
+        token_budget = int(os.getenv("EMBED_BATCH_TOKENS") or 50000)
+    tokenizer = get_tokenizer()
+
+    batch, batch_tokens = [], 0
+    for chunk in chunks:
+        tokens = tokenizer.count(chunk[2])
+        if batch and (len(batch) >= batch_size or batch_tokens + tokens > token_budget):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(chunk)
+        batch_tokens += tokens
+    if batch:
+        yield batch
 
 
 def stream_chunks_from_file(path, approx_tokens: int = None, overlap_ratio=0.1):
-    if approx_tokens is None:
-        approx_tokens = int(os.getenv("CHUNK_TOKENS", 400))
-    """
-    Reads a large text file from a path and yields its content in smaller,
-    overlapping chunks without loading the whole file into memory.
-    """
-    avg_char_per_token = 4
-    chunk_size = approx_tokens * avg_char_per_token
-    overlap = int(chunk_size * overlap_ratio)
-
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        buffer = ""
-        pos = 0
-        while True:
-            data = f.read(chunk_size)
-            if not data:
-                # emit remaining buffer if any
-                if buffer.strip():
-                    start = pos
-                    end = pos + len(buffer)
-                    yield start, end, normalize_text(buffer)
-                break
-            buffer += data
-            # emit a chunk
-            chunk = buffer[:chunk_size]
-            start = pos
-            end = pos + len(chunk)
-            yield start, end, normalize_text(chunk)
-            # Prepare buffer for next round with overlap
-            buffer = buffer[chunk_size - overlap:]
-            pos = end - overlap
-
-
-def search_similar(db: Session, transcript_id: int, query: str, top_k=5, config: Optional[schemas.AIConfig] = None):
-    rows = db.query(Chunk).filter(Chunk.transcript_id == transcript_id).all()
-    if not rows: return []
-    q_emb = np.array(get_embedding(query, config=config), dtype=float)
-    ids, texts, embs = [], [], []
-    for r in rows:
-        ids.append(r.id)
-        texts.append(r.text)
-        embs.append(np.array(json.loads(r.embedding), dtype=float))
-    if not embs: return []
-    embs = np.vstack(embs)
-    def cos_sim(a, B):
-        a_norm = a / np.linalg.norm(a)
-        B_norm = B / np.linalg.norm(B, axis=1, keepdims=True)
-        return B_norm @ a_norm
-    sims = cos_sim(q_emb, embs)
-    top_idx = np.argsort(sims)[-top_k:][::-1]
-    results = [{"chunk_id": ids[i], "text": texts[i], "score": float(sims[i])} for i in top_idx]
+    """
+    Reads a large text or .docx file from a path and yields its content in token-bounded,
+    overlapping chunks that end on speaker turns or sentences, without loading
+    the whole file into memory.
+    """
+    return iter_chunks(iter_document_text(path), max_tokens=approx_tokens, overlap_ratio=overlap_ratio)
+
+
+def _ranked_hits(mode: str, top_k: int, vector_hits: Callable, keyword_hits: Callable):
+    """
+    (chunk_id, score) hits for a search mode: "vector" (embedding similarity), "keyword"
+    (BM25, no embedding request) or "hybrid" (reciprocal rank fusion of both candidate lists).
+    """
+    if mode == "vector":
+        return vector_hits(top_k)
+    if mode == "keyword":
+        return keyword_hits(top_k)
+    if mode == "hybrid":
+        candidates = max(top_k, int(os.getenv("HYBRID_CANDIDATES") or 50))
+        return keyword_search.reciprocal_rank_fusion([vector_hits(candidates), keyword_hits(candidates)], top_k)
+    raise ValueError(f"Unknown search mode '{mode}'.")
+
+
+def _transcript_vector_hits(db: Session, transcript_id: int, query: str, top_k: int,
+                            config: Optional[schemas.AIConfig] = None):
+    model = (config and config.embed_model) or os.getenv("OPENAI_EMBED_MODEL") or "text-embedding-3-small"
+    if pg_vectors.is_postgres(db):
+        # ✨ Nearest-neighbour search runs in PostgreSQL
+        q_emb = np.asarray(get_embedding(query, config=config), dtype=np.float32)
+        return pg_vectors.search(db, q_emb, model, top_k, transcript_ids=[transcript_id], processed_only=False)
+    # ✨ Reuse the pre-normalized matrix for this transcript if we have already built it
+    index = index_cache.get((transcript_id, model))
+    if index is None:
+        generation = index_cache.generation(transcript_id)
+        rows = db.query(Chunk.id, Chunk.embedding).filter(
+            Chunk.transcript_id == transcript_id, Chunk.embedding_model == model
+        ).all()
+        if not rows: return []
+        index = TranscriptIndex([r.id for r in rows], unpack_embeddings([r.embedding for r in rows]))
+        index_cache.put((transcript_id, model), index, generation)
+    q_emb = np.asarray(get_embedding(query, config=config), dtype=np.float32)
+    return [(int(index.chunk_ids[i]), score) for i, score in index.top_k(q_emb, top_k)]
+
+
+def iter_search_similar(db: Session, transcript_id: int, query: str, top_k=5,
+                        config: Optional[schemas.AIConfig] = None, mode: str = "vector"):
+    """✨ Yields the ranked hits of search_similar one by one, as soon as the ranking is final."""
+    hits = _ranked_hits(
+        mode, top_k,
+        vector_hits=lambda k: _transcript_vector_hits(db, transcript_id, query, k, config=config),
+        keyword_hits=lambda k: keyword_search.search(db, query, k, transcript_ids=[transcript_id],
+                                                     processed_only=False),
+    )
+    if not hits: return
+    texts = dict(db.query(Chunk.id, Chunk.text).filter(Chunk.id.in_([chunk_id for chunk_id, _ in hits])).all())
     # 🧹 CLEANUP: Removed db.close()
-    return results
+    for chunk_id, score in hits:
+        if chunk_id in texts:
+            yield {"chunk_id": chunk_id, "text": texts[chunk_id], "score": score}
+
+
+def search_similar(db: Session, transcript_id: int, query: str, top_k=5, config: Optional[schemas.AIConfig] = None,
+                   mode: str = "vector"):
+    return list(iter_search_similar(db, transcript_id, query, top_k=top_k, config=config, mode=mode))
+
+
+def _iter_embedding_blocks(rows: Iterable, block_size: int):
+    """Groups streamed (id, embedding) rows into (ids, float32 matrix) blocks."""
+    ids, blobs = [], []
+    for row in rows:
+        ids.append(row.id)
+        blobs.append(row.embedding)
+        if len(ids) >= block_size:
+            yield ids, unpack_embeddings(blobs)
+            ids, blobs = [], []
+    if ids:
+        yield ids, unpack_embeddings(blobs)
+
+
+def _corpus_fingerprint(db: Session, model: str):
+    """(count, max id) of the searchable chunks for `model`; an ANN index is fresh iff it matches."""
+    processed = select(Transcript.id).where(Transcript.status == "processed")
+    count, max_id = db.query(func.count(Chunk.id), func.max(Chunk.id)).filter(
+        Chunk.transcript_id.in_(processed), Chunk.embedding_model == model
+    ).one()
+    return count, max_id
+
+
+def rebuild_ann_index(db: Session, embed_model: Optional[str] = None, sample_size: int = None):
+    """Builds the ANN index for an embedding model from all searchable chunks and persists it."""
+    model = embed_model or os.getenv("OPENAI_EMBED_MODEL") or "text-embedding-3-small"
+    if pg_vectors.is_postgres(db):
+        # ✨ PostgreSQL keeps its pgvector indexes up to date itself; just make sure they exist
+        dims = [d for (d,) in db.query(Chunk.embedding_dim).filter(Chunk.embedding_model == model).distinct()]
+        if not dims:
+            raise ValueError(f"No processed chunks found for embedding model '{model}'.")
+        for dim in dims:
+            pg_vectors.ensure_index(db, dim)
+        chunks = db.query(func.count(Chunk.id)).filter(Chunk.embedding_model == model).scalar()
+        return {"backend": "pgvector", "embed_model": model, "chunks": chunks}
+    if not ann_manager.enabled:
+        raise ValueError("ANN search is disabled (ANN_BACKEND=none).")
+    if sample_size is None:
+        sample_size = int(os.getenv("ANN_TRAIN_SAMPLE") or 50000)
+    block_size = int(os.getenv("SEARCH_BLOCK_SIZE") or 8192)
+    processed = select(Transcript.id).where(Transcript.status == "processed")
+    searchable = db.query(Chunk.id).filter(Chunk.transcript_id.in_(processed), Chunk.embedding_model == model)
+
+    all_ids = np.array([r.id for r in searchable], dtype=np.int64)
+    if not len(all_ids):
+        raise ValueError(f"No processed chunks found for embedding model '{model}'.")
+    sample_ids = np.random.default_rng(0).choice(all_ids, min(sample_size, len(all_ids)), replace=False)
+    sample = unpack_embeddings([
+        r.embedding for i in range(0, len(sample_ids), block_size)
+        for r in db.query(Chunk.embedding).filter(Chunk.id.in_(sample_ids[i:i + block_size].tolist()))
+    ])
+
+    def blocks():
+        rows = db.query(Chunk.id, Chunk.transcript_id, Chunk.embedding).filter(
+            Chunk.transcript_id.in_(processed), Chunk.embedding_model == model
+        ).yield_per(block_size)
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= block_size:
+                yield [r.id for r in batch], [r.transcript_id for r in batch], unpack_embeddings([r.embedding for r in batch])
+                batch = []
+        if batch:
+            yield [r.id for r in batch], [r.transcript_id for r in batch], unpack_embeddings([r.embedding for r in batch])
+
+    index = ann_manager.build(model, sample, len(all_ids), blocks())
+    return {"backend": index.kind, "embed_model": model, "chunks": len(index)}
+
+
+def _corpus_vector_hits(db: Session, query: str, top_k: int, transcript_ids: Optional[List[int]],
+                        config: Optional[schemas.AIConfig], block_size: int):
+    model = (config and config.embed_model) or os.getenv("OPENAI_EMBED_MODEL") or "text-embedding-3-small"
+    q_emb = np.asarray(get_embedding(query, config=config), dtype=np.float32)
+
+    # ✨ Use pgvector on PostgreSQL, else the ANN index when one exists and matches the DB; otherwise scan exactly
+    if pg_vectors.is_postgres(db):
+        return pg_vectors.search(db, q_emb, model, top_k, transcript_ids=transcript_ids)
+    ann_index = ann_manager.get(model)
+    if ann_index is not None:
+        fingerprint = _corpus_fingerprint(db, model)
+        if ann_index.fingerprint() != fingerprint:
+            # ✨ Another worker may have recorded deltas or rebuilt the index since it was loaded
+            ann_index = ann_manager.refresh(model)
+        if ann_index is not None and ann_index.fingerprint() == fingerprint:
+            hits = ann_index.search(q_emb, top_k, transcript_ids=transcript_ids)
+            if hits is not None:
+                return hits
+    processed = select(Transcript.id).where(Transcript.status == "processed")
+    if transcript_ids:
+        processed = processed.where(Transcript.id.in_(transcript_ids))
+    rows = db.query(Chunk.id, Chunk.embedding).filter(
+        Chunk.transcript_id.in_(processed), Chunk.embedding_model == model
+    ).yield_per(block_size)
+    return blocked_top_k(_iter_embedding_blocks(rows, block_size), q_emb, top_k)
+
+
+def iter_search_corpus(db: Session, query: str, top_k=5, transcript_ids: Optional[List[int]] = None,
+                       config: Optional[schemas.AIConfig] = None, block_size: int = None, mode: str = "vector"):
+    """
+    Search over every processed transcript (or the given subset) with a single top-k.
+    For exact vector scans, embeddings are streamed from the DB in blocks so memory stays bounded.
+    ✨ Hits are yielded one by one, best first, as soon as the ranking is final.
+    """
+    if block_size is None:
+        block_size = int(os.getenv("SEARCH_BLOCK_SIZE") or 8192)
+    hits = _ranked_hits(
+        mode, top_k,
+        vector_hits=lambda k: _corpus_vector_hits(db, query, k, transcript_ids, config, block_size),
+        keyword_hits=lambda k: keyword_search.search(db, query, k, transcript_ids=transcript_ids),
+    )
+    if not hits: return
+
+    details = {
+        r.id: r for r in db.query(Chunk.id, Chunk.transcript_id, Chunk.text, Chunk.start_pos, Chunk.end_pos,
+                                  Transcript.title)
+        .join(Transcript, Chunk.transcript_id == Transcript.id)
+        .filter(Chunk.id.in_([chunk_id for chunk_id, _ in hits]))
+    }
+    for chunk_id, score in hits:
+        if chunk_id in details:
+            row = details[chunk_id]
+            yield {"chunk_id": chunk_id, "transcript_id": row.transcript_id, "transcript_title": row.title,
+                   "start_pos": row.start_pos, "end_pos": row.end_pos, "text": row.text, "score": score}
+
+
+def search_corpus(db: Session, query: str, top_k=5, transcript_ids: Optional[List[int]] = None,
+                  config: Optional[schemas.AIConfig] = None, block_size: int = None, mode: str = "vector"):
+    return list(iter_search_corpus(db, query, top_k=top_k, transcript_ids=transcript_ids, config=config,
+                                   block_size=block_size, mode=mode))
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Rate limits, timeouts, connection errors and 5xx responses are worth retrying."""
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def call_with_retries(fn, max_retries: int = None, base_delay: float = None):
+    """Calls fn(), retrying retryable API errors with exponential backoff and full jitter."""
+    if max_retries is None:
+        max_retries = int(os.getenv("LLM_MAX_RETRIES") or 4)
+    if base_delay is None:
+        base_delay = float(os.getenv("LLM_RETRY_BASE_DELAY") or 0.5)
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= max_retries or not _is_retryable(e):
+                raise
+            time.sleep(random.uniform(0, base_delay * 2 ** attempt))
+
+
+def cached_chat_completion(request_client: OpenAI, model: str, system: str, user: str, temperature: float,
+                           response_format: Optional[dict] = None, bypass_cache: bool = False) -> str:
+    """
+    Returns the completion text for (model, system, user, response_format), served from the
+    persistent response cache when possible. `bypass_cache` forces a fresh call (whose
+    result still refreshes the cache). JSON responses are only cached if they parse.
+    """
+    key = response_cache.key(model, system, user, response_format)
+    if not bypass_cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+    kwargs = {"response_format": response_format} if response_format else {}
+    # ✨ Counted and timed (including retries) for /metrics
+    res = metrics.observe_openai(
+        "chat", model,
+        lambda: call_with_retries(lambda: request_client.chat.completions.create(
+            model=model, messages=[{"role": "system", "content": system}, {"role": "user", "content": user}],
+            temperature=temperature, **kwargs)),
+        usage=lambda r: (r.usage.prompt_tokens, r.usage.completion_tokens) if r.usage else None)
+    content = res.choices[0].message.content
+    if response_format and response_format.get("type") == "json_object":
+        json.loads(content)
+    response_cache.put(key, model, content)
+    return content
+
+
+def stream_chat_completion(request_client: OpenAI, model: str, system: str, user: str, temperature: float,
+                           bypass_cache: bool = False) -> Iterator[str]:
+    """
+    ✨ Like cached_chat_completion, but yields the text deltas as the model produces them. A
+    cached response is yielded in one piece; a completed stream is added to the cache.
+    """
+    key = response_cache.key(model, system, user)
+    if not bypass_cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+    parts = []
+    start = time.perf_counter()
+    try:
+        stream = call_with_retries(lambda: request_client.chat.completions.create(
+            model=model, messages=[{"role": "system", "content": system}, {"role": "user", "content": user}],
+            temperature=temperature, stream=True, stream_options={"include_usage": True}))
+        for event in stream:
+            # The token counts arrive in a final chunk with no choices
+            if getattr(event, "usage", None):
+                metrics.record_tokens("chat", model, event.usage.prompt_tokens, event.usage.completion_tokens)
+            delta = event.choices[0].delta.content if event.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
+    except Exception:
+        metrics.OPENAI_REQUESTS.inc(kind="chat", model=model, outcome="error")
+        raise
+    finally:
+        metrics.OPENAI_LATENCY.observe(time.perf_counter() - start, kind="chat", model=model)
+    metrics.OPENAI_REQUESTS.inc(kind="chat", model=model, outcome="ok")
+    response_cache.put(key, model, "".join(parts))
 
 
-def analyze_chunk_with_llm(chunk_text: str, config: Optional[schemas.AIConfig] = None):
-    request_client = get_openai_client(config)
+def analyze_chunk_with_llm(chunk_text: str, config: Optional[schemas.AIConfig] = None, client: Optional[OpenAI] = None,
+                           bypass_cache: bool = False):
+    request_client = client or get_openai_client(config)
+    # ✨ Per-request timeout; retries are handled by call_with_retries (with jitter) instead of the SDK
+    request_client = request_client.with_options(timeout=float(os.getenv("LLM_TIMEOUT") or 60), max_retries=0)
     # Get model from config, or fallback to environment variable
-    model = (config and config.llm_model) or os.getenv("OPENAI_LLM_MODEL", "gpt-4o-mini")
+    model = (config and config.llm_model) or os.getenv("OPENAI_LLM_MODEL") or "gpt-4o-mini"
     system = "You are a qualitative research assistant. Produce a JSON object with keys: 'summary' (short), 'codes' (list of objects with 'code', 'definition', and 'quotes' list). Output JSON only."
     prompt = f"Transcript chunk:\n\"\"\"{chunk_text}\"\"\"\nPlease produce:\n1) short summary (1-2 sentences)\n2) list up to 5 codes. For each code give: 'code' (short label), 'definition' (one line), and 1-2 short quotes from the chunk that illustrate it.\nReturn JSON only. "
     try:
-        res = request_client.chat.completions.create(model=model, messages=[{"role": "system", "content": system},
-                                                                        {"role": "user", "content": prompt}],
-                                             temperature=0.0, response_format={"type": "json_object"})
-        content = res.choices[0].message.content
+        content = cached_chat_completion(request_client, model, system, prompt, temperature=0.0,
+                                         response_format={"type": "json_object"}, bypass_cache=bypass_cache)
         return json.loads(content)
     except Exception as e:
         print(f"Error analyzing chunk with LLM: {e}");
         return {"error": str(e)}
 
 
+def iter_chunk_analyses(db: Session, rows: List, pool: ThreadPoolExecutor, config: Optional[schemas.AIConfig] = None,
+                        client: Optional[OpenAI] = None, bypass_cache: bool = False, counts: Optional[dict] = None):
+    """
+    ✨ Yields the analysis of each chunk row (with .text and .content_hash) in order. Analyses
+    are read from the analysis store when present; the rest are requested concurrently on `pool`
+    and stored when the generator finishes or is closed, so a cancelled run keeps its progress.
+    `bypass_cache` re-analyzes every chunk and overwrites the stored analyses. `counts` is filled
+    with the number of LLM calls made and saved.
+    """
+    model = (config and config.llm_model) or os.getenv("OPENAI_LLM_MODEL") or "gpt-4o-mini"
+    hashes = [row.content_hash or content_hash(row.text) for row in rows]
+    stored = {} if bypass_cache else analysis_store.load(db, hashes, model)
+    pending = {}
+    for h, row in zip(hashes, rows):
+        if h not in stored and h not in pending:
+            pending[h] = pool.submit(analyze_chunk_with_llm, row.text, config=config, client=client,
+                                     bypass_cache=bypass_cache)
+    analysis_store.record(reused=len(hashes) - len(pending), analyzed=len(pending))
+    if counts is not None:
+        counts.update(llm_calls=len(pending), llm_calls_saved=len(hashes) - len(pending))
+
+    fresh = {}
+    try:
+        for h in hashes:
+            if h in stored:
+                yield stored[h]
+                continue
+            analysis = pending[h].result()
+            if "error" not in analysis:
+                fresh[h] = analysis
+            yield analysis
+    finally:
+        if fresh:
+            try:
+                analysis_store.save(db, model, fresh)
+            except Exception as e:
+                db.rollback()
+                print(f"Could not store chunk analyses: {e}")
+
+
 # ✨ --- NEW: Robust, recursive formatter now lives in the service layer ---
 def format_data_to_markdown(data, indent_level=0) -> str:
     """
@@ -147,38 +458,190 @@ def format_data_to_markdown(data, indent_level=0) -> str:
         return str(data)
 
 
-def generate_memo_content(db: Session, transcript_id: int, config: Optional[schemas.AIConfig] = None):
+def _memo_note(analysis: dict) -> Optional[str]:
+    """A chunk's map-step note: its summary plus the codes (and one quote each) found in it."""
+    if not isinstance(analysis, dict) or "error" in analysis:
+        return None
+    lines = [format_data_to_markdown(analysis.get("summary", "")).strip()]
+    for code in analysis.get("codes", []) if isinstance(analysis.get("codes"), list) else []:
+        if not isinstance(code, dict) or not code.get("code"):
+            continue
+        quotes = code.get("quotes") or []
+        quote = f' — "{quotes[0]}"' if isinstance(quotes, list) and quotes else ""
+        lines.append(f"- {code['code']}{quote}")
+    note = "\n".join(line for line in lines if line)
+    return note or None
+
+
+def _group_by_tokens(notes: List[str], token_budget: int) -> List[List[str]]:
+    """Packs consecutive notes into groups of at most token_budget tokens (a longer note is its own group)."""
+    tokenizer = get_tokenizer()
+    groups, current, current_tokens = [], [], 0
+    for note in notes:
+        tokens = tokenizer.count(note)
+        if current and current_tokens + tokens > token_budget:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(note)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _reduce_memo_notes(request_client: OpenAI, model: str, notes: List[str], bypass_cache: bool) -> str:
+    system_prompt = "You are a qualitative research analyst. You condense notes on consecutive parts of an interview into one set of notes."
+    user_prompt = ("Notes on consecutive parts of an interview, in order:\n---\n" + "\n---\n".join(notes) +
+                   "\n---\nCondense them into one set of notes (at most ~300 words). Keep distinct themes, any "
+                   "tensions or contradictions between statements, open questions and the most telling quotes. "
+                   "Plain text only.")
+    return cached_chat_completion(request_client, model, system_prompt, user_prompt, temperature=0.0,
+                                  bypass_cache=bypass_cache)
+
+
+def _reduce_memo_layers(pool: ThreadPoolExecutor, request_client: OpenAI, model: str, notes: List[str],
+                        bypass_cache: bool) -> List[str]:
+    """Condenses token-bounded groups of notes concurrently, level by level, until one group remains."""
+    token_budget = int(os.getenv("MEMO_REDUCE_TOKENS") or 4000)
+    groups = _group_by_tokens(notes, token_budget)
+    while len(groups) > 1:
+        notes = list(pool.map(lambda group: _reduce_memo_notes(request_client, model, group, bypass_cache), groups))
+        next_groups = _group_by_tokens(notes, token_budget)
+        if len(next_groups) == len(groups):
+            break  # Notes no longer shrink; synthesize from this layer
+        groups = next_groups
+    return notes
+
+
+def _memo_pool(chunks: int) -> ThreadPoolExecutor:
+    """
+    The memo's map step makes one LLM call per chunk not yet analyzed, MEMO_MAP_CONCURRENCY
+    (default LLM_CONCURRENCY) at a time, so its cold latency is ~ceil(chunks / concurrency)
+    round-trips; the reduce tree adds one round-trip per layer. Raise it as far as the API
+    rate limit allows (429s are retried) to approach depth-bounded latency.
+    """
+    concurrency = int(os.getenv("MEMO_MAP_CONCURRENCY") or os.getenv("LLM_CONCURRENCY") or 8)
+    return ThreadPoolExecutor(max_workers=max(1, min(concurrency, chunks)))
+
+
+def generate_memo_content(db: Session, transcript_id: int, config: Optional[schemas.AIConfig] = None,
+                          bypass_cache: bool = False, progress: Optional[Callable[[float], None]] = None):
+    """
+    ✨ Map-reduce memo over the whole transcript: every chunk is summarized concurrently (the
+    same per-chunk analysis as code generation, read from the analysis store when present), the
+    notes are reduced in groups of at most MEMO_REDUCE_TOKENS tokens until they fit one prompt,
+    and the memo is written from that layer. Once the chunks are analyzed (e.g. after generating
+    codes) latency grows with the depth of the reduce tree; a cold map step still grows with the
+    number of chunks over the map concurrency (see _memo_pool).
+    """
     request_client = get_openai_client(config)
     # Get model from config, or fallback to environment variable
-    model = (config and config.llm_model) or os.getenv("OPENAI_LLM_MODEL", "gpt-4o-mini")
-    chunks = db.query(Chunk).filter(Chunk.transcript_id == transcript_id).limit(15).all()
-    if not chunks:
+    model = (config and config.llm_model) or os.getenv("OPENAI_LLM_MODEL") or "gpt-4o-mini"
+    rows = db.query(Chunk.text, Chunk.content_hash).filter(Chunk.transcript_id == transcript_id).order_by(Chunk.start_pos).all()
+    if not rows:
         db.close()
         return {"error": "This transcript has not been processed for AI analysis yet. Chunks are missing."}
-    texts = [c.text for c in chunks]
-    # db.close()
-    if not texts: return {"summary": "No data to generate memo.", "contradictions": [], "followups": []}
-    full_text_sample = "\n---\n".join(texts)
-    system_prompt = "You are a qualitative research analyst. Your task is to write an analytic memo based on interview excerpts. Your output must be a valid JSON object."
-    user_prompt = f"Based on the following excerpts...\n---\n{full_text_sample}\n---\nWrite an analytic memo with three sections... JSON object with the keys 'summary', 'contradictions', and 'followups'..."
+
+    pool = _memo_pool(len(rows))
     try:
-        res = request_client.chat.completions.create(model=model, messages=[{"role": "system", "content": system_prompt},
-                                                                        {"role": "user", "content": user_prompt}],
-                                             temperature=0.7, response_format={"type": "json_object"})
-        content = res.choices[0].message.content
-        return json.loads(content)
+        # Map: one note per chunk, in transcript order
+        notes = []
+        with closing(iter_chunk_analyses(db, rows, config=config, client=request_client, pool=pool,
+                                         bypass_cache=bypass_cache)) as analyses:
+            for done, analysis in enumerate(analyses, start=1):
+                if progress:
+                    progress(0.9 * done / len(rows))
+                note = _memo_note(analysis)
+                if note:
+                    notes.append(note)
+        if not notes:
+            return {"error": "API call to generate memo failed."}
+
+        try:
+            notes_text = "\n---\n".join(_reduce_memo_layers(pool, request_client, model, notes, bypass_cache))
+            system_prompt = "You are a qualitative research analyst. Your task is to write an analytic memo based on notes on an interview. Your output must be a valid JSON object."
+            user_prompt = f"Based on the following notes on the whole interview, in order...\n---\n{notes_text}\n---\nWrite an analytic memo with three sections... JSON object with the keys 'summary', 'contradictions', and 'followups'..."
+            content = cached_chat_completion(request_client, model, system_prompt, user_prompt, temperature=0.7,
+                                             response_format={"type": "json_object"}, bypass_cache=bypass_cache)
+            return json.loads(content)
+        except Exception as e:
+            print(f"Error generating memo: {e}")
+            return {"error": "API call to generate memo failed."}
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def stream_memo_preview(db: Session, transcript_id: int, config: Optional[schemas.AIConfig] = None,
+                        bypass_cache: bool = False) -> Iterator[Tuple[str, dict]]:
+    """
+    ✨ Streaming variant of the memo preview. Yields (event, data) pairs: "progress" while the
+    chunks are summarized and reduced, "token" for each text delta of the memo (written directly
+    as Markdown so it can be shown as it arrives), then "done" with the full content and the id
+    of its stored preview (see store_memo_preview), or "error".
+    """
+    try:
+        request_client = get_openai_client(config)
+    except ValueError as e:
+        yield "error", {"detail": str(e)}
+        return
+    model = (config and config.llm_model) or os.getenv("OPENAI_LLM_MODEL") or "gpt-4o-mini"
+    rows = db.query(Chunk.text, Chunk.content_hash).filter(Chunk.transcript_id == transcript_id).order_by(Chunk.start_pos).all()
+    if not rows:
+        yield "error", {"detail": "This transcript has not been processed for AI analysis yet. Chunks are missing."}
+        return
+
+    yield "progress", {"stage": "map", "done": 0, "total": len(rows)}
+    pool = _memo_pool(len(rows))
+    try:
+        notes = []
+        with closing(iter_chunk_analyses(db, rows, config=config, client=request_client, pool=pool,
+                                         bypass_cache=bypass_cache)) as analyses:
+            for done, analysis in enumerate(analyses, start=1):
+                yield "progress", {"stage": "map", "done": done, "total": len(rows)}
+                note = _memo_note(analysis)
+                if note:
+                    notes.append(note)
+        if not notes:
+            yield "error", {"detail": "API call to generate memo failed."}
+            return
+        yield "progress", {"stage": "reduce", "notes": len(notes)}
+        try:
+            notes_text = "\n---\n".join(_reduce_memo_layers(pool, request_client, model, notes, bypass_cache))
+        except Exception as e:
+            print(f"Error generating memo: {e}")
+            yield "error", {"detail": "API call to generate memo failed."}
+            return
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+    yield "progress", {"stage": "write"}
+    system_prompt = "You are a qualitative research analyst. Your task is to write an analytic memo based on notes on an interview. Your output must be Markdown."
+    user_prompt = f"Based on the following notes on the whole interview, in order...\n---\n{notes_text}\n---\nWrite an analytic memo with three sections, headed '## Summary', '## Contradictions' and '## Follow-up Questions'..."
+    parts = []
+    try:
+        for delta in stream_chat_completion(request_client, model, system_prompt, user_prompt, temperature=0.7,
+                                            bypass_cache=bypass_cache):
+            parts.append(delta)
+            yield "token", {"text": delta}
     except Exception as e:
         print(f"Error generating memo: {e}")
-        return {"error": "API call to generate memo failed."}
+        yield "error", {"detail": "API call to generate memo failed."}
+        return
+    content = "".join(parts)
+    preview = store_memo_preview(db, transcript_id, content)
+    yield "done", {"content": content, "preview_id": preview.id, "expires_at": preview.expires_at.isoformat()}
 
 
 # ✨ --- NEW HELPER: Shared logic for creating the final memo content string ---
-def get_formatted_memo_content(db: Session, transcript_id: int, config: Optional[schemas.AIConfig] = None) -> (str, dict):
+def get_formatted_memo_content(db: Session, transcript_id: int, config: Optional[schemas.AIConfig] = None,
+                               bypass_cache: bool = False,
+                               progress: Optional[Callable[[float], None]] = None) -> (str, dict):
     """
     Gets the raw AI response and formats it into a clean Markdown string.
     Returns both the final string and the original JSON for flexibility.
     """
-    memo_json = generate_memo_content(db=db, transcript_id=transcript_id, config=config)
+    memo_json = generate_memo_content(db=db, transcript_id=transcript_id, config=config, bypass_cache=bypass_cache,
+                                      progress=progress)
     if "error" in memo_json:
         return None, memo_json
 
@@ -196,132 +659,285 @@ def get_formatted_memo_content(db: Session, transcript_id: int, config: Optional
     return "\n".join(full_content_parts), memo_json
 
 
+def _resolve_unique_titles(db: Session, titles: List[str]) -> List[str]:
+    """
+    Appends _1, _2, ... to titles that already exist (or repeat within `titles`),
+    fetching every potentially clashing title with a single query.
+    """
+    stems = values(column("stem", String), name="stems").data(
+        [(stem,) for stem in {os.path.splitext(t)[0] for t in titles}]
+    ).cte("stems")
+    taken = set(db.scalars(
+        select(Transcript.title).distinct()
+        .join(stems, func.substr(Transcript.title, 1, func.length(stems.c.stem)) == stems.c.stem)
+    ))
+    resolved = []
+    for title in titles:
+        name, ext = os.path.splitext(title)
+        candidate, counter = title, 1
+        while candidate in taken:
+            candidate = f"{name}_{counter}{ext}"
+            counter += 1
+        taken.add(candidate)
+        resolved.append(candidate)
+    return resolved
+
+
+def create_transcript_entries(db: Session, entries: List[tuple]) -> List[Transcript]:
+    """Inserts (title, file_path) entries in one transaction, making each title unique."""
+    if not entries:
+        return []
+    titles = _resolve_unique_titles(db, [title for title, _ in entries])
+    transcripts = [Transcript(title=title, file_path=file_path) for title, (_, file_path) in zip(titles, entries)]
+    db.add_all(transcripts)
+    db.flush()
+    transcript_ids = [t.id for t in transcripts]
+    db.commit()
+    # Reload all rows in one query rather than refreshing each expired instance
+    db.query(Transcript).filter(Transcript.id.in_(transcript_ids)).all()
+    return transcripts
+
+
 # ✅ FINAL FIX: This is the definitive corrected function.
 def create_transcript_entry(db: Session, title: str, file_path: str):
-    base_title = title
-    counter = 1
-    while db.query(Transcript).filter(Transcript.title == title).first():
-        name, ext = os.path.splitext(base_title)
-        title = f"{name}_{counter}{ext}"
-        counter += 1
-
-    transcript_db = Transcript(title=title, file_path=file_path)
-    db.add(transcript_db)
-    db.commit()
-    db.refresh(transcript_db)
-    return transcript_db
+    return create_transcript_entries(db, [(title, file_path)])[0]
 
 
-def read_docx_from_path(path):
-    # (This function is unchanged)
-    doc = Document(path)
-    text = "\n".join(p.text for p in doc.paragraphs)
-    # Create a new temp file for the text content
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".txt", mode="w", encoding="utf-8") as tmp:
-        tmp.write(text)
-    return tmp.name
+def _count_chars(path) -> int:
+    return sum(len(piece) for piece in iter_document_text(path))
+
+
+class Cancelled(Exception):
+    """Raised by a `progress` callback to stop the work it reports on."""
 
 
-def process_transcript_for_ai(db: Session, transcript_id: int):
-    """ Memory-safe processing. Reads from the file path stored in the Transcript."""
+def process_transcript_for_ai(db: Session, transcript_id: int, config: Optional[schemas.AIConfig] = None,
+                              progress: Optional[Callable[[float], None]] = None):
+    """
+    Memory-safe, incremental processing. Reads from the file path stored in the Transcript.
+    Chunks whose content hash and embedding model match a stored chunk keep that row and
+    its embedding; only new or changed chunks are embedded. The chunk table is rewritten
+    in a single transaction at the end, so a failed run leaves the previous chunks intact.
+    `progress`, if given, is called with the completed fraction (0.0-1.0) after each batch.
+    """
     transcript = db.query(Transcript).filter(Transcript.id == transcript_id).first()
     if not transcript or not os.path.exists(transcript.file_path):
         raise ValueError("Transcript or its associated file not found")
 
     # ✨ Update status to show work is in progress
+    previous_status = transcript.status
     transcript.status = "processing"
     db.commit()
 
     try:
-        db.query(Chunk).filter(Chunk.transcript_id == transcript_id).delete()
-
         path_to_process = transcript.file_path
-        is_converted_temp = False
-        if path_to_process.lower().endswith(".docx"):
-            path_to_process = read_docx_from_path(path_to_process)
-            is_converted_temp = True
-
-        for start, end, chunk_text_ in stream_chunks_from_file(path_to_process):
-            emb = get_embedding(chunk_text_)
-            c = Chunk(transcript_id=transcript_id, text=chunk_text_, embedding=json.dumps(emb), start_pos=start,
-                      end_pos=end)
-            db.add(c)
-
-        if is_converted_temp:
-            os.remove(path_to_process)
-
+        request_client = get_openai_client(config)
+        embed_model = (config and config.embed_model) or os.getenv("OPENAI_EMBED_MODEL") or "text-embedding-3-small"
+
+        # ✨ Stored chunks with a usable embedding, by content hash (a list, since text can repeat)
+        reusable, stale_ids = {}, []
+        for row in db.query(Chunk.id, Chunk.text, Chunk.content_hash, Chunk.embedding_model,
+                            Chunk.embedding.is_not(None).label("has_embedding")).filter(
+                Chunk.transcript_id == transcript_id).order_by(Chunk.start_pos):
+            if row.embedding_model == embed_model and row.has_embedding:
+                reusable.setdefault(row.content_hash or content_hash(row.text), []).append(row.id)
+            else:
+                stale_ids.append(row.id)
+
+        # ✨ Embed only the chunks without a reusable row, in batches (one API request per batch)
+        total_chars = _count_chars(path_to_process) if progress else 0
+        reused_rows, new_rows = [], []
+        for batch in batch_chunks_for_embedding(stream_chunks_from_file(path_to_process)):
+            to_embed = []
+            for start, end, chunk_text_ in batch:
+                digest = content_hash(chunk_text_)
+                if reusable.get(digest):
+                    reused_rows.append({"id": reusable[digest].pop(0), "start_pos": start, "end_pos": end})
+                else:
+                    to_embed.append((start, end, chunk_text_, digest))
+            if to_embed:
+                embeddings = get_embeddings([c[2] for c in to_embed], config=config, client=request_client)
+                new_rows.extend(
+                    {"transcript_id": transcript_id, "text": chunk_text_, "content_hash": digest,
+                     "embedding": pack_embedding(emb), "embedding_dim": len(emb), "embedding_model": embed_model,
+                     "start_pos": start, "end_pos": end}
+                    for (start, end, chunk_text_, digest), emb in zip(to_embed, embeddings)
+                )
+            if progress and total_chars:
+                progress(min(batch[-1][1] / total_chars, 1.0))
+
+        # ✨ Apply offsets, inserts and deletions in one transaction
+        stale_ids.extend(chunk_id for ids in reusable.values() for chunk_id in ids)
+        if stale_ids:
+            db.execute(delete(Chunk).where(Chunk.id.in_(stale_ids)))
+        if reused_rows:
+            db.execute(update(Chunk), reused_rows)
+        if new_rows:
+            with BulkInserter(db, Chunk, commit=False) as writer:
+                writer.extend(new_rows)
         transcript.status = "processed"
         db.commit()
-        return {"message": f"Transcript '{transcript.title}' processed for AI analysis."}
+
+        if pg_vectors.is_postgres(db):
+            # ✨ New embedding sizes get their pgvector index on first use
+            for dim in {row["embedding_dim"] for row in new_rows}:
+                pg_vectors.ensure_index(db, dim)
+        # ✨ Keep an existing ANN index in sync without a full rebuild
+        elif ann_manager.has_index(embed_model):
+            rows = db.query(Chunk.id, Chunk.embedding).filter(
+                Chunk.transcript_id == transcript_id, Chunk.embedding_model == embed_model
+            ).all()
+            ann_manager.replace_transcript(embed_model, transcript_id, [r.id for r in rows],
+                                           unpack_embeddings([r.embedding for r in rows]))
+        return {
+            "message": f"Transcript '{transcript.title}' processed for AI analysis.",
+            "chunks": len(reused_rows) + len(new_rows),
+            "reused": len(reused_rows),
+            "embedded": len(new_rows),
+        }
     except Exception as e:
-        # ✨ If anything goes wrong, mark the status as failed
-        transcript.status = "failed"
+        # ✨ If anything goes wrong, mark the status as failed; a cancelled run changed nothing
+        # (the rollback kept the previous chunks), so it gets its previous status back
+        db.rollback()
+        transcript.status = previous_status if isinstance(e, Cancelled) else "failed"
         db.commit()
         # Re-raise the exception to be caught by the endpoint
         raise e
     finally:
-        pass
+        # ✨ The chunks changed, so any cached search index is stale
+        index_cache.invalidate(transcript_id)
 
 # ✨ --- 新增和修改的函数 ---
 
-def create_memo_from_ai(db: Session, transcript_id: int, config: Optional[schemas.AIConfig] = None):
+def _save_ai_memo(db: Session, transcript: Transcript, content: str) -> Memo:
+    # Save the clean Markdown string to the database
+    new_memo = Memo(
+        title=f"AI Memo for Transcript: '{transcript.title}'",
+        content=content
+    )
+    db.add(new_memo)
+    db.commit()
+    db.refresh(new_memo)
+    return new_memo
+
+
+def create_memo_from_ai(db: Session, transcript_id: int, config: Optional[schemas.AIConfig] = None,
+                        progress: Optional[Callable[[float], None]] = None, bypass_cache: bool = False):
     """ ✅ FIX: This function now uses the new shared helper to get clean Markdown content."""
     transcript = db.query(Transcript).filter(Transcript.id == transcript_id).first()
     if not transcript:
         return None
 
     # Use the helper to get the formatted string
-    formatted_content, _ = get_formatted_memo_content(db, transcript_id, config=config)
+    formatted_content, _ = get_formatted_memo_content(db, transcript_id, config=config, bypass_cache=bypass_cache,
+                                                      progress=progress)
     if not formatted_content:
         return None
+    if progress:
+        progress(1.0)
+    return _save_ai_memo(db, transcript, formatted_content)
 
-    # Save the clean Markdown string to the database
-    new_memo = Memo(
-        title=f"AI Memo for Transcript: '{transcript.title}'",
-        content=formatted_content
-    )
-    db.add(new_memo)
+
+def store_memo_preview(db: Session, transcript_id: int, content: str) -> MemoPreview:
+    """
+    ✨ Keeps a generated memo preview for MEMO_PREVIEW_TTL seconds (default one hour) so that
+    saving it stores exactly what was shown, without generating the memo again. Expired
+    previews are purged here.
+    """
+    now = datetime.datetime.now(datetime.UTC)
+    db.execute(delete(MemoPreview).where(MemoPreview.expires_at < now))
+    preview = MemoPreview(id=uuid.uuid4().hex, transcript_id=transcript_id, content=content, created_at=now,
+                          expires_at=now + datetime.timedelta(seconds=int(os.getenv("MEMO_PREVIEW_TTL") or 3600)))
+    db.add(preview)
     db.commit()
-    db.refresh(new_memo)
-    return new_memo
+    return preview
 
 
+def save_memo_from_preview(db: Session, preview_id: str) -> Optional[Memo]:
+    """Saves a stored preview as a memo (no LLM call) and discards the preview; None if unknown or expired."""
+    now = datetime.datetime.now(datetime.UTC)
+    preview = db.query(MemoPreview).filter(MemoPreview.id == preview_id).first()
+    if not preview or preview.expires_at.replace(tzinfo=datetime.UTC) < now:
+        return None
+    transcript = db.query(Transcript).filter(Transcript.id == preview.transcript_id).first()
+    if not transcript:
+        return None
+    content = preview.content
+    db.delete(preview)
+    return _save_ai_memo(db, transcript, content)
+
 
-def generate_and_save_codes(db: Session, transcript_id: int, config: Optional[schemas.AIConfig] = None):
+def generate_and_save_codes(db: Session, transcript_id: int, config: Optional[schemas.AIConfig] = None,
+                            progress: Optional[Callable[[float], None]] = None, bypass_cache: bool = False):
     transcript = db.query(Transcript).filter(Transcript.id == transcript_id).first()
     if not transcript:
         # db.close()
         return {"error": "transcript not found"}
 
-    chunks = db.query(Chunk).filter(Chunk.transcript_id == transcript_id).all()
-    saved_codes_count = 0
-    for chunk in chunks:
-        analysis = analyze_chunk_with_llm(chunk.text, config=config)
-        if "codes" in analysis and isinstance(analysis["codes"], list):
-            for code_data in analysis["codes"]:
-                # AI返回的quotes是一个列表，我们将其合并
-                excerpt = "\n".join(code_data.get("quotes", []))
-                if not excerpt:  # 如果没有引文，使用部分chunk文本
-                    excerpt = chunk.text[:250] + "..."
-
-                new_code = Code(
-                    code=code_data.get("code", "Untitled"),
-                    excerpt=excerpt,
-                    transcript_id=transcript_id  # 关联到Dataset
-                )
-                db.add(new_code)
-                saved_codes_count += 1
+    chunks = db.query(Chunk.text, Chunk.content_hash).filter(Chunk.transcript_id == transcript_id).order_by(Chunk.start_pos).all()
+    # ✨ Analyze chunks concurrently on a bounded thread pool; analyses are still yielded in chunk order
+    concurrency = int(os.getenv("LLM_CONCURRENCY") or 8)
+    request_client = get_openai_client(config)
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    # ✨ Chunks analyzed before (by an earlier run or a memo) are read from the analysis store.
+    # Codes are bulk-inserted and committed every BULK_INSERT_BATCH_SIZE rows, so a failure
+    # or cancellation part-way keeps the codes of the chunks analyzed so far
+    counts = {}
+    try:
+        with BulkInserter(db, Code) as writer, closing(iter_chunk_analyses(
+                db, chunks, config=config, client=request_client, pool=pool, bypass_cache=bypass_cache,
+                counts=counts)) as analyses:
+            for done, (chunk, analysis) in enumerate(zip(chunks, analyses), start=1):
+                if progress:
+                    progress(done / len(chunks))
+                if "codes" not in analysis or not isinstance(analysis["codes"], list):
+                    continue
+                for code_data in analysis["codes"]:
+                    # AI返回的quotes是一个列表，我们将其合并
+                    excerpt = "\n".join(code_data.get("quotes", []))
+                    if not excerpt:  # 如果没有引文，使用部分chunk文本
+                        excerpt = chunk.text[:250] + "..."
+
+                    writer.add({
+                        "code": code_data.get("code", "Untitled"),
+                        "excerpt": excerpt,
+                        "transcript_id": transcript_id,  # 关联到Dataset
+                        "memo_id": None,
+                    })
+    finally:
+        # Drop queued analyses if we stop early (e.g. the job was cancelled)
+        pool.shutdown(cancel_futures=True)
 
-    db.commit()
-    # db.close()
-    return {"message": f"Successfully generated and saved {saved_codes_count} codes for transcript."}
+    return {"message": f"Successfully generated and saved {writer.inserted} codes for transcript.", **counts}
 
 
 # --- Manual CRUD Services ---
 
 
-def list_transcripts(db: Session):
-    return db.query(Transcript).all()
+# ✨ Fields each list endpoint can project, and the columns it can sort by
+TRANSCRIPT_LIST_FIELDS = {"id": Transcript.id, "title": Transcript.title, "status": Transcript.status}
+MEMO_LIST_FIELDS = {"id": Memo.id, "title": Memo.title, "content": Memo.content}
+MEMO_LIST_DEFAULT_FIELDS = "id,title"  # Memo bodies can be long: content only when `fields` names it
+CODE_LIST_FIELDS = {
+    "id": Code.id, "code": Code.code, "excerpt": Code.excerpt,
+    # Same precedence as before: the transcript wins over the memo
+    "source": case((Transcript.id.is_not(None), literal("Transcript: ") + Transcript.title),
+                   (Memo.id.is_not(None), literal("Memo: ") + Memo.title), else_=literal("N/A")),
+    "created_at": Code.created_at, "transcript_id": Code.transcript_id, "memo_id": Code.memo_id,
+}
+CODE_SORT_COLUMNS = {"id": Code.id, "created_at": Code.created_at, "code": Code.code}
+
+
+def list_transcripts(db: Session, limit: int = 100, cursor: Optional[str] = None, status: Optional[str] = None,
+                     sort: str = "id", fields: Optional[str] = None):
+    """Returns (page of transcript dicts with the requested fields, next cursor or None)."""
+    names = parse_fields(fields, TRANSCRIPT_LIST_FIELDS)
+    sort_column, descending = parse_sort(sort, {"id": Transcript.id, "title": Transcript.title})
+    stmt = select(*(TRANSCRIPT_LIST_FIELDS[n].label(n) for n in names))
+    if status:
+        stmt = stmt.where(Transcript.status == status)
+    rows, next_cursor = keyset_page(db, stmt, sort_column, Transcript.id, descending, cursor, limit)
+    return [{n: getattr(row, n) for n in names} for row in rows], next_cursor
 
 
 def create_memo(db: Session, title: str, content: str):
@@ -333,8 +949,14 @@ def create_memo(db: Session, title: str, content: str):
     return memo
 
 
-def list_memos(db: Session):
-    return db.query(Memo).all()
+def list_memos(db: Session, limit: int = 100, cursor: Optional[str] = None, sort: str = "id",
+               fields: Optional[str] = None):
+    """Returns (page of memo dicts with the requested fields, next cursor or None); content only if asked for."""
+    names = parse_fields(fields or MEMO_LIST_DEFAULT_FIELDS, MEMO_LIST_FIELDS)
+    sort_column, descending = parse_sort(sort, {"id": Memo.id, "title": Memo.title})
+    stmt = select(*(MEMO_LIST_FIELDS[n].label(n) for n in names))
+    rows, next_cursor = keyset_page(db, stmt, sort_column, Memo.id, descending, cursor, limit)
+    return [{n: getattr(row, n) for n in names} for row in rows], next_cursor
 
 
 def create_code(db: Session, payload: schemas.CodeCreate):
@@ -349,28 +971,39 @@ def create_code(db: Session, payload: schemas.CodeCreate):
     return new_code
 
 
-def list_codes(db: Session):
-    codes = db.query(Code).all()
-    results = []
-    for c in codes:
-        source_title = "N/A"
-        if c.transcript:
-            source_title = f"Transcript: {c.transcript.title}"
-        elif c.memo:
-            source_title = f"Memo: {c.memo.title}"
-
-        results.append({
-            "id": c.id, "code": c.code, "excerpt": c.excerpt, "source": source_title,
-            "created_at": c.created_at, "transcript_id": c.transcript_id,
-            "memo_id": c.memo_id
-        })
-    # db.close()
-    return results
+def list_codes(db: Session, limit: int = 100, cursor: Optional[str] = None, transcript_id: Optional[int] = None,
+               code_prefix: Optional[str] = None, created_after: Optional[datetime.datetime] = None,
+               created_before: Optional[datetime.datetime] = None, sort: str = "id", fields: Optional[str] = None):
+    """
+    Returns (page of code dicts with the requested fields, next cursor or None).
+    One SELECT per page: `source` comes from outer joins, not per-row relationship loads.
+    """
+    names = parse_fields(fields, CODE_LIST_FIELDS)
+    sort_column, descending = parse_sort(sort, CODE_SORT_COLUMNS)
+    stmt = select(*(CODE_LIST_FIELDS[n].label(n) for n in names))
+    if "source" in names:
+        stmt = (stmt.outerjoin(Transcript, Code.transcript_id == Transcript.id)
+                .outerjoin(Memo, Code.memo_id == Memo.id))
+    else:
+        stmt = stmt.select_from(Code)
+    if transcript_id is not None:
+        stmt = stmt.where(Code.transcript_id == transcript_id)
+    if code_prefix:
+        stmt = stmt.where(Code.code.startswith(code_prefix, autoescape=True))
+    if created_after:
+        stmt = stmt.where(Code.created_at >= created_after)
+    if created_before:
+        stmt = stmt.where(Code.created_at < created_before)
+    rows, next_cursor = keyset_page(db, stmt, sort_column, Code.id, descending, cursor, limit)
+    return [{n: getattr(row, n) for n in names} for row in rows], next_cursor
+
 
 def delete_transcript(db: Session, transcript_id: int):
     item = db.query(Transcript).filter(Transcript.id == transcript_id).first()
     if item:
         db.delete(item); db.commit()
+        index_cache.invalidate(transcript_id)
+        ann_manager.remove_transcript(transcript_id)
         return {"deleted": True}
     return {"deleted": False}
 
@@ -409,10 +1042,8 @@ def get_transcript_by_id(db: Session, transcript_id: int):
             raise FileNotFoundError("The source file for this transcript is missing.")
 
         if path_to_process.lower().endswith(".docx"):
-            temp_txt_path = read_docx_from_path(path_to_process)
-            with open(temp_txt_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            os.remove(temp_txt_path)
+            # ✨ Read paragraphs straight from the archive instead of converting to a temp file
+            content = "".join(iter_docx_text(path_to_process))
         else:
             with open(path_to_process, 'r', encoding='utf-8') as f:
                 content = f.read()
@@ -438,7 +1069,7 @@ def get_memo_by_id(db: Session, memo_id: int):
 
 # --- Helper to get a configured OpenAI client ---
 def get_openai_client(config: Optional[schemas.AIConfig] = None) -> OpenAI:
-    """Creates an OpenAI client based on user-provided config, falling back to .env"""
+    """Returns a pooled OpenAI client based on user-provided config, falling back to .env"""
     # Use user-provided key if available
     api_key = config.api_key if config and config.api_key else os.getenv("OPENAI_API_KEY")
     base_url = config.base_url if config and config.base_url else os.getenv("OPENAI_API_BASE_URL")
@@ -446,7 +1077,8 @@ def get_openai_client(config: Optional[schemas.AIConfig] = None) -> OpenAI:
     if not api_key:
         raise ValueError("OpenAI API key is not configured.")
 
-    return OpenAI(api_key=api_key, base_url=base_url)
+    # ✨ Reuse the client (and its keep-alive connection pool) for this key/base URL
+    return client_pool.get(api_key, base_url)
 
 
 def get_default_config():
@@ -466,3 +1098,10 @@ def get_default_config():
         "embed_model": embed_model,
         "chunk_tokens": chunk_tokens
     }
+
+
+def get_cache_stats():
+    """Hit/miss counters for the process-level caches."""
+    return {"vector_index": index_cache.stats(), "embeddings": embedding_cache.stats(),
+            "llm_responses": response_cache.stats(), "chunk_analyses": analysis_store.stats(),
+            "openai_clients": client_pool.stats()}
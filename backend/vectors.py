@@ -0,0 +1,164 @@
+# backend/vectors.py
+"""Helpers for storing embeddings as compact float32 blobs and searching them in memory."""
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, Sequence
+
+import numpy as np
+
+EMBEDDING_DTYPE = np.float32
+
+
+def pack_embedding(embedding: Sequence[float]) -> bytes:
+    """Serializes an embedding to raw little-endian float32 bytes."""
+    return np.asarray(embedding, dtype="<f4").tobytes()
+
+
+def unpack_embedding(blob: bytes) -> np.ndarray:
+    """Reads a blob written by pack_embedding back as a (read-only) float32 vector."""
+    return np.frombuffer(blob, dtype="<f4")
+
+
+def unpack_embeddings(blobs: Sequence[bytes]) -> np.ndarray:
+    """Decodes many same-sized blobs into one contiguous (n, dim) float32 matrix."""
+    if not blobs:
+        return np.empty((0, 0), dtype=EMBEDDING_DTYPE)
+    return np.frombuffer(b"".join(blobs), dtype="<f4").reshape(len(blobs), -1)
+
+
+# ✨ --- Process-level cache of pre-normalized per-transcript embedding matrices ---
+class TranscriptIndex:
+    """
+    A transcript's chunk embeddings as one L2-normalized, C-contiguous float32 matrix.
+    Chunk texts are not kept: callers fetch the k hits' texts by id, so the memory budget
+    goes to embeddings.
+    """
+
+    def __init__(self, chunk_ids: Sequence[int], matrix: np.ndarray):
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.matrix = np.ascontiguousarray(matrix / norms, dtype=EMBEDDING_DTYPE)
+        self.chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.chunk_ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + self.chunk_ids.nbytes
+
+    def top_k(self, query: np.ndarray, k: int):
+        """Returns [(row_index, cosine_score), ...] for the k best rows, best first."""
+        q = np.asarray(query, dtype=EMBEDDING_DTYPE)
+        q_norm = np.linalg.norm(q)
+        sims = self.matrix @ (q / q_norm if q_norm else q)
+        k = min(k, len(sims))
+        if k <= 0:
+            return []
+        top_idx = np.argpartition(-sims, k - 1)[:k] if k < len(sims) else np.arange(len(sims))
+        top_idx = top_idx[np.argsort(-sims[top_idx])]
+        return [(int(i), float(sims[i])) for i in top_idx]
+
+
+class VectorIndexCache:
+    """
+    LRU cache of TranscriptIndex objects keyed by (transcript_id, embed_model) and
+    bounded by a total memory budget in bytes. Thread-safe.
+    """
+
+    def __init__(self, max_bytes: int = None):
+        if max_bytes is None:
+            max_bytes = int(os.getenv("VECTOR_CACHE_MB") or 256) * 1024 * 1024
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._generations = {}  # transcript id -> number of invalidations, to spot stale puts
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            index = self._entries.get(key)
+            if index is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return index
+
+    def generation(self, transcript_id: int) -> int:
+        """Read this before loading a transcript's rows and pass it to `put`."""
+        with self._lock:
+            return self._generations.get(transcript_id, 0)
+
+    def put(self, key, index: TranscriptIndex, generation: int = None):
+        with self._lock:
+            if generation is not None and generation != self._generations.get(key[0], 0):
+                return  # Invalidated while the caller was reading the rows, so they may be stale
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key).nbytes
+            if index.nbytes > self.max_bytes:
+                return  # Too large to cache; the caller still uses it for this query.
+            self._entries[key] = index
+            self._bytes += index.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def invalidate(self, transcript_id: int):
+        """Drops every cached index (for any embedding model) of a transcript."""
+        with self._lock:
+            self._generations[transcript_id] = self._generations.get(transcript_id, 0) + 1
+            for key in [k for k in self._entries if k[0] == transcript_id]:
+                self._bytes -= self._entries.pop(key).nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+index_cache = VectorIndexCache()
+
+
+# ✨ --- Blocked top-k scan for searching many transcripts with bounded memory ---
+def blocked_top_k(blocks: Iterable, query: np.ndarray, k: int):
+    """
+    Scans an iterable of (chunk_ids, matrix) blocks and keeps only a running top-k,
+    so peak memory is one block plus k candidates regardless of corpus size.
+    Returns [(chunk_id, cosine_score), ...], best first.
+    """
+    q = np.asarray(query, dtype=EMBEDDING_DTYPE)
+    q_norm = np.linalg.norm(q)
+    q = q / q_norm if q_norm else q
+    best_ids = np.empty(0, dtype=np.int64)
+    best_scores = np.empty(0, dtype=EMBEDDING_DTYPE)
+    for chunk_ids, matrix in blocks:
+        norms = np.linalg.norm(matrix, axis=1)
+        norms[norms == 0] = 1.0
+        sims = (matrix @ q) / norms
+        ids = np.concatenate([best_ids, np.asarray(chunk_ids, dtype=np.int64)])
+        scores = np.concatenate([best_scores, sims.astype(EMBEDDING_DTYPE, copy=False)])
+        if len(scores) > k:
+            keep = np.argpartition(-scores, k - 1)[:k]
+            ids, scores = ids[keep], scores[keep]
+        best_ids, best_scores = ids, scores
+    order = np.argsort(-best_scores)
+    return [(int(best_ids[i]), float(best_scores[i])) for i in order]
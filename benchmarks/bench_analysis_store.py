@@ -0,0 +1,80 @@
+# benchmarks/bench_analysis_store.py
+"""
+LLM requests for a typical session on one transcript (generate codes, write a
+memo, generate codes again), with the chunk analysis store and with it emptied
+before every step (i.e. each step analyzing every chunk itself, as before). The
+LLM response cache is disabled so only the store is measured.
+
+    python -m benchmarks.bench_analysis_store --copies 10 --latency 0.1
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, delete, insert
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.fake_openai import FakeOpenAIServer
+
+SAMPLE = Path(__file__).parent.parent / "docs" / "tests" / "data" / "raw" / "interview.txt"
+
+
+def run(copies: int, use_store: bool, tag: str, server: FakeOpenAIServer):
+    from backend import services
+    from backend.chunker import content_hash
+    from backend.db import Base
+    from backend.models import Chunk, ChunkAnalysis, Transcript
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    sample = SAMPLE.read_text(encoding="utf-8")
+    text = "\n\n".join(sample.replace("Alex", f"{tag} P{i}") for i in range(copies))
+    transcript = Transcript(title="bench.txt", file_path="-", status="processed")
+    db.add(transcript)
+    db.commit()
+    rows = services.chunk_text(text)
+    db.execute(insert(Chunk), [{"transcript_id": transcript.id, "text": t, "content_hash": content_hash(t),
+                                "start_pos": s, "end_pos": e} for s, e, t in rows])
+    db.commit()
+
+    steps = [("codes", lambda: services.generate_and_save_codes(db, transcript.id)),
+             ("memo", lambda: services.generate_memo_content(db, transcript.id)),
+             ("codes again", lambda: services.generate_and_save_codes(db, transcript.id))]
+    results = []
+    for name, step in steps:
+        if not use_store:
+            db.execute(delete(ChunkAnalysis))
+            db.commit()
+        before = server.requests
+        t0 = time.perf_counter()
+        step()
+        results.append((name, server.requests - before, time.perf_counter() - t0))
+    db.close()
+    return len(rows), results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--copies", type=int, default=10, help="copies of the sample interview in the transcript")
+    parser.add_argument("--latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    os.environ["LLM_CACHE_PATH"] = ""
+    with FakeOpenAIServer(latency=args.latency) as server:
+        os.environ["OPENAI_API_KEY"] = "sk-bench"
+        os.environ["OPENAI_API_BASE_URL"] = server.base_url
+        print(f"{args.latency * 1000:.0f} ms/request, response cache disabled")
+        print(f"{'':>12} {'no store':>20} {'analysis store':>20}")
+        n, without = run(args.copies, use_store=False, tag="Cold", server=server)
+        _, with_store = run(args.copies, use_store=True, tag="Warm", server=server)
+        print(f"{n} chunks: {'requests':>17} {'wall s':>8} {'requests':>11} {'wall s':>8}")
+        for (name, r0, t0), (_, r1, t1) in zip(without, with_store):
+            print(f"{name:>12} {r0:>12} {t0:>8.2f} {r1:>11} {t1:>8.2f}")
+        total0, total1 = sum(r for _, r, _ in without), sum(r for _, r, _ in with_store)
+        print(f"{'total':>12} {total0:>12} {'':>8} {total1:>11}   ({total0 - total1} LLM calls saved)")
+
+
+if __name__ == "__main__":
+    main()
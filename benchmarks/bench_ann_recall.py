@@ -0,0 +1,139 @@
+# benchmarks/bench_ann_recall.py
+"""
+Recall@k vs latency of the ANN backends against exact search on synthetic,
+clustered embeddings (real embedding corpora are far from uniform), then the
+end-to-end search_corpus latency on a SQLite file (index freshness check, SQL
+and the fake embedding server included) with and without the IVF index.
+
+    python -m benchmarks.bench_ann_recall --rows 200000 --dim 256 --queries 200 --db-rows 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from backend.ann import HNSWIndex, IVFIndex, ann_manager
+from backend.vectors import blocked_top_k, pack_embedding
+from benchmarks.fake_openai import FakeOpenAIServer
+
+# Measure the API path itself, not the persistent embedding cache
+os.environ.setdefault("EMBED_CACHE_PATH", "")
+
+
+def clustered(rows: int, dim: int, clusters: int, rng) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    labels = rng.integers(0, clusters, rows)
+    return centers[labels] + 0.6 * rng.standard_normal((rows, dim), dtype=np.float32)
+
+
+def bench_end_to_end(data: np.ndarray, tids: np.ndarray, queries: int, k: int):
+    """ms/query of services.search_corpus: exact scan, IVF index, IVF index filtered to one transcript."""
+    from backend import schemas, services
+    from backend.db import Base
+    from backend.models import Chunk, Transcript
+
+    model = "bench-embed"
+    with tempfile.TemporaryDirectory() as tmp, FakeOpenAIServer(dim=data.shape[1]) as server:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        db.execute(insert(Transcript), [{"id": int(t) + 1, "title": f"t{t}.txt", "file_path": "-", "status": "processed"}
+                                        for t in np.unique(tids)])
+        for start in range(0, len(data), 10_000):
+            db.execute(insert(Chunk), [
+                {"transcript_id": int(t) + 1, "text": f"chunk {start + i}", "embedding": pack_embedding(v),
+                 "embedding_dim": data.shape[1], "embedding_model": model, "start_pos": 0, "end_pos": 1}
+                for i, (t, v) in enumerate(zip(tids[start:start + 10_000], data[start:start + 10_000]))
+            ])
+        db.commit()
+        config = schemas.AIConfig(api_key="sk-bench", base_url=server.base_url, embed_model=model)
+
+        def per_query(fn, n):
+            t0 = time.perf_counter()
+            for i in range(n):
+                fn(i)
+            return (time.perf_counter() - t0) / n * 1000
+
+        backend, index_dir = ann_manager.backend, ann_manager.index_dir
+        try:
+            ann_manager.backend, ann_manager.index_dir = "none", tmp
+            exact = per_query(lambda i: services.search_corpus(db, f"q{i}", top_k=k, config=config), min(queries, 5))
+            ann_manager.backend = "ivf"
+            services.rebuild_ann_index(db, model)
+            ivf = per_query(lambda i: services.search_corpus(db, f"q{i}", top_k=k, config=config), queries)
+            subset = per_query(lambda i: services.search_corpus(db, f"q{i}", top_k=k, config=config,
+                                                                transcript_ids=[int(tids[0]) + 1]), queries)
+            fingerprint = per_query(lambda i: services._corpus_fingerprint(db, model), queries)
+        finally:
+            ann_manager.backend, ann_manager.index_dir = backend, index_dir
+            ann_manager._indexes.clear()
+        db.close()
+        engine.dispose()
+    return exact, ivf, subset, fingerprint
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobes", default="1,4,16,64")
+    parser.add_argument("--db-rows", type=int, default=100_000,
+                        help="rows for the end-to-end search_corpus run on SQLite (0 to skip)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = clustered(args.rows, args.dim, max(args.rows // 500, 8), rng)
+    queries = data[rng.choice(args.rows, args.queries, replace=False)] + 0.3 * rng.standard_normal(
+        (args.queries, args.dim), dtype=np.float32)
+    ids = np.arange(args.rows)
+    tids = ids // 100
+
+    t0 = time.perf_counter()
+    truth = [{i for i, _ in blocked_top_k([(ids, data)], q, args.k)} for q in queries]
+    exact_ms = (time.perf_counter() - t0) / args.queries * 1000
+
+    print(f"{args.rows} x {args.dim}, k={args.k}, {args.queries} queries")
+    print(f"{'method':>14} {'build s':>8} {'recall@k':>9} {'ms/query':>9}")
+    print(f"{'exact':>14} {'-':>8} {1.0:>9.3f} {exact_ms:>9.2f}")
+
+    def report(label, index, build_s, **kwargs):
+        t0 = time.perf_counter()
+        results = [index.search(q, args.k, **kwargs) for q in queries]
+        ms = (time.perf_counter() - t0) / args.queries * 1000
+        recall = np.mean([len(truth[i] & {c for c, _ in r}) / args.k for i, r in enumerate(results)])
+        print(f"{label:>14} {build_s:>8.1f} {recall:>9.3f} {ms:>9.2f}")
+
+    t0 = time.perf_counter()
+    sample = data[rng.choice(args.rows, min(50_000, args.rows), replace=False)]
+    ivf = IVFIndex.train(sample, "bench", n_total=args.rows)
+    ivf.add(ids, tids, data)
+    build_s = time.perf_counter() - t0
+    for nprobe in [int(x) for x in args.nprobes.split(",")]:
+        report(f"ivf nprobe={nprobe}", ivf, build_s, nprobe=nprobe)
+
+    try:
+        t0 = time.perf_counter()
+        hnsw = HNSWIndex.train(sample, "bench", n_total=args.rows)
+        hnsw.add(ids, tids, data)
+        report("hnsw", hnsw, time.perf_counter() - t0)
+    except ImportError:
+        print(f"{'hnsw':>14}  (skipped: hnswlib not installed)")
+
+    if args.db_rows:
+        n = min(args.db_rows, args.rows)
+        exact, ivf, subset, fingerprint = bench_end_to_end(data[:n], tids[:n], args.queries, args.k)
+        print(f"\nsearch_corpus end to end, {n} chunks in SQLite (ms/query)")
+        print(f"{'exact scan':>26} {exact:>9.2f}")
+        print(f"{'ivf index':>26} {ivf:>9.2f}")
+        print(f"{'ivf index, 1 transcript':>26} {subset:>9.2f}")
+        print(f"{'of which freshness check':>26} {fingerprint:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/bench_bulk_insert.py
+"""
+Insert throughput (rows/s) for Code and Chunk rows: one ORM object per row with
+db.add, against BulkInserter at several batch sizes (committing every batch).
+Runs against a temporary on-disk SQLite database.
+
+    python -m benchmarks.bench_bulk_insert --rows 50000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+def make_rows(kind: str, rows: int, dim: int):
+    if kind == "codes":
+        return [{"code": f"code {i % 50}", "excerpt": "a quoted excerpt from the interview " * 4,
+                 "transcript_id": 1, "memo_id": None} for i in range(rows)]
+    blob = np.random.default_rng(0).standard_normal(dim).astype("<f4").tobytes()
+    return [{"transcript_id": 1, "text": "chunk text " * 150, "content_hash": f"{i:064x}", "embedding": blob,
+             "embedding_dim": dim, "embedding_model": "bench", "start_pos": i * 1500, "end_pos": i * 1500 + 1600}
+            for i in range(rows)]
+
+
+def run(kind: str, rows, batch_size):
+    from backend.bulk import BulkInserter
+    from backend.db import Base
+    from backend.models import Chunk, Code, Transcript
+
+    model = Code if kind == "codes" else Chunk
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Transcript(id=1, title="bench.txt", file_path="-"))
+    db.commit()
+    try:
+        t0 = time.perf_counter()
+        if batch_size is None:
+            for row in rows:
+                db.add(model(**row))
+            db.commit()
+        else:
+            with BulkInserter(db, model, batch_size=batch_size) as writer:
+                writer.extend(rows)
+        return len(rows) / (time.perf_counter() - t0)
+    finally:
+        db.close()
+        engine.dispose()
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1536, help="embedding dimension for chunk rows")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    args = parser.parse_args()
+
+    for kind in ("codes", "chunks"):
+        rows = make_rows(kind, args.rows, args.dim)
+        print(f"{kind} ({args.rows} rows)")
+        print(f"  {'orm db.add':<18} {run(kind, rows, None):10.0f} rows/s")
+        for batch_size in args.batch_sizes:
+            print(f"  {f'bulk batch={batch_size}':<18} {run(kind, rows, batch_size):10.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/bench_chunker.py
+"""
+Compares the previous fixed-width character chunker (4 chars per token) with the
+token-aware, sentence-boundary chunker on English and Chinese text.
+
+Reports throughput, chunk count and the token distribution per chunk as measured
+by the active tokenizer (tiktoken when installed).
+
+    python -m benchmarks.bench_chunker --size-mb 8
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from backend.chunker import get_tokenizer, iter_chunks, normalize_text, read_text_blocks
+
+SAMPLE = Path(__file__).parent.parent / "docs" / "tests" / "data" / "raw" / "interview.txt"
+
+ZH_SENTENCES = [
+    "受访者：我是去年九月来到这里读研究生的。",
+    "一开始觉得什么都很新鲜，但是有时候也很孤独！",
+    "访谈者：你是怎么适应这边的学习节奏的？",
+    "受访者：主要是靠室友和导师的帮助，还有每周的读书会；",
+    "现在回想起来，那段时间其实收获很多……",
+]
+
+
+def legacy_stream_chunks(path, approx_tokens=400, overlap_ratio=0.1):
+    """The chunker this benchmark replaces: fixed character windows, no boundaries."""
+    chunk_size = approx_tokens * 4
+    overlap = int(chunk_size * overlap_ratio)
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        buffer, pos = "", 0
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                if buffer.strip():
+                    yield pos, pos + len(buffer), normalize_text(buffer)
+                break
+            buffer += data
+            chunk = buffer[:chunk_size]
+            end = pos + len(chunk)
+            yield pos, end, normalize_text(chunk)
+            buffer = buffer[chunk_size - overlap:]
+            pos = end - overlap
+
+
+def make_file(size_mb: float, lang: str) -> str:
+    target = int(size_mb * 1024 * 1024)
+    fd, path = tempfile.mkstemp(suffix=".txt")
+    written = 0
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        if lang == "en":
+            sample = SAMPLE.read_text(encoding="utf-8")
+            while written < target:
+                f.write(sample)
+                written += len(sample.encode("utf-8"))
+        else:
+            rng = random.Random(0)
+            while written < target:
+                paragraph = "".join(rng.choice(ZH_SENTENCES) for _ in range(rng.randint(1, 6))) + "\n"
+                f.write(paragraph)
+                written += len(paragraph.encode("utf-8"))
+    return path
+
+
+def measure(name, chunks, size_mb, max_tokens, tokenizer):
+    t0 = time.perf_counter()
+    chunks = list(chunks)
+    elapsed = time.perf_counter() - t0
+    tokens = [tokenizer.count(c[2]) for c in chunks]
+    over = sum(t > max_tokens for t in tokens)
+    print(f"  {name:<8} {size_mb / elapsed:7.2f} MB/s  chunks={len(chunks):6d}  "
+          f"tokens/chunk mean={statistics.mean(tokens):6.1f} max={max(tokens):5d} over_limit={over}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=float, default=8.0)
+    parser.add_argument("--max-tokens", type=int, default=400)
+    args = parser.parse_args()
+
+    tokenizer = get_tokenizer()
+    print(f"tokenizer={tokenizer.name} max_tokens={args.max_tokens}")
+    for lang in ("en", "zh"):
+        path = make_file(args.size_mb, lang)
+        try:
+            print(f"{lang} ({args.size_mb} MB)")
+            measure("legacy", legacy_stream_chunks(path, args.max_tokens), args.size_mb, args.max_tokens, tokenizer)
+            measure("new", iter_chunks(read_text_blocks(path), max_tokens=args.max_tokens, tokenizer=tokenizer),
+                    args.size_mb, args.max_tokens, tokenizer)
+        finally:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# benchmarks/bench_client_pool.py
+"""
+Per-call latency of a one-input embeddings request when a fresh OpenAI client is
+built for every call (the old get_openai_client behaviour) versus the pooled
+client from backend/clients.py, against a local stub server. Over real HTTPS
+the gap is larger still, since every fresh client also pays a TLS handshake.
+
+    python -m benchmarks.bench_client_pool --calls 300
+"""
+import argparse
+import statistics
+import time
+
+from openai import OpenAI
+
+from backend.clients import OpenAIClientPool
+from benchmarks.fake_openai import FakeOpenAIServer
+
+
+def timed_calls(get_client, calls: int):
+    latencies = []
+    for i in range(calls):
+        t0 = time.perf_counter()
+        get_client().embeddings.create(model="bench-embed", input=f"text {i}")
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=300)
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(dim=64) as server:
+        pool = OpenAIClientPool()
+        variants = {
+            "fresh client": lambda: OpenAI(api_key="sk-bench", base_url=server.base_url),
+            "pooled client": lambda: pool.get("sk-bench", server.base_url),
+        }
+        print(f"{args.calls} sequential calls")
+        print(f"{'variant':>14} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+        for label, get_client in variants.items():
+            lat = sorted(timed_calls(get_client, args.calls))
+            print(f"{label:>14} {statistics.median(lat):>8.2f} {lat[int(len(lat) * 0.95)]:>8.2f} "
+                  f"{statistics.fmean(lat):>8.2f}")
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
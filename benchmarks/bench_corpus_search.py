@@ -0,0 +1,103 @@
+# benchmarks/bench_corpus_search.py
+"""
+Scaling benchmark for corpus-wide search. Measures the blocked top-k scan on
+synthetic embeddings at several corpus sizes, and the full DB-backed
+search_corpus path (SQLite file + fake embedding server) for the smaller ones.
+
+    python -m benchmarks.bench_corpus_search --sizes 10000,100000,1000000 --dim 256
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from backend.vectors import blocked_top_k, pack_embedding
+from benchmarks.fake_openai import FakeOpenAIServer
+
+# Measure the API path itself, not the persistent embedding cache
+os.environ.setdefault("EMBED_CACHE_PATH", "")
+
+
+def synthetic_blocks(n: int, dim: int, block_size: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    for start in range(0, n, block_size):
+        rows = min(block_size, n - start)
+        yield np.arange(start, start + rows), rng.standard_normal((rows, dim), dtype=np.float32)
+
+
+def bench_kernel(n: int, dim: int, block_size: int, k: int):
+    query = np.random.default_rng(1).standard_normal(dim).astype(np.float32)
+    # Generation is not timed: materialize blocks lazily but time only the scan
+    gen_time = 0.0
+    scan_time = 0.0
+    blocks = synthetic_blocks(n, dim, block_size)
+    tracemalloc.start()
+    while True:
+        t0 = time.perf_counter()
+        block = next(blocks, None)
+        gen_time += time.perf_counter() - t0
+        if block is None:
+            break
+        t0 = time.perf_counter()
+        blocked_top_k([block], query, k)
+        scan_time += time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return scan_time, peak
+
+
+def bench_db(n: int, dim: int, block_size: int, k: int, server: FakeOpenAIServer):
+    from backend import schemas, services
+    from backend.db import Base
+    from backend.models import Chunk, Transcript
+
+    model = "bench-embed"
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        transcripts = [Transcript(title=f"t{i}.txt", file_path="-", status="processed") for i in range(100)]
+        db.add_all(transcripts)
+        db.commit()
+        for ids, matrix in synthetic_blocks(n, dim, 10_000):
+            db.execute(insert(Chunk), [
+                {"transcript_id": transcripts[i % 100].id, "text": f"chunk {i}", "embedding": pack_embedding(v),
+                 "embedding_dim": dim, "embedding_model": model, "start_pos": 0, "end_pos": 1}
+                for i, v in zip(ids, matrix)
+            ])
+        db.commit()
+        config = schemas.AIConfig(api_key="sk-bench", base_url=server.base_url, embed_model=model)
+        t0 = time.perf_counter()
+        services.search_corpus(db, "remote work", top_k=k, config=config, block_size=block_size)
+        elapsed = time.perf_counter() - t0
+        db.close()
+        engine.dispose()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--block-size", type=int, default=8192)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--db-max-rows", type=int, default=100_000,
+                        help="also run the DB-backed search for corpora up to this size")
+    args = parser.parse_args()
+
+    print(f"dim={args.dim} block={args.block_size} k={args.k}")
+    print(f"{'chunks':>9} {'scan s':>8} {'peak MB':>8} {'db search s':>12}")
+    with FakeOpenAIServer(dim=args.dim) as server:
+        for n in [int(x) for x in args.sizes.split(",")]:
+            scan, peak = bench_kernel(n, args.dim, args.block_size, args.k)
+            db_time = f"{bench_db(n, args.dim, args.block_size, args.k, server):.3f}" if n <= args.db_max_rows else "-"
+            print(f"{n:>9} {scan:>8.3f} {peak / 1024 / 1024:>8.1f} {db_time:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/bench_docx_stream.py
+"""
+Compares python-docx (load the whole document, join paragraphs) with the streaming
+DOCX reader on a large synthetic document. Each method runs in a fresh subprocess
+so peak RSS is measured independently.
+
+    python -m benchmarks.bench_docx_stream --size-mb 100
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+SAMPLE = Path(__file__).parent.parent / "docs" / "tests" / "data" / "raw" / "interview.txt"
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+</Types>"""
+RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+DOC_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>')
+DOC_TAIL = "<w:sectPr/></w:body></w:document>"
+
+
+def make_docx(size_mb: float) -> str:
+    """Writes a .docx whose document.xml is roughly size_mb (uncompressed), one paragraph per line."""
+    lines = [line for line in SAMPLE.read_text(encoding="utf-8").splitlines() if line.strip()]
+    paragraphs = [f'<w:p><w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">{escape(line)}</w:t></w:r></w:p>'
+                  for line in lines]
+    block = "".join(paragraphs).encode("utf-8")
+    fd, path = tempfile.mkstemp(suffix=".docx")
+    os.close(fd)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", CONTENT_TYPES)
+        archive.writestr("_rels/.rels", RELS)
+        with archive.open("word/document.xml", "w", force_zip64=True) as f:
+            f.write(DOC_HEAD.encode("utf-8"))
+            for _ in range(int(size_mb * 1024 * 1024 / len(block)) + 1):
+                f.write(block)
+            f.write(DOC_TAIL.encode("utf-8"))
+    return path
+
+
+def run_method(method: str, path: str):
+    t0 = time.perf_counter()
+    if method == "python-docx":
+        from docx import Document
+
+        chars = len("\n".join(p.text for p in Document(path).paragraphs))
+    else:
+        from backend.documents import iter_docx_text
+
+        chars = sum(len(piece) for piece in iter_docx_text(path))
+    elapsed = time.perf_counter() - t0
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    print(json.dumps({"chars": chars, "seconds": elapsed, "peak_rss_mb": peak_mb}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=float, default=100.0, help="uncompressed document.xml size")
+    parser.add_argument("--method", choices=["python-docx", "streaming"], help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.method:
+        run_method(args.method, args.path)
+        return
+
+    path = make_docx(args.size_mb)
+    try:
+        print(f"document.xml ~{args.size_mb} MB, file {os.path.getsize(path) / 1e6:.1f} MB compressed")
+        for method in ("python-docx", "streaming"):
+            out = subprocess.run([sys.executable, "-m", "benchmarks.bench_docx_stream", "--method", method,
+                                  "--path", path], capture_output=True, text=True, check=True)
+            r = json.loads(out.stdout)
+            print(f"  {method:<12} {r['seconds']:7.2f}s  {args.size_mb / r['seconds']:6.1f} MB/s  "
+                  f"peak RSS {r['peak_rss_mb']:7.1f} MB  chars={r['chars']}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
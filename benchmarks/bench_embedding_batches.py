@@ -0,0 +1,79 @@
+# benchmarks/bench_embedding_batches.py
+"""
+Compares per-chunk vs batched embedding requests in process_transcript_for_ai
+against a local fake embedding server.
+
+    python -m benchmarks.bench_embedding_batches --size-mb 2 --latency 0.02
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.fake_openai import FakeOpenAIServer
+
+# Measure the API path itself, not the persistent embedding cache
+os.environ.setdefault("EMBED_CACHE_PATH", "")
+
+SAMPLE = Path(__file__).parent.parent / "docs" / "tests" / "data" / "raw" / "interview.txt"
+
+
+def make_transcript(size_mb: float) -> str:
+    sample = SAMPLE.read_text(encoding="utf-8")
+    repeats = int(size_mb * 1024 * 1024 / len(sample.encode("utf-8"))) + 1
+    fd, path = tempfile.mkstemp(suffix=".txt")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        for _ in range(repeats):
+            f.write(sample)
+    return path
+
+
+def run(path: str, batch_size: int, server: FakeOpenAIServer):
+    from backend import services
+    from backend.db import Base
+    from backend.models import Chunk, Transcript
+
+    os.environ["EMBED_BATCH_SIZE"] = str(batch_size)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    transcript = Transcript(title="bench.txt", file_path=path)
+    db.add(transcript)
+    db.commit()
+
+    server.requests = 0
+    t0 = time.perf_counter()
+    services.process_transcript_for_ai(db, transcript.id)
+    elapsed = time.perf_counter() - t0
+    chunks = db.query(Chunk).count()
+    db.close()
+    return chunks, server.requests, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=float, default=2.0)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated seconds per HTTP request")
+    parser.add_argument("--batch-sizes", default="1,16,64,256")
+    args = parser.parse_args()
+
+    path = make_transcript(args.size_mb)
+    try:
+        with FakeOpenAIServer(latency=args.latency) as server:
+            os.environ["OPENAI_API_KEY"] = "sk-bench"
+            os.environ["OPENAI_API_BASE_URL"] = server.base_url
+            print(f"transcript: {args.size_mb} MB, simulated latency {args.latency * 1000:.0f} ms/request")
+            print(f"{'batch':>6} {'chunks':>8} {'requests':>9} {'wall s':>8}")
+            for bs in [int(x) for x in args.batch_sizes.split(",")]:
+                chunks, requests, elapsed = run(path, bs, server)
+                print(f"{bs:>6} {chunks:>8} {requests:>9} {elapsed:>8.2f}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/bench_embedding_storage.py
+"""
+Compares JSON-text vs float32-blob embedding storage: on-disk SQLite size and
+the time to decode every row into an (n, dim) matrix, as search_similar does.
+
+    python -m benchmarks.bench_embedding_storage --rows 100000 --dim 1536
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from backend.vectors import pack_embedding, unpack_embeddings
+
+
+def build_db(path: str, rows: int, dim: int, binary: bool):
+    rng = np.random.default_rng(0)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE chunks (id INTEGER PRIMARY KEY, embedding BLOB)")
+    for start in range(0, rows, 5000):
+        block = rng.standard_normal((min(5000, rows - start), dim)).astype(np.float32)
+        if binary:
+            values = [(pack_embedding(v),) for v in block]
+        else:
+            values = [(json.dumps(v.astype(float).tolist()),) for v in block]
+        conn.executemany("INSERT INTO chunks (embedding) VALUES (?)", values)
+    conn.commit()
+    conn.close()
+
+
+def decode(path: str, binary: bool) -> float:
+    conn = sqlite3.connect(path)
+    t0 = time.perf_counter()
+    raw = [r[0] for r in conn.execute("SELECT embedding FROM chunks")]
+    if binary:
+        matrix = unpack_embeddings(raw)
+    else:
+        matrix = np.vstack([np.array(json.loads(r), dtype=float) for r in raw])
+    elapsed = time.perf_counter() - t0
+    conn.close()
+    assert matrix.shape[0] == len(raw)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    args = parser.parse_args()
+
+    print(f"{args.rows} chunks x {args.dim} dims")
+    print(f"{'format':>8} {'db MB':>9} {'decode s':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, binary in (("json", False), ("float32", True)):
+            path = os.path.join(tmp, f"{label}.db")
+            build_db(path, args.rows, args.dim, binary)
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            print(f"{label:>8} {size_mb:>9.1f} {decode(path, binary):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
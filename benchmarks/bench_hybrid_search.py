@@ -0,0 +1,123 @@
+# benchmarks/bench_hybrid_search.py
+"""
+Latency and retrieval quality of the vector, keyword and hybrid search modes on
+exact-match queries (participant names and verbatim phrases), over the sample
+interview copied N times with a unique participant name per copy.
+
+Relevance is substring ground truth: a chunk is relevant if it contains the query.
+With the local fake embedding server vectors are random, so the vector column only
+measures latency; pass --api-key/--base-url/--embed-model to embed with a real API.
+
+    python -m benchmarks.bench_hybrid_search --transcripts 200 --k 5
+"""
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.fake_openai import FakeOpenAIServer
+
+SAMPLE = Path(__file__).parent.parent / "docs" / "tests" / "data" / "raw" / "interview.txt"
+MODES = ("vector", "keyword", "hybrid")
+
+# Measure the API path itself, not the persistent embedding cache
+os.environ.setdefault("EMBED_CACHE_PATH", "")
+
+
+def participant(i: int) -> str:
+    return f"Morgan Quill{i:04d}"
+
+
+def seed(db, n: int, config, real_api: bool, dim: int):
+    from backend import services
+    from backend.models import Chunk, Transcript
+    from backend.vectors import pack_embedding
+
+    sample = SAMPLE.read_text(encoding="utf-8")
+    rng = np.random.default_rng(0)
+    transcripts = [Transcript(title=f"interview_{i}.txt", file_path="-", status="processed") for i in range(n)]
+    db.add_all(transcripts)
+    db.commit()
+    texts = []
+    for i, transcript in enumerate(transcripts):
+        name = participant(i)
+        text = sample.replace("Alex Chen", name).replace("Alex", name.split()[1])
+        rows = services.chunk_text(text)
+        if real_api:
+            vectors = services.get_embeddings([t for _, _, t in rows], config=config)
+        else:
+            vectors = rng.standard_normal((len(rows), dim), dtype=np.float32)
+        db.execute(insert(Chunk), [
+            {"transcript_id": transcript.id, "text": t, "start_pos": s, "end_pos": e,
+             "embedding": pack_embedding(v), "embedding_dim": len(v), "embedding_model": config.embed_model}
+            for (s, e, t), v in zip(rows, vectors)
+        ])
+        texts.extend(t for _, _, t in rows)
+    db.commit()
+    return texts
+
+
+def queries(texts, n: int, count: int):
+    rnd = random.Random(1)
+    out = [participant(rnd.randrange(n)).split()[1] for _ in range(count // 2)]
+    while len(out) < count:
+        words = re.findall(r"[A-Za-z']+", rnd.choice(texts))
+        if len(words) < 8:
+            continue
+        start = rnd.randrange(len(words) - 4)
+        phrase = " ".join(words[start:start + 4])
+        if any(phrase.lower() in t.lower() for t in texts):  # Skip phrases split by punctuation
+            out.append(phrase)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transcripts", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=40)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--api-key", default=None, help="embed with a real API instead of the fake server")
+    parser.add_argument("--base-url", default=None)
+    parser.add_argument("--embed-model", default="text-embedding-3-small")
+    args = parser.parse_args()
+
+    from backend import schemas, services
+    from backend.db import Base
+
+    with FakeOpenAIServer(dim=args.dim) as server, tempfile.TemporaryDirectory() as tmp:
+        real_api = bool(args.api_key)
+        config = schemas.AIConfig(api_key=args.api_key or "sk-bench",
+                                  base_url=args.base_url if real_api else server.base_url,
+                                  embed_model=args.embed_model if real_api else "bench-embed")
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)  # Also creates the chunks_fts index and triggers
+        db = sessionmaker(bind=engine)()
+        texts = seed(db, args.transcripts, config, real_api, args.dim)
+        qs = queries(texts, args.transcripts, args.queries)
+        print(f"transcripts={args.transcripts} chunks={len(texts)} queries={len(qs)} k={args.k}"
+              f"{'' if real_api else ' (fake embeddings: vector quality is meaningless)'}")
+        print(f"{'mode':>8} {'ms/query':>9} {'hit@k':>6} {'P@k':>6}")
+        for mode in MODES:
+            elapsed, hits, precision = 0.0, 0, 0.0
+            for q in qs:
+                t0 = time.perf_counter()
+                results = services.search_corpus(db, q, top_k=args.k, config=config, mode=mode)
+                elapsed += time.perf_counter() - t0
+                relevant = [q.lower() in r["text"].lower() for r in results]
+                hits += any(relevant)
+                precision += sum(relevant) / args.k
+            print(f"{mode:>8} {elapsed / len(qs) * 1000:>9.2f} {hits / len(qs):>6.2f} {precision / len(qs):>6.2f}")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
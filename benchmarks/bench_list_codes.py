@@ -0,0 +1,100 @@
+# benchmarks/bench_list_codes.py
+"""
+Counts SQL statements and times services.list_codes for growing numbers of codes,
+against the previous lazy-loading implementation (one code query plus up to two
+relationship loads per row). Exits non-zero if the statement count grows with the
+number of rows; tests/test_list_codes.py runs the same check under pytest.
+
+    python -m benchmarks.bench_list_codes --rows 1000 10000 50000
+"""
+import argparse
+import datetime
+import sys
+import time
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+
+def legacy_list_codes(db):
+    """The implementation this benchmark replaces."""
+    from backend.models import Code
+
+    results = []
+    for c in db.query(Code).all():
+        source_title = "N/A"
+        if c.transcript:
+            source_title = f"Transcript: {c.transcript.title}"
+        elif c.memo:
+            source_title = f"Memo: {c.memo.title}"
+        results.append({"id": c.id, "code": c.code, "excerpt": c.excerpt, "source": source_title,
+                        "created_at": c.created_at, "transcript_id": c.transcript_id, "memo_id": c.memo_id})
+    return results
+
+
+def seed(rows: int):
+    from backend.db import Base
+    from backend.models import Code, Memo, Transcript
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    now = datetime.datetime.now(datetime.UTC)
+    with engine.begin() as conn:
+        conn.execute(insert(Transcript), [{"id": i, "title": f"t{i}.txt", "file_path": "-", "status": "processed"}
+                                          for i in range(1, 201)])
+        conn.execute(insert(Memo), [{"id": i, "title": f"memo {i}", "content": "..."} for i in range(1, 51)])
+        conn.execute(insert(Code), [
+            {"code": f"code {i % 37}", "excerpt": "excerpt " * 8, "created_at": now,
+             # Mostly transcript codes, some memo codes, a few orphans
+             "transcript_id": (i % 200) + 1 if i % 10 < 8 else None,
+             "memo_id": (i % 50) + 1 if i % 10 == 8 else None}
+            for i in range(rows)
+        ])
+    return engine
+
+
+def measure(engine, fn):
+    statements = [0]
+
+    def count(*_):
+        statements[0] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    db = sessionmaker(bind=engine)()
+    try:
+        t0 = time.perf_counter()
+        items = fn(db)
+        return items, statements[0], time.perf_counter() - t0
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", count)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    from backend import services
+
+    counts = set()
+    for rows in args.rows:
+        engine = seed(rows)
+        items, statements, elapsed = measure(engine, lambda db: services.list_codes(db, limit=rows)[0])
+        counts.add(statements)
+        print(f"rows={rows:6d}  list_codes: {statements:3d} statements {elapsed * 1000:8.1f} ms", end="")
+        if not args.skip_legacy:
+            legacy, legacy_statements, legacy_elapsed = measure(engine, legacy_list_codes)
+            assert [i["source"] for i in legacy] == [i["source"] for i in items], "source strings differ"
+            print(f"  | legacy: {legacy_statements:5d} statements {legacy_elapsed * 1000:8.1f} ms", end="")
+        print()
+
+    if len(counts) != 1:
+        print(f"FAIL: statement count depends on row count: {sorted(counts)}")
+        sys.exit(1)
+    print(f"OK: {counts.pop()} statement(s) regardless of row count")
+
+
+if __name__ == "__main__":
+    main()
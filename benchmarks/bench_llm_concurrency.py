@@ -0,0 +1,68 @@
+# benchmarks/bench_llm_concurrency.py
+"""
+End-to-end time of generate_and_save_codes at different LLM_CONCURRENCY
+settings against a local mock server that injects latency (and optionally
+periodic 429s to exercise the jittered retries).
+
+    python -m benchmarks.bench_llm_concurrency --chunks 300 --latency 0.2 --fail-every 25
+"""
+import argparse
+import os
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.fake_openai import FakeOpenAIServer
+
+
+def run(chunks: int, concurrency: int, server: FakeOpenAIServer):
+    from backend import services
+    from backend.db import Base
+    from backend.models import Chunk, Code, Transcript
+
+    os.environ["LLM_CONCURRENCY"] = str(concurrency)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    transcript = Transcript(title="bench.txt", file_path="-", status="processed")
+    db.add(transcript)
+    db.commit()
+    db.add_all([Chunk(transcript_id=transcript.id, text=f"Interviewer: question {i}? Alex: answer {i}.")
+                for i in range(chunks)])
+    db.commit()
+
+    server.requests = 0
+    t0 = time.perf_counter()
+    services.generate_and_save_codes(db, transcript.id)
+    elapsed = time.perf_counter() - t0
+    codes = [c.code for c in db.query(Code).order_by(Code.id)]
+    db.close()
+    return elapsed, server.requests, codes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--fail-every", type=int, default=0, help="answer every Nth request with a 429")
+    parser.add_argument("--concurrency", default="1,4,8,16")
+    args = parser.parse_args()
+
+    os.environ["LLM_RETRY_BASE_DELAY"] = "0.05"
+    with FakeOpenAIServer(latency=args.latency, fail_every=args.fail_every) as server:
+        os.environ["OPENAI_API_KEY"] = "sk-bench"
+        os.environ["OPENAI_API_BASE_URL"] = server.base_url
+        print(f"{args.chunks} chunks, {args.latency * 1000:.0f} ms/request, 429 every {args.fail_every or '-'}")
+        print(f"{'workers':>8} {'requests':>9} {'wall s':>8} {'speedup':>8}")
+        baseline, reference = None, None
+        for concurrency in [int(x) for x in args.concurrency.split(",")]:
+            elapsed, requests, codes = run(args.chunks, concurrency, server)
+            baseline = baseline or elapsed
+            reference = reference or codes
+            assert codes == reference, "results must be written in chunk order"
+            print(f"{concurrency:>8} {requests:>9} {elapsed:>8.2f} {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
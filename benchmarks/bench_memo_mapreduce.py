@@ -0,0 +1,111 @@
+# benchmarks/bench_memo_mapreduce.py
+"""
+Map-reduce memo generation against the previous single prompt over the first 15
+chunks, on a transcript made of N copies of the sample interview (a different
+participant in each), through a local mock server with a fixed per-request
+latency. Reports LLM requests, wall time and how many chunks the memo is based
+on, for a cold cache at each map concurrency and for a memo generated after the
+codes (whose per-chunk analyses the map step reuses).
+
+    python -m benchmarks.bench_memo_mapreduce --copies 20 --latency 0.2 --map-concurrency 8,64
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.fake_openai import FakeOpenAIServer
+
+SAMPLE = Path(__file__).parent.parent / "docs" / "tests" / "data" / "raw" / "interview.txt"
+
+
+def legacy_generate_memo_content(db, transcript_id: int):
+    """The implementation this benchmark replaces."""
+    from backend import services
+    from backend.models import Chunk
+
+    request_client = services.get_openai_client()
+    model = os.getenv("OPENAI_LLM_MODEL", "gpt-4o-mini")
+    chunks = db.query(Chunk).filter(Chunk.transcript_id == transcript_id).order_by(Chunk.start_pos).limit(15).all()
+    full_text_sample = "\n---\n".join(c.text for c in chunks)
+    system_prompt = "You are a qualitative research analyst. Your task is to write an analytic memo based on interview excerpts. Your output must be a valid JSON object."
+    user_prompt = f"Based on the following excerpts...\n---\n{full_text_sample}\n---\nWrite an analytic memo with three sections... JSON object with the keys 'summary', 'contradictions', and 'followups'..."
+    content = services.cached_chat_completion(request_client, model, system_prompt, user_prompt, temperature=0.7,
+                                              response_format={"type": "json_object"})
+    return json.loads(content)
+
+
+def seed(db, copies: int, tag: str):
+    from backend import services
+    from backend.models import Chunk, Transcript
+
+    sample = SAMPLE.read_text(encoding="utf-8")
+    # A different participant per copy so every chunk is distinct
+    text = "\n\n".join(sample.replace("Alex", f"{tag.title()} P{i}") for i in range(copies))
+    transcript = Transcript(title=f"{tag}.txt", file_path="-", status="processed")
+    db.add(transcript)
+    db.commit()
+    rows = services.chunk_text(text)
+    db.execute(insert(Chunk), [{"transcript_id": transcript.id, "text": t, "start_pos": s, "end_pos": e}
+                               for s, e, t in rows])
+    db.commit()
+    return transcript.id, len(rows)
+
+
+def timed(server, fn):
+    server.requests = 0
+    t0 = time.perf_counter()
+    result = fn()
+    return result, server.requests, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--copies", type=int, default=20, help="copies of the sample interview in the transcript")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--map-concurrency", default="8,64", help="MEMO_MAP_CONCURRENCY values for the cold runs")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+        os.environ["OPENAI_API_KEY"] = "sk-bench"
+        os.environ["OPENAI_API_BASE_URL"] = server.base_url
+        os.environ["LLM_CACHE_PATH"] = os.path.join(tmp, "llm_cache.db")
+        from backend import services
+        from backend.db import Base
+
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+
+        print(f"{args.copies} interview copies, {args.latency * 1000:.0f} ms/request")
+        print(f"{'scenario':>30} {'chunks used':>12} {'requests':>9} {'wall s':>8}")
+
+        tid, n = seed(db, args.copies, "legacy")
+        _, requests, elapsed = timed(server, lambda: legacy_generate_memo_content(db, tid))
+        print(f"{'first 15 chunks (old)':>30} {min(n, 15):>5}/{n:<6} {requests:>9} {elapsed:>8.2f}")
+
+        for concurrency in [int(x) for x in args.map_concurrency.split(",")]:
+            os.environ["MEMO_MAP_CONCURRENCY"] = str(concurrency)
+            tid, n = seed(db, args.copies, f"cold{concurrency}")
+            memo, requests, elapsed = timed(server, lambda: services.generate_memo_content(db, tid))
+            assert "error" not in memo, memo
+            label = f"map-reduce, cold, {concurrency} at once"
+            print(f"{label:>30} {n:>5}/{n:<6} {requests:>9} {elapsed:>8.2f}")
+        os.environ.pop("MEMO_MAP_CONCURRENCY")
+
+        tid, n = seed(db, args.copies, "after-codes")
+        _, code_requests, _ = timed(server, lambda: services.generate_and_save_codes(db, tid))
+        memo, requests, elapsed = timed(server, lambda: services.generate_memo_content(db, tid))
+        assert "error" not in memo, memo
+        print(f"{'map-reduce, after codes':>30} {n:>5}/{n:<6} {requests:>9} {elapsed:>8.2f}"
+              f"   (codes took {code_requests} requests)")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# benchmarks/bench_metrics_overhead.py
+"""
+Cost of the /metrics instrumentation: per-call cost of the primitives, and the
+chunker and a trivial SQL statement with and without instrumentation.
+
+    python -m benchmarks.bench_metrics_overhead
+"""
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+
+from backend import metrics
+from backend.chunker import HeuristicTokenizer, _pack_chunks, iter_chunks
+
+SAMPLE = Path(__file__).parent.parent / "docs" / "tests" / "data" / "raw" / "interview.txt"
+
+
+def per_call(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n
+
+
+def main():
+    n = 200_000
+    counter = metrics.Counter("bench_total", "Benchmark counter.", ("route",))
+    histogram = metrics.Histogram("bench_seconds", "Benchmark histogram.", ("route",))
+    print(f"{'Counter.inc':>28} {per_call(lambda: counter.inc(route='/x'), n) * 1e9:>8.0f} ns")
+    print(f"{'Histogram.observe':>28} {per_call(lambda: histogram.observe(0.01, route='/x'), n) * 1e9:>8.0f} ns")
+
+    sample = SAMPLE.read_text(encoding="utf-8") * 200
+    tokenizer = HeuristicTokenizer()
+    for name, fn in (("chunker, uninstrumented", lambda: list(_pack_chunks([sample], 400, 0.1, tokenizer))),
+                     ("chunker, instrumented", lambda: list(iter_chunks([sample], 400, tokenizer=tokenizer)))):
+        print(f"{name:>28} {len(sample) / per_call(fn, 5) / 1e6:>8.2f} M chars/s")
+
+    for name, instrument in (("SELECT 1, uninstrumented", False), ("SELECT 1, instrumented", True)):
+        engine = create_engine("sqlite://")
+        if instrument:
+            metrics.instrument_engine(engine)
+        with engine.connect() as conn:
+            print(f"{name:>28} {per_call(lambda: conn.execute(text('SELECT 1')), 20_000) * 1e6:>8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# benchmarks/bench_sqlite_concurrency.py
+"""
+Concurrent read/write load test for the SQLite engine profile in backend/db.py.
+
+Reader threads run search-style queries (load a transcript's chunk embeddings)
+while writer threads insert codes in small transactions, as ingestion and code
+generation do. Compares SQLite's defaults (rollback journal, synchronous=FULL,
+5s busy timeout) with the tuned profile and reports operations/s and lock errors.
+
+    python -m benchmarks.bench_sqlite_concurrency --readers 8 --writers 2 --seconds 10
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+
+def seed(engine, transcripts: int, chunks_per_transcript: int, dim: int):
+    from backend.db import Base
+    from backend.models import Chunk, Transcript
+
+    Base.metadata.create_all(bind=engine)
+    blob = np.random.default_rng(0).standard_normal(dim).astype("<f4").tobytes()
+    with engine.begin() as conn:
+        conn.execute(insert(Transcript), [{"id": t, "title": f"t{t}", "file_path": "-", "status": "processed"}
+                                          for t in range(1, transcripts + 1)])
+        conn.execute(insert(Chunk), [
+            {"transcript_id": t, "text": "chunk text " * 100, "embedding": blob, "embedding_dim": dim,
+             "embedding_model": "bench", "start_pos": i, "end_pos": i + 1}
+            for t in range(1, transcripts + 1) for i in range(chunks_per_transcript)
+        ])
+
+
+def run(profile: str, args):
+    from backend.db import create_db_engine
+    from backend.models import Chunk, Code
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    pragmas = None if profile == "tuned" else {}
+    engine = create_db_engine(f"sqlite:///{path}", pragmas=pragmas)
+    seed(engine, args.transcripts, args.chunks, args.dim)
+    Session = sessionmaker(bind=engine)
+
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + args.seconds
+
+    def reader(seed_value):
+        rng = np.random.default_rng(seed_value)
+        while time.perf_counter() < stop:
+            with Session() as db:
+                try:
+                    tid = int(rng.integers(1, args.transcripts + 1))
+                    rows = db.execute(select(Chunk.id, Chunk.embedding).where(Chunk.transcript_id == tid)).all()
+                    np.frombuffer(b"".join(r.embedding for r in rows), dtype="<f4")
+                    key = "reads"
+                except OperationalError:
+                    key = "errors"
+            with lock:
+                counts[key] += 1
+
+    def writer(seed_value):
+        rng = np.random.default_rng(seed_value)
+        while time.perf_counter() < stop:
+            with Session() as db:
+                try:
+                    tid = int(rng.integers(1, args.transcripts + 1))
+                    db.execute(insert(Code), [{"code": "load", "excerpt": "x" * 200, "transcript_id": tid,
+                                               "memo_id": None} for _ in range(args.rows_per_write)])
+                    db.commit()
+                    key = "writes"
+                except OperationalError:
+                    db.rollback()
+                    key = "errors"
+            with lock:
+                counts[key] += 1
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(100 + i,)) for i in range(args.writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return {k: v / args.seconds for k, v in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--transcripts", type=int, default=20)
+    parser.add_argument("--chunks", type=int, default=200, help="chunks per transcript")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--rows-per-write", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds}s per profile")
+    for profile in ("default", "tuned"):
+        r = run(profile, args)
+        print(f"  {profile:<8} reads/s={r['reads']:8.1f}  write txns/s={r['writes']:8.1f}  "
+              f"lock errors/s={r['errors']:6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/bench_streaming.py
+"""
+Time to first byte, first useful content and completion for the buffered and
+streaming memo preview and corpus search endpoints, over real HTTP (uvicorn in a
+thread) against a local mock OpenAI server with per-request and per-token latency.
+
+    python -m benchmarks.bench_streaming --copies 5 --latency 0.2 --token-latency 0.02
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from benchmarks.fake_openai import FakeOpenAIServer
+
+SAMPLE = Path(__file__).parent.parent / "docs" / "tests" / "data" / "raw" / "interview.txt"
+
+
+def seed(copies: int, dim: int):
+    from backend import services
+    from backend.chunker import content_hash
+    from backend.db import SessionLocal
+    from backend.models import Chunk, Transcript
+    from backend.vectors import pack_embedding
+
+    rng = np.random.default_rng(0)
+    with SessionLocal() as db:
+        transcript = Transcript(title="bench.txt", file_path="-", status="processed")
+        db.add(transcript)
+        db.commit()
+        text = "\n\n".join(SAMPLE.read_text(encoding="utf-8").replace("Alex", f"P{i}") for i in range(copies))
+        db.add_all([Chunk(transcript_id=transcript.id, text=t, content_hash=content_hash(t), start_pos=s, end_pos=e,
+                          embedding=pack_embedding(rng.standard_normal(dim).astype(np.float32)), embedding_dim=dim,
+                          embedding_model="bench-embed")
+                    for s, e, t in services.chunk_text(text)])
+        db.commit()
+        return transcript.id
+
+
+def measure(client: httpx.Client, path: str, payload: dict, is_content):
+    """(first byte, first content line/event, total) in seconds."""
+    t0 = time.perf_counter()
+    first_byte = first_content = None
+    with client.stream("POST", path, json=payload) as res:
+        res.raise_for_status()
+        for line in res.iter_lines():
+            now = time.perf_counter() - t0
+            first_byte = first_byte if first_byte is not None else now
+            if first_content is None and is_content(line):
+                first_content = now
+    total = time.perf_counter() - t0
+    return first_byte if first_byte is not None else total, first_content if first_content is not None else total, total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--copies", type=int, default=5, help="copies of the sample interview in the transcript")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per mock API request")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="seconds per streamed token")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(latency=args.latency, token_latency=args.token_latency) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(OPENAI_API_KEY="sk-bench", OPENAI_API_BASE_URL=server.base_url,
+                          OPENAI_EMBED_MODEL="bench-embed", LLM_CACHE_PATH="", EMBED_CACHE_PATH="",
+                          DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        import uvicorn
+
+        from backend.main import app
+
+        transcript_id = seed(args.copies, server.dim)
+        config = uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning")
+        api = uvicorn.Server(config)
+        thread = threading.Thread(target=api.run, daemon=True)
+        thread.start()
+        while not api.started:
+            time.sleep(0.05)
+        port = api.servers[0].sockets[0].getsockname()[1]
+
+        memo = {"transcript_id": transcript_id, "bypass_cache": True}
+        search = {"query": "remote work and team culture", "top_k": 10}
+        cases = [
+            ("memo preview", "/memo/preview", memo, lambda line: True),
+            ("memo preview (SSE)", "/memo/preview/stream", memo, lambda line: line.startswith("event: token")),
+            ("corpus search", "/search/corpus", search, lambda line: True),
+            ("corpus search (NDJSON)", "/search/corpus/stream", search, lambda line: True),
+        ]
+        print(f"{args.latency * 1000:.0f} ms/request, {args.token_latency * 1000:.0f} ms/token")
+        print(f"{'endpoint':>24} {'first byte s':>13} {'first content s':>16} {'total s':>8}")
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=600) as client:
+            for name, path, payload, is_content in cases:
+                first_byte, first_content, total = measure(client, path, payload, is_content)
+                print(f"{name:>24} {first_byte:>13.2f} {first_content:>16.2f} {total:>8.2f}")
+        api.should_exit = True
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# benchmarks/fake_openai.py
+"""
+A tiny local stand-in for the OpenAI HTTP API used by the benchmark scripts.
+It answers /embeddings with deterministic vectors and /chat/completions with a
+small JSON analysis (as server-sent events, word by word, when `stream` is set),
+counts requests, and can inject a fixed per-request latency (to mimic a real
+network round-trip), a per-streamed-token delay and periodic 429 errors (to
+exercise retries).
+"""
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+class FakeOpenAIServer:
+    def __init__(self, latency: float = 0.0, dim: int = 256, fail_every: int = 0, token_latency: float = 0.0):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.dim = dim
+        self.fail_every = fail_every
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}/v1"
+
+    def fake_embedding(self, text: str):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+        return np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32).tolist()
+
+    @staticmethod
+    def fake_analysis(prompt: str) -> dict:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return {
+            "summary": f"Summary {digest[:8]}",
+            "codes": [{"code": f"Code {digest[i:i + 4]}", "definition": "A fake code.", "quotes": [prompt[-60:]]}
+                      for i in (0, 4)],
+            "contradictions": [],
+            "followups": [],
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                    should_fail = server.fail_every and server.requests % server.fail_every == 0
+                if server.latency:
+                    time.sleep(server.latency)
+                if should_fail:
+                    self._send(429, {"error": {"message": "rate limited", "type": "rate_limit_error"}})
+                    return
+                if self.path.endswith("/embeddings"):
+                    inputs = body.get("input")
+                    inputs = [inputs] if isinstance(inputs, str) else inputs
+                    payload = {
+                        "object": "list",
+                        "model": body.get("model"),
+                        "data": [{"object": "embedding", "index": i, "embedding": server.fake_embedding(t)}
+                                 for i, t in enumerate(inputs)],
+                        "usage": {"prompt_tokens": 0, "total_tokens": 0},
+                    }
+                    self._send(200, payload)
+                elif self.path.endswith("/chat/completions") and body.get("stream"):
+                    prompt = body["messages"][-1]["content"]
+                    self._stream(body.get("model"), json.dumps(server.fake_analysis(prompt)), prompt,
+                                 include_usage=(body.get("stream_options") or {}).get("include_usage"))
+                elif self.path.endswith("/chat/completions"):
+                    prompt = body["messages"][-1]["content"]
+                    if server.token_latency:
+                        # A buffered completion still takes as long to generate as a streamed one
+                        time.sleep(server.token_latency * len(json.dumps(server.fake_analysis(prompt)).split(" ")))
+                    payload = {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": body.get("model"),
+                        "choices": [{"index": 0, "finish_reason": "stop", "message": {
+                            "role": "assistant", "content": json.dumps(server.fake_analysis(prompt))}}],
+                        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 50,
+                                  "total_tokens": len(prompt) // 4 + 50},
+                    }
+                    self._send(200, payload)
+                else:
+                    self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+
+            def _stream(self, model, content, prompt, include_usage=False):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                for word in content.split(" "):
+                    chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model, "choices": [{"index": 0, "delta": {"content": word + " "},
+                                                          "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    if server.token_latency:
+                        time.sleep(server.token_latency)
+                if include_usage:
+                    # Like the real API: one last chunk with no choices and the token counts
+                    completion_tokens = len(content.split(" "))
+                    chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model, "choices": [],
+                             "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": completion_tokens,
+                                       "total_tokens": len(prompt) // 4 + completion_tokens}}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
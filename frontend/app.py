@@ -1,5 +1,6 @@
 # frontend/app.py
 import os
+import time
 
 import pandas as pd
 import streamlit as st
@@ -23,20 +24,77 @@ def get_config_defaults(api_url: str):
     return {}
 
 @st.cache_data(ttl=60)  # Cache for 1 minute
-def get_api_data(endpoint: str):
-    """ ✨ 使用缓存获取API数据以提高性能 """
+def get_api_data(endpoint: str, fields: str = None, max_items: int = None):
+    """ ✨ 使用缓存获取API数据以提高性能; follows the X-Next-Cursor pages up to `max_items` """
+    items, cursor = [], None
     try:
-        res = requests.get(f"{st.session_state.api_url}/{endpoint}")
-        if res.status_code == 200:
-            return res.json()
+        while max_items is None or len(items) < max_items:
+            params = {"limit": 500 if max_items is None else min(500, max_items - len(items))}
+            if fields:
+                params["fields"] = fields
+            if cursor:
+                params["cursor"] = cursor
+            res = requests.get(f"{st.session_state.api_url}/{endpoint}", params=params)
+            if res.status_code != 200:
+                break
+            items.extend(res.json())
+            cursor = res.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
     except requests.exceptions.RequestException as e:
         st.sidebar.error(f"Error fetching {endpoint}: {e}")
-    return []
+    return items
+
+
+def run_job(kind: str, transcript_id: int, config: dict = None, label: str = "", bypass_cache: bool = False):
+    """ ✨ Submits a background job and polls it with a progress bar until it finishes."""
+    res = requests.post(f"{st.session_state.api_url}/jobs",
+                        json={"kind": kind, "transcript_id": transcript_id, "config": config,
+                              "bypass_cache": bypass_cache})
+    if res.status_code != 200:
+        return {"status": "failed", "error": res.text}
+    job = res.json()
+    bar = st.progress(0.0, text=label)
+    while job["status"] in ("queued", "running"):
+        time.sleep(1)
+        res = requests.get(f"{st.session_state.api_url}/jobs/{job['id']}")
+        if res.status_code != 200:
+            return {"status": "failed", "error": res.text}
+        job = res.json()
+        bar.progress(min(job["progress"], 1.0), text=f"{label} {job['progress']:.0%}")
+    return job
+
+
+def stream_sse(endpoint: str, payload: dict):
+    """ ✨ Yields (event, data) pairs from a server-sent events endpoint as they arrive."""
+    with requests.post(f"{st.session_state.api_url}/{endpoint}", json=payload, stream=True) as res:
+        if res.status_code != 200:
+            yield "error", {"detail": res.text}
+            return
+        res.encoding = "utf-8"
+        event = "message"
+        for line in res.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[len("data:"):])
+
+
+def stream_ndjson(endpoint: str, payload: dict):
+    """ ✨ Yields the objects of a newline-delimited JSON endpoint as they arrive."""
+    with requests.post(f"{st.session_state.api_url}/{endpoint}", json=payload, stream=True) as res:
+        if res.status_code != 200:
+            yield {"error": res.text}
+            return
+        res.encoding = "utf-8"
+        for line in res.iter_lines(decode_unicode=True):
+            if line:
+                yield json.loads(line)
 
 
 # --- Sidebar ---
 st.sidebar.header("API 配置")
-api_url_default = os.getenv("API_URL", "http://localhost:8000")
+api_url_default = os.getenv("API_URL") or "http://localhost:8000"
 st.session_state.api_url = st.sidebar.text_input("API base URL", value=api_url_default).rstrip("/")
 
 # ✨ Fetch the defaults once
@@ -102,18 +160,37 @@ with st.sidebar.expander("📄 上传新文档", expanded=True):
         if 'new_transcript_id' in st.session_state:
             st.info("⬆️ 文档已上传。点击下方按钮为其生成 AI 可用数据 (Chunks 和 Embeddings)。")
             if st.button("🤖 开始 AI 处理"):
-                with st.spinner("正在处理文档以用于 AI分析..."):
-                    transcript_id = st.session_state.new_transcript_id
-                    res = requests.post(f"{st.session_state.api_url}/transcripts/process-ai/{transcript_id}")
-                    if res.status_code == 200:
-                        st.success("AI 处理完成！")
-                        del st.session_state.new_transcript_id
-                        # ✅ FIX: Clear the cache to ensure the status update is visible
-                        st.cache_data.clear()
-                        st.rerun()
-                    else:
-                        st.error(f"AI 处理失败: {res.text}")
-                        del st.session_state.new_transcript_id
+                transcript_id = st.session_state.new_transcript_id
+                job = run_job("process-ai", transcript_id, label="正在处理文档以用于 AI分析...")
+                if job["status"] == "done":
+                    st.success("AI 处理完成！")
+                    del st.session_state.new_transcript_id
+                    # ✅ FIX: Clear the cache to ensure the status update is visible
+                    st.cache_data.clear()
+                    st.rerun()
+                else:
+                    st.error(f"AI 处理失败: {job.get('error')}")
+                    del st.session_state.new_transcript_id
+
+# ✨ --- Bulk Uploader ---
+with st.sidebar.expander("📦 批量上传", expanded=False):
+    bulk_files = st.file_uploader("选择多个 .txt / .docx 文件或 .zip 压缩包", type=["txt", "docx", "zip"],
+                                  accept_multiple_files=True, key="bulk_uploader")
+    bulk_process = st.checkbox("上传后自动开始 AI 处理", value=True, key="bulk_process_ai")
+    if bulk_files and st.button("批量上传"):
+        files = [("files", (f.name, f.getvalue(), f.type)) for f in bulk_files]
+        with st.spinner(f"正在上传 {len(bulk_files)} 个文件..."):
+            res = requests.post(f"{st.session_state.api_url}/transcripts/bulk-upload", files=files,
+                                data={"process_ai": str(bulk_process).lower()})
+        if res.status_code == 200:
+            body = res.json()
+            st.success(f"已上传 {len(body['transcripts'])} 个文档" +
+                       (f"，已排队 {len(body['jobs'])} 个 AI 处理任务" if body["jobs"] else ""))
+            if body["skipped"]:
+                st.warning("已跳过: " + ", ".join(body["skipped"]))
+            st.cache_data.clear()
+        else:
+            st.error(f"上传失败: {res.text}")
 
 # ✨ --- Manual Actions ---
 with st.sidebar.expander("✍️ 手动添加", expanded=False):
@@ -150,7 +227,7 @@ with st.sidebar.expander("✍️ 手动添加", expanded=False):
     # --- Add Code ---
     st.subheader("添加新编码")
     transcripts = get_api_data("transcripts")
-    memos = get_api_data("memos")
+    memos = get_api_data("memos", fields="id,title")
 
     # ✅ FIX: Move the radio button OUTSIDE and ABOVE the form.
     # Its state is automatically saved to st.session_state thanks to the 'key'.
@@ -261,14 +338,24 @@ with tab1:
                 # Only show the button if the status is 'new' or 'failed'
                 if t['status'] in ['new', 'failed']:
                     if st.button("🤖 Process for AI", key=f"process_{t['id']}"):
-                        with st.spinner(f"正在处理 Transcript ID: {t['id']}..."):
-                            res = requests.post(f"{st.session_state.api_url}/transcripts/process-ai/{t['id']}")
-                            if res.status_code == 200:
-                                st.toast("✅ AI 处理完成!", icon="🤖")
-                                st.cache_data.clear()
-                                st.rerun()
-                            else:
-                                st.error(f"AI 处理失败: {res.text}")
+                        job = run_job("process-ai", t['id'], label=f"正在处理 Transcript ID: {t['id']}...")
+                        if job["status"] == "done":
+                            st.toast("✅ AI 处理完成!", icon="🤖")
+                            st.cache_data.clear()
+                            st.rerun()
+                        else:
+                            st.error(f"AI 处理失败: {job.get('error')}")
+                # ✨ Re-processing only re-embeds chunks whose text changed
+                elif t['status'] == 'processed':
+                    if st.button("🔄 Re-process", key=f"reprocess_{t['id']}"):
+                        job = run_job("process-ai", t['id'], label=f"正在重新处理 Transcript ID: {t['id']}...")
+                        if job["status"] == "done":
+                            result = job.get("result") or {}
+                            st.toast(f"✅ 重新处理完成: 复用 {result.get('reused', 0)} 个, "
+                                     f"重新嵌入 {result.get('embedded', 0)} 个 chunks", icon="🔄")
+                            st.cache_data.clear()
+                        else:
+                            st.error(f"AI 处理失败: {job.get('error')}")
 
         # This is a workaround to get the ID from the button click in st.dataframe
         if st.button("Manually trigger button state check"):
@@ -299,28 +386,50 @@ with tab1:
                 "embed_model": st.session_state.openai_embed_model
             }
 
+            # ✨ Cached LLM responses are reused unless the user asks for a fresh run
+            bypass_cache = st.checkbox("♻️ 忽略缓存，重新调用 AI", key="bypass_llm_cache")
+
             # --- AI Generate & Save Codes ---
             if st.button("🤖 生成并保存 AI 编码"):
-                with st.spinner("正在调用 AI 分析并保存编码..."):
-                    payload = {"transcript_id": st_id, "config": ai_config}
-                    res = requests.post(f"{st.session_state.api_url}/codes/ai-generate", json=payload)
-                    if res.status_code == 200:
-                        # ✨ FIX: Use st.toast for visible confirmation
-                        st.toast('✅ AI 编码已成功保存!', icon='🤖')
-                        st.cache_data.clear()
-                        st.rerun()
-                    else:
-                        st.error(f"操作失败: {res.text}")
+                job = run_job("codes", st_id, config=ai_config, label="正在调用 AI 分析并保存编码...",
+                              bypass_cache=bypass_cache)
+                if job["status"] == "done":
+                    # ✨ FIX: Use st.toast for visible confirmation
+                    result = job.get("result") or {}
+                    st.toast(f"✅ AI 编码已成功保存! 复用已有分析 {result.get('llm_calls_saved', 0)} 个, "
+                             f"新调用 AI {result.get('llm_calls', 0)} 次", icon='🤖')
+                    st.cache_data.clear()
+                    st.rerun()
+                else:
+                    st.error(f"操作失败: {job.get('error')}")
 
             # --- AI Generate Memo ---
             if st.button("📝 生成 AI 备忘录预览"):
-                with st.spinner("正在调用 AI 生成备忘录预览..."):
-                    payload = {"transcript_id": st_id, "config": ai_config}
-                    res = requests.post(f"{st.session_state.api_url}/memo/preview", json=payload)
-                    if res.status_code == 200:
-                        st.session_state.ai_memo_preview = res.json()
-                    else:
-                        st.error(f"生成预览失败: {res.text}")
+                # ✨ Stream the memo: show progress while chunks are analyzed, then the text as it is written
+                payload = {"transcript_id": st_id, "config": ai_config, "bypass_cache": bypass_cache}
+                status, live = st.empty(), st.empty()
+                errors = []  # Shown after the placeholders are cleared, which would wipe them
+
+                def memo_tokens():
+                    for event, data in stream_sse("memo/preview/stream", payload):
+                        if event == "progress" and data["stage"] == "map":
+                            status.progress(data["done"] / max(data["total"], 1),
+                                            text=f"正在分析文本块 {data['done']}/{data['total']}...")
+                        elif event == "progress":
+                            status.info("正在汇总分析结果..." if data["stage"] == "reduce" else "正在撰写备忘录...")
+                        elif event == "token":
+                            yield data["text"]
+                        elif event == "done":
+                            st.session_state.ai_memo_preview = data
+                        elif event == "error":
+                            errors.append(data.get("detail"))
+
+                with live.container(border=True):
+                    st.write_stream(memo_tokens())
+                status.empty()
+                live.empty()
+                for detail in errors:
+                    st.error(f"生成预览失败: {detail}")
 
             # ✨ 如果备忘录已生成，则显示内容和保存按钮
             # ✨ --- AI Memo Preview Bug Fix ---
@@ -331,41 +440,64 @@ with tab1:
                     st.markdown(preview['content'])
                     if st.button("💾 保存此备忘录到数据库"):
                         with st.spinner("保存中..."):
-                            payload = {"transcript_id": st_id, "config": ai_config}
-                            save_res = requests.post(f"{st.session_state.api_url}/memos/ai-generate", json=payload)
+                            # ✨ Save the stored preview as-is instead of generating the memo again
+                            save_res = requests.post(
+                                f"{st.session_state.api_url}/memos/from-preview/{preview['preview_id']}")
                             if save_res.status_code == 200:
                                 # ✨ FIX: Use st.toast for visible confirmation
                                 st.toast('✅ AI 备忘录已成功保存!', icon='📝')
                                 del st.session_state.ai_memo_preview
                                 st.cache_data.clear()
                                 st.rerun()
+                            elif save_res.status_code == 404:
+                                st.warning("预览已过期，请重新生成备忘录预览。")
+                                del st.session_state.ai_memo_preview
                             else:
                                 st.error(f"保存失败: {save_res.text}")
             # --- Semantic Search ---
             st.markdown("##### 🔍 语义搜索查询")
             query = st.text_input("输入你的问题或关键词", key="search_query")
             k = st.slider("返回最相关的 K 个结果", 1, 10, 5)
+            # ✨ Search every processed transcript with one request instead of one per transcript
+            search_all = st.checkbox("🌐 搜索所有已处理文档", key="search_all_transcripts")
+            # ✨ Keyword mode matches exact phrases and names without an embedding request
+            search_modes = {"语义": "vector", "关键词": "keyword", "混合": "hybrid"}
+            search_mode = st.radio("搜索方式", list(search_modes), horizontal=True, key="search_mode")
             if st.button("搜索"):
+                # ✨ Results are streamed and shown as soon as the ranking is final
                 with st.spinner("正在进行语义搜索..."):
-                    payload = {
-                        "transcript_id": st_id,
-                        "query": query,
-                        "top_k": k,
-                        "config": ai_config
-                    }
-                    res = requests.post(f"{st.session_state.api_url}/search/", json=payload)
-                    if res.status_code == 200:
-                        st.success("搜索完成！")
-                        results = res.json()
-                        if not results:
-                            st.info("没有找到相关结果。")
-                        else:
-                            for item in results:
-                                with st.container(border=True):
-                                    st.caption(f"相似度分数: {item.get('score', 0):.4f}")
-                                    st.markdown(item.get('text', 'N/A'))
+                    if search_all:
+                        endpoint = "search/corpus/stream"
+                        payload = {"query": query, "top_k": k, "config": ai_config,
+                                   "mode": search_modes[search_mode]}
                     else:
-                        st.error(f"搜索失败: {res.text}")
+                        endpoint = "search/stream"
+                        payload = {
+                            "transcript_id": st_id,
+                            "query": query,
+                            "top_k": k,
+                            "config": ai_config,
+                            "mode": search_modes[search_mode]
+                        }
+                    found, failed = 0, False
+                    for item in stream_ndjson(endpoint, payload):
+                        if "error" in item:
+                            st.error(f"搜索失败: {item['error']}")
+                            failed = True
+                            break
+                        found += 1
+                        with st.container(border=True):
+                            caption = f"相关度分数: {item.get('score', 0):.4f}"
+                            if 'transcript_title' in item:
+                                caption += (f" | 来源: {item['transcript_title']}"
+                                            f" ({item.get('start_pos')}–{item.get('end_pos')})")
+                            st.caption(caption)
+                            st.markdown(item.get('text', 'N/A'))
+                    if not failed:
+                        if found:
+                            st.success("搜索完成！")
+                        else:
+                            st.info("没有找到相关结果。")
     else:
         st.info("没有已处理的文档可供分析。请先上传并点击 'Process for AI'。")
 
@@ -413,7 +545,7 @@ with tab2:
 
     # ✨ --- Redesigned Memo Viewer with Checkbox Toggle ---
     st.subheader("📝 所有 Memos")
-    memos = get_api_data("memos")
+    memos = get_api_data("memos", fields="id,title")
     if not memos:
         st.info("暂无 Memos。请在侧边栏手动添加。")
     for m in memos:
@@ -451,7 +583,8 @@ with tab2:
         st.cache_data.clear()
         st.rerun()
 
-    codes = get_api_data("codes")
+    st.session_state.setdefault("codes_limit", 200)
+    codes = get_api_data("codes", max_items=st.session_state.codes_limit)
     if not codes:
         st.info("暂无编码。请在左侧侧边栏添加。")
     else:
@@ -470,4 +603,9 @@ with tab2:
                             st.cache_data.clear()
                             st.rerun()
                         else:
-                            st.error("删除失败")
\ No newline at end of file
+                            st.error("删除失败")
+        # ✨ Codes are fetched page by page; load the next pages on demand
+        if len(codes) >= st.session_state.codes_limit:
+            if st.button("加载更多编码", key="load_more_codes"):
+                st.session_state.codes_limit += 200
+                st.rerun()
\ No newline at end of file
@@ -0,0 +1,57 @@
+# tests/test_ann.py
+import os
+import time
+
+import numpy as np
+
+from backend.ann import AnnIndexManager
+
+
+def _vectors(n, seed, dim=16):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def _build(manager, ids, tids, vectors):
+    return manager.build("m", vectors, len(ids), [(ids, tids, vectors)])
+
+
+def test_workers_share_updates_through_deltas(tmp_path):
+    api = AnnIndexManager("ivf", str(tmp_path))
+    job = AnnIndexManager("ivf", str(tmp_path))
+    vectors = _vectors(100, 0)
+    _build(api, list(range(1, 101)), [1] * 50 + [2] * 50, vectors)
+    snapshot = api._path("m")
+    mtime = os.stat(snapshot).st_mtime_ns
+    assert api.get("m").fingerprint() == (100, 100)
+
+    # Another worker re-processes a transcript and a request deletes one; neither rewrites the snapshot
+    new = _vectors(10, 1)
+    job.replace_transcript("m", 1, list(range(101, 111)), new)
+    job.remove_transcript(2)
+    assert os.stat(snapshot).st_mtime_ns == mtime
+    assert job._indexes == {}  # no index was loaded to record them
+
+    assert api.get("m").fingerprint() == (100, 100)
+    index = api.refresh("m")
+    assert index.fingerprint() == (10, 110)
+    assert index.search(new[3], 1)[0][0] == 104
+
+    # A rebuild elsewhere replaces the loaded index on the next refresh
+    time.sleep(0.01)
+    _build(job, [7], [3], _vectors(1, 2))
+    assert api.refresh("m").fingerprint() == (1, 7)
+
+
+def test_compaction_folds_deltas_into_snapshot(tmp_path):
+    manager = AnnIndexManager("ivf", str(tmp_path), compact_after=3)
+    _build(manager, list(range(1, 41)), list(range(1, 41)), _vectors(40, 0))
+    for tid in (1, 2, 3):
+        manager.remove_transcript(tid)
+    manager.refresh("m")
+    for _ in range(100):
+        if not manager._compacting:
+            break
+        time.sleep(0.01)
+
+    assert manager._delta_names("m") == []
+    assert AnnIndexManager("ivf", str(tmp_path)).get("m").fingerprint() == (37, 40)
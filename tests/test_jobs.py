@@ -0,0 +1,77 @@
+# tests/test_jobs.py
+import datetime
+import threading
+import time
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from backend import jobs, schemas, services
+from backend.models import Job, Transcript
+from benchmarks.fake_openai import FakeOpenAIServer
+
+
+def _wait_for_status(db, job_id, status, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db.expire_all()
+        if db.get(Job, job_id).status == status:
+            return
+        time.sleep(0.02)
+    pytest.fail(f"job {job_id} is {db.get(Job, job_id).status!r}, expected {status!r}")
+
+
+def test_only_jobs_with_a_stale_heartbeat_are_failed(db):
+    now = datetime.datetime.now(datetime.UTC)
+    db.add_all([
+        Job(id="live", kind="codes", status="running", heartbeat_at=now),
+        Job(id="dead", kind="codes", status="running", heartbeat_at=now - datetime.timedelta(minutes=5)),
+        Job(id="legacy", kind="codes", status="queued"),
+        Job(id="done", kind="codes", status="done", heartbeat_at=now - datetime.timedelta(minutes=5)),
+    ])
+    db.commit()
+
+    assert jobs.fail_stale_jobs(db, stale_seconds=60) == 2
+
+    db.expire_all()
+    assert {job.id: job.status for job in db.query(Job)} == {
+        "live": "running", "dead": "failed", "legacy": "failed", "done": "done"}
+
+
+def test_cancel_reaches_a_job_running_in_another_worker(db, monkeypatch):
+    monkeypatch.setattr(jobs, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    started = threading.Event()
+
+    def run_until_cancelled(job_db, transcript_id, config, progress, bypass_cache):
+        started.set()
+        while True:
+            progress(0.5)
+            time.sleep(0.01)
+
+    monkeypatch.setitem(jobs.JOB_KINDS, "codes", run_until_cancelled)
+    owner = jobs.JobRunner(max_workers=1, heartbeat_seconds=3600)
+    other = jobs.JobRunner(max_workers=1, heartbeat_seconds=3600)
+
+    job_id = owner.submit(db, "codes", transcript_id=None).id
+    assert started.wait(10)
+    assert other.cancel(db, job_id).cancel_requested
+    _wait_for_status(db, job_id, "cancelled")
+
+
+def test_cancelled_processing_keeps_the_previous_transcript_status(db, tmp_path):
+    path = tmp_path / "interview.txt"
+    path.write_text("Interviewer: How was your week?\n\nAlex: Busy, but good.\n" * 50, encoding="utf-8")
+    transcript = Transcript(title="interview.txt", file_path=str(path), status="processed")
+    db.add(transcript)
+    db.commit()
+
+    def cancel(fraction):
+        raise jobs.JobCancelled()
+
+    with FakeOpenAIServer(dim=8) as server:
+        config = schemas.AIConfig(api_key="sk-test", base_url=server.base_url, embed_model="test-embed")
+        with pytest.raises(jobs.JobCancelled):
+            services.process_transcript_for_ai(db, transcript.id, config=config, progress=cancel)
+
+    db.refresh(transcript)
+    assert transcript.status == "processed"
@@ -0,0 +1,51 @@
+# tests/test_list_codes.py
+import datetime
+
+from sqlalchemy import event, insert
+
+from backend import services
+from backend.models import Code, Memo, Transcript
+
+
+def _add_codes(db, start: int, stop: int):
+    """Codes start..stop-1: transcript codes, memo codes and orphans, so every `source` branch is loaded."""
+    transcript_ids = [t.id for t in db.query(Transcript.id)]
+    memo_ids = [m.id for m in db.query(Memo.id)]
+    now = datetime.datetime.now(datetime.UTC)
+    db.execute(insert(Code), [
+        {"code": f"code {i}", "excerpt": "excerpt", "created_at": now,
+         "transcript_id": transcript_ids[i % len(transcript_ids)] if i % 3 == 0 else None,
+         "memo_id": memo_ids[i % len(memo_ids)] if i % 3 == 1 else None}
+        for i in range(start, stop)
+    ])
+    db.commit()
+
+
+def _count_statements(db, fn):
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return result, statements
+
+
+def test_list_codes_runs_one_statement_whatever_the_row_count(db):
+    db.execute(insert(Transcript), [{"title": f"t{i}.txt", "file_path": "-", "status": "processed"} for i in range(20)])
+    db.execute(insert(Memo), [{"title": f"memo {i}", "content": "..."} for i in range(5)])
+    db.commit()
+
+    counts = []
+    for rows in (10, 300):
+        _add_codes(db, db.query(Code).count(), rows)
+        (items, _), statements = _count_statements(db, lambda: services.list_codes(db, limit=1000))
+        assert len(items) == rows
+        assert {item["source"].split(":")[0] for item in items} == {"Transcript", "Memo", "N/A"}
+        counts.append(len(statements))
+    assert counts == [1, 1]
@@ -0,0 +1,29 @@
+# tests/test_lists.py
+import pytest
+
+from backend import services
+from backend.models import Memo
+
+
+def test_list_memos_leaves_out_content_unless_asked(db):
+    db.add_all([Memo(title="m1", content="long body 1"), Memo(title="m2", content="long body 2")])
+    db.commit()
+
+    items, next_cursor = services.list_memos(db)
+    assert [sorted(item) for item in items] == [["id", "title"], ["id", "title"]]
+    assert next_cursor is None
+
+    items, _ = services.list_memos(db, fields="title,content")
+    assert items == [{"title": "m1", "content": "long body 1"}, {"title": "m2", "content": "long body 2"}]
+
+
+def test_cursor_is_rejected_for_a_different_sort(db):
+    db.add_all([Memo(title=f"m{i}", content="-") for i in range(3)])
+    db.commit()
+
+    first, cursor = services.list_memos(db, limit=2, sort="id")
+    rest, _ = services.list_memos(db, limit=2, sort="id", cursor=cursor)
+    assert [m["title"] for m in first + rest] == ["m0", "m1", "m2"]
+
+    with pytest.raises(ValueError, match="sort=id"):
+        services.list_memos(db, limit=2, sort="-title", cursor=cursor)
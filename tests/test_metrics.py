@@ -0,0 +1,20 @@
+# tests/test_metrics.py
+from openai import OpenAI
+
+from backend import metrics, services
+from benchmarks.fake_openai import FakeOpenAIServer
+
+
+def test_streamed_chat_completion_counts_tokens():
+    def tokens(kind):
+        return metrics.OPENAI_TOKENS._values.get(("chat", "test-stream", kind), 0)
+
+    before = tokens("prompt"), tokens("completion")
+    with FakeOpenAIServer() as server:
+        client = OpenAI(api_key="sk-test", base_url=server.base_url)
+        text = "".join(services.stream_chat_completion(client, "test-stream", "system", "write a memo",
+                                                       temperature=0.0, bypass_cache=True))
+
+    assert text
+    assert tokens("prompt") > before[0]
+    assert tokens("completion") - before[1] == len(text.split(" ")) - 1
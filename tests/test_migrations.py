@@ -0,0 +1,46 @@
+# tests/test_migrations.py
+import json
+
+from sqlalchemy import create_engine, inspect, text
+
+from backend import models  # noqa: F401  (registers the tables)
+from backend.db import Base
+from backend.migrations import INDEXES, run_migrations
+from backend.vectors import unpack_embedding
+
+# The tables as the first release created them, with embeddings stored as JSON text
+BASELINE_SCHEMA = [
+    "CREATE TABLE transcripts (id INTEGER PRIMARY KEY, title VARCHAR NOT NULL UNIQUE, "
+    "file_path VARCHAR NOT NULL, status VARCHAR NOT NULL)",
+    "CREATE TABLE chunks (id INTEGER PRIMARY KEY, transcript_id INTEGER REFERENCES transcripts(id), "
+    "text TEXT, embedding TEXT, start_pos INTEGER, end_pos INTEGER)",
+    "CREATE TABLE memos (id INTEGER PRIMARY KEY, title VARCHAR NOT NULL UNIQUE, content TEXT NOT NULL)",
+    "CREATE TABLE codes (id INTEGER PRIMARY KEY, code VARCHAR, excerpt TEXT NOT NULL, created_at DATETIME, "
+    "transcript_id INTEGER REFERENCES transcripts(id), memo_id INTEGER REFERENCES memos(id))",
+]
+
+
+def test_run_migrations_upgrades_baseline_schema(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as conn:
+        for ddl in BASELINE_SCHEMA:
+            conn.execute(text(ddl))
+        conn.execute(text("INSERT INTO transcripts VALUES (1, 'a.txt', '-', 'processed')"))
+        conn.execute(text("INSERT INTO chunks VALUES (1, 1, 'hello', :emb, 0, 5)"),
+                     {"emb": json.dumps([0.5, -1.0, 2.0])})
+
+    # Same order as main.py on startup
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    run_migrations(engine)  # idempotent
+
+    inspector = inspect(engine)
+    assert {"embedding_dim", "embedding_model", "content_hash"} <= {c["name"] for c in inspector.get_columns("chunks")}
+    indexes = {ix["name"] for table in ("chunks", "codes") for ix in inspector.get_indexes(table)}
+    assert set(INDEXES) <= indexes
+    with engine.connect() as conn:
+        embedding, dim, model, digest = conn.execute(
+            text("SELECT embedding, embedding_dim, embedding_model, content_hash FROM chunks")).one()
+    assert unpack_embedding(embedding).tolist() == [0.5, -1.0, 2.0]
+    assert dim == 3 and model and digest
+    engine.dispose()
@@ -0,0 +1,56 @@
+# tests/test_pg_vectors.py
+import numpy as np
+from sqlalchemy import insert, text
+
+from backend import pg_vectors
+from backend.models import Chunk, Transcript
+from backend.vectors import pack_embedding, unpack_embeddings
+
+DIM = 16
+MODEL = "test-embed"
+
+
+def _seed(db, n=400):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, DIM), dtype=np.float32)
+    db.add_all([Transcript(id=1, title="a.txt", file_path="-", status="processed"),
+                Transcript(id=2, title="b.txt", file_path="-", status="processed"),
+                Transcript(id=3, title="c.txt", file_path="-", status="new")])
+    db.commit()
+    db.execute(insert(Chunk), [
+        {"id": i + 1, "transcript_id": i % 3 + 1, "text": f"chunk {i}", "embedding": pack_embedding(v),
+         "embedding_dim": DIM, "embedding_model": MODEL, "start_pos": 0, "end_pos": 1}
+        for i, v in enumerate(vectors)
+    ])
+    db.commit()
+    return vectors
+
+
+def _exact(vectors, query, k, transcripts):
+    ids = np.arange(1, len(vectors) + 1)
+    keep = np.isin((ids - 1) % 3 + 1, transcripts)
+    unit = vectors[keep] / np.linalg.norm(vectors[keep], axis=1, keepdims=True)
+    scores = unit @ (query / np.linalg.norm(query))
+    return [int(i) for i in ids[keep][np.argsort(-scores)[:k]]]
+
+
+def test_embeddings_round_trip_as_packed_bytes(pg_db):
+    vectors = _seed(pg_db)
+    blobs = [row.embedding for row in pg_db.query(Chunk.embedding).order_by(Chunk.id)]
+    assert all(isinstance(blob, bytes) for blob in blobs)
+    np.testing.assert_array_equal(unpack_embeddings(blobs), vectors)
+
+
+def test_search_matches_exact_scan(pg_db):
+    vectors = _seed(pg_db)
+    pg_vectors.ensure_index(pg_db, DIM)
+    assert pg_db.execute(text(f"SELECT 1 FROM pg_indexes WHERE indexname = 'ix_chunks_embedding_hnsw_{DIM}'")).first()
+
+    query = np.random.default_rng(1).standard_normal(DIM).astype(np.float32)
+    hits = pg_vectors.search(pg_db, query, MODEL, 5)
+    # Only chunks of processed transcripts (1 and 2), best first, with cosine similarity scores
+    assert [chunk_id for chunk_id, _ in hits] == _exact(vectors, query, 5, [1, 2])
+    assert hits == sorted(hits, key=lambda hit: -hit[1])
+
+    hits = pg_vectors.search(pg_db, query, MODEL, 5, transcript_ids=[3], processed_only=False)
+    assert [chunk_id for chunk_id, _ in hits] == _exact(vectors, query, 5, [3])
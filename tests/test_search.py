@@ -0,0 +1,45 @@
+# tests/test_search.py
+import numpy as np
+from sqlalchemy import insert
+
+from backend import pg_vectors, schemas, services
+from backend.models import Chunk, Transcript
+from backend.vectors import TranscriptIndex, VectorIndexCache, index_cache, pack_embedding
+from benchmarks.fake_openai import FakeOpenAIServer
+
+
+def test_search_similar_returns_chunk_texts_from_a_cached_index(db):
+    texts = [f"participant talks about topic {i}" for i in range(20)]
+    with FakeOpenAIServer(dim=16) as server:
+        transcript = Transcript(title="a.txt", file_path="-", status="processed")
+        db.add(transcript)
+        db.commit()
+        db.execute(insert(Chunk), [
+            {"transcript_id": transcript.id, "text": text, "embedding": pack_embedding(server.fake_embedding(text)),
+             "embedding_dim": 16, "embedding_model": "test-embed", "start_pos": 0, "end_pos": len(text)}
+            for text in texts
+        ])
+        db.commit()
+        config = schemas.AIConfig(api_key="sk-test", base_url=server.base_url, embed_model="test-embed")
+        index_cache.invalidate(transcript.id)
+
+        first = services.search_similar(db, transcript.id, texts[3], top_k=3, config=config)
+        again = services.search_similar(db, transcript.id, texts[3], top_k=3, config=config)
+
+    assert first == again
+    assert first[0]["text"] == texts[3] and abs(first[0]["score"] - 1.0) < 1e-5
+    assert all(hit["text"] == texts[hit["chunk_id"] - 1] for hit in first)
+    if not pg_vectors.is_postgres(db):  # PostgreSQL searches in the database, without the cache
+        assert index_cache.get((transcript.id, "test-embed")) is not None
+
+
+def test_index_cache_skips_put_after_invalidation():
+    cache = VectorIndexCache(max_bytes=1 << 20)
+    index = TranscriptIndex([1, 2], np.eye(2, dtype=np.float32))
+    generation = cache.generation(7)
+    cache.invalidate(7)  # e.g. the transcript was re-processed while the rows were being read
+
+    cache.put((7, "m"), index, generation)
+    assert cache.get((7, "m")) is None
+    cache.put((7, "m"), index, cache.generation(7))
+    assert cache.get((7, "m")) is index
@@ -0,0 +1,29 @@
+# tests/test_settings.py
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+
+def test_blank_env_template_values_fall_back_to_defaults(tmp_path):
+    # A .env copied from .env.example leaves every setting blank
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    for line in (ROOT / ".env.example").read_text().splitlines():
+        name = line.split("=", 1)[0].strip()
+        if name and not name.startswith("#"):
+            env[name] = ""
+    code = (
+        "from backend import db, jobs, services, vectors\n"
+        "from backend.ann import AnnIndexManager\n"
+        "from sqlalchemy import text\n"
+        "with db.engine.connect() as conn:\n"
+        "    conn.execute(text('SELECT 1'))\n"
+        "print(db.DATABASE_URL, db.SQLITE_PRAGMAS['busy_timeout'], vectors.index_cache.max_bytes,\n"
+        "      AnnIndexManager().backend)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["sqlite:///./data.db", "30000", str(256 * 1024 * 1024), "ivf"]
@@ -0,0 +1,29 @@
+# tests/test_transcripts.py
+import datetime
+
+from backend import services
+from backend.models import Chunk, Code, Job, MemoPreview, Transcript
+
+
+def test_delete_transcript_with_jobs_and_memo_previews(db):
+    transcript = Transcript(title="a.txt", file_path="-", status="processed")
+    db.add(transcript)
+    db.commit()
+    expires = datetime.datetime.now(datetime.UTC) + datetime.timedelta(hours=1)
+    db.add_all([
+        Chunk(transcript_id=transcript.id, text="hello", start_pos=0, end_pos=5),
+        Code(code="c", excerpt="hello", transcript_id=transcript.id),
+        Job(id="job1", kind="process-ai", transcript_id=transcript.id, status="done"),
+        MemoPreview(id="preview1", transcript_id=transcript.id, content="memo", expires_at=expires),
+    ])
+    db.commit()
+    transcript_id = transcript.id
+    db.expire_all()
+
+    assert services.delete_transcript(db, transcript_id) == {"deleted": True}
+
+    assert db.query(Transcript).count() == 0
+    assert db.query(Chunk).count() == 0
+    assert db.query(MemoPreview).count() == 0
+    assert db.get(Job, "job1").transcript_id is None
+    assert db.query(Code).one().transcript_id is None